@@ -5,6 +5,7 @@
 #define LIB_INCLUDE_SPARKLEN_ARRAY_SHAREDARRAY_H_
 
 
+#include <cstdint>
 #include <memory>
 #include <vector>
 #include "sparklen/array/array.h"
@@ -233,6 +234,7 @@ void SharedArray<T>::clear() {
   typedef std::vector<ListSharedArray##NAME##1D> ListListSharedArray##NAME##1D;
 
 SHAREDARRAY_DEFINE_TYPE(double, Double);
+SHAREDARRAY_DEFINE_TYPE(std::int64_t, Long);
 
 #undef SHAREDARRAY_DEFINE_TYPE
 
@@ -4,6 +4,7 @@
 #ifndef LIB_INCLUDE_SPARKLEN_ARRAY_SHAREDARRAY2D_H_
 #define LIB_INCLUDE_SPARKLEN_ARRAY_SHAREDARRAY2D_H_
 
+#include <cstdint>
 #include <memory>
 #include <vector>
 #include "sparklen/array/array2D.h"
@@ -234,6 +235,7 @@ void SharedArray2D<T>::add(const SharedArray2D<T> &arr) {
 
 ARRAY_DEFINE_TYPE(double, Double);
 ARRAY_DEFINE_TYPE(int, Int);
+ARRAY_DEFINE_TYPE(std::int64_t, Long);
 
 #undef ARRAY_DEFINE_TYPE
 
@@ -0,0 +1,47 @@
+// Author : Romain E. Lacoste
+// License : BSD-3-Clause
+
+#ifndef LIB_INCLUDE_SPARKLEN_HAWKES_DIAGNOSTICS_HAWKES_EXP_COMPENSATOR_H_
+#define LIB_INCLUDE_SPARKLEN_HAWKES_DIAGNOSTICS_HAWKES_EXP_COMPENSATOR_H_
+
+#include "sparklen/array/sharedarray.h"
+#include "sparklen/array/sharedarray2D.h"
+#include <cstdint>
+#include <utility>
+#include <vector>
+
+
+class HawkesExpCompensator{
+
+	private:
+
+	size_t n_components;
+
+	size_t n_decays;
+
+	std::vector<double> mu;
+
+	std::vector<double> decays;
+
+	std::vector<std::vector<size_t>> targets; // components excited by each feature u*d+j', with a non-zero interaction
+
+	std::vector<std::vector<double>> targets_alpha; // the corresponding interactions
+
+	int n_threads;
+
+	std::vector<std::pair<double, size_t>> merge_path(const SharedArrayDouble1D &timestamps, const SharedArrayLong2D &offsets, const size_t rep) const;
+
+	public:
+
+	HawkesExpCompensator(const SharedArrayDouble1D &mu, const SharedArrayLong1D &alpha_indptr, const SharedArrayLong1D &alpha_indices,
+						 const SharedArrayDouble1D &alpha_data, const SharedArrayDouble1D &decays);
+
+	void set_n_threads(const int n_threads);
+
+	SharedArrayDouble1D compute_at_events(const SharedArrayDouble1D &timestamps, const SharedArrayLong2D &offsets);
+
+	SharedArrayDouble2D compute_at_times(const SharedArrayDouble1D &timestamps, const SharedArrayLong2D &offsets, const SharedArrayDouble1D &times);
+};
+
+
+#endif /* LIB_INCLUDE_SPARKLEN_HAWKES_DIAGNOSTICS_HAWKES_EXP_COMPENSATOR_H_ */
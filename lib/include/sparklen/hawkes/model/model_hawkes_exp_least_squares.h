@@ -5,6 +5,9 @@
 #define LIB_INCLUDE_SPARKLEN_HAWKES_MODEL_MODEL_HAWKES_EXP_LEAST_SQUARES_H_
 
 #include "sparklen/hawkes/model/model_hawkes_exp_least_squares_single.h"
+#include "sparklen/hawkes/model/packed_events.h"
+#include <memory>
+#include <mutex>
 #include <vector>
 
 
@@ -16,21 +19,55 @@ class ModelHawkesExpLeastSquares{
 
 	size_t n_components;
 
-	std::vector<ModelHawkesExpLeastSquaresSingle> multivariate_model;
+	ListListSharedArrayDouble1D list_jump_times; // shares the memory of the registered event times
+
+	double end_time;
+
+	double decay;
+
+	int n_threads;
+
+	std::vector<std::shared_ptr<ModelHawkesExpLeastSquaresSingle>> multivariate_model; // shared with the models built on a subset of the repetitions
+
+	ModelHawkesExpLeastSquaresSingle pooled_model; // sufficient statistics averaged over the repetitions
 
 	bool multivariate_model_computed; // when the model is agreagated, we can compute averaged loss and grad
 
+	std::mutex weights_mutex; // guards the lazy computation of the weights, the GIL being released
+
+	void reset_weights();
+
+	void compute_pooled_weights();
+
 	public:
 
 	ModelHawkesExpLeastSquares();
 
 	ModelHawkesExpLeastSquares(size_t n_rep, size_t n_comp);
 
-	double compute_averaged_loss(const ListListSharedArrayDouble1D &list_jump_times, const double end_time, const double decay, const SharedArrayDouble2D &theta);
+	void set_data(const ListListSharedArrayDouble1D &list_jump_times, const double end_time);
+
+	void set_packed_data(const SharedArrayDouble1D &timestamps, const SharedArrayLong2D &offsets, const double end_time);
+
+	void set_decay(const double decay);
+
+	void set_n_threads(const int n_threads);
+
+	void set_subset(ModelHawkesExpLeastSquares &model, const SharedArrayLong1D &repetitions);
+
+	void compute_weights();
+
+	double compute_averaged_loss(const SharedArrayDouble2D &theta);
+
+	SharedArrayDouble2D compute_averaged_grad(const SharedArrayDouble2D &theta);
+
+	double compute_averaged_loss_and_grad(const SharedArrayDouble2D &theta, SharedArrayDouble2D &grad);
+
+	SharedArrayDouble1D compute_rows_loss(const SharedArrayDouble2D &theta, const SharedArrayLong1D &rows);
 
-	SharedArrayDouble2D compute_averaged_grad(const ListListSharedArrayDouble1D &list_jump_times, const double end_time, const double decay, const SharedArrayDouble2D &theta);
+	SharedArrayDouble1D compute_rows_loss_and_grad(const SharedArrayDouble2D &theta, SharedArrayDouble2D &grad, const SharedArrayLong1D &rows);
 
-	SharedArrayDouble2D compute_averaged_hessian(const ListListSharedArrayDouble1D &list_jump_times, const double end_time, const double decay);
+	SharedArrayDouble2D compute_averaged_hessian();
 };
 
 
@@ -14,10 +14,12 @@ class ModelHawkesExpLeastSquaresSingle{
 	private:
 
 	size_t n_components;
-	ArrayInt1D N;
-	ArrayDouble1D I, I2;
+	ArrayDouble1D N, I, I2;
 	ArrayDouble2D V, W;
 	bool weights_computed;
+	double weights_end_time, weights_decay; // the weights are only valid for these values
+
+	bool has_weights(const double end_time, const double decay) const;
 
 	void compute_weights(const ListSharedArrayDouble1D &jump_times, const double end_time, const double decay);
 
@@ -37,6 +39,8 @@ class ModelHawkesExpLeastSquaresSingle{
 
 	SharedArrayDouble2D compute_grad(const ListSharedArrayDouble1D &jump_times, const double end_time, const double decay, const SharedArrayDouble2D &theta);
 
+	double compute_loss_and_grad(const ListSharedArrayDouble1D &jump_times, const double end_time, const double decay, const SharedArrayDouble2D &theta, SharedArrayDouble2D &grad);
+
 	SharedArrayDouble2D compute_hessian(const ListSharedArrayDouble1D &jump_times, const double end_time, const double decay);
 
 	friend class ModelHawkesExpLeastSquares;
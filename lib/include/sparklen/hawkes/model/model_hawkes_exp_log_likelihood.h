@@ -5,6 +5,9 @@
 #define LIB_INCLUDE_SPARKLEN_HAWKES_MODEL_MODEL_HAWKES_EXP_LOG_LIKELIHOOD_H_
 
 #include "sparklen/hawkes/model/model_hawkes_exp_log_likelihood_single.h"
+#include "sparklen/hawkes/model/packed_events.h"
+#include <memory>
+#include <mutex>
 #include <vector>
 
 
@@ -16,10 +19,31 @@ class ModelHawkesExpLogLikelihood{
 
 	size_t n_components;
 
-	std::vector<ModelHawkesExpLogLikelihoodSingle> multivariate_model;
+	ListListSharedArrayDouble1D list_jump_times; // shares the memory of the registered event times
+
+	double end_time;
+
+	double decay;
+
+	int n_threads;
+
+	std::vector<std::shared_ptr<ModelHawkesExpLogLikelihoodSingle>> multivariate_model; // shared with the models built on a subset of the repetitions
 
 	bool multivariate_model_computed; // when the model is agreagated, we can compute averaged loss and grad
 
+	std::mutex weights_mutex; // guards the lazy computation of the weights, the GIL being released
+
+	void reset_weights();
+
+	size_t get_n_blocks() const;
+
+	std::vector<size_t> all_rows() const;
+
+	std::vector<size_t> to_rows(const SharedArrayLong1D &rows) const;
+
+	// Evaluates the given rows only, the loss of each row is written in loss_rows when it is given
+	double compute_blocks(const SharedArrayDouble2D &theta, const std::vector<size_t> &rows, const bool with_loss, SharedArrayDouble2D *grad, const bool neg, double *loss_rows=nullptr);
+
 
 	public:
 
@@ -27,9 +51,27 @@ class ModelHawkesExpLogLikelihood{
 
 	ModelHawkesExpLogLikelihood(size_t n_rep, size_t n_comp);
 
-	double compute_averaged_loss(const ListListSharedArrayDouble1D &list_jump_times, const double end_time, const double decay, const SharedArrayDouble2D &theta, const bool neg);
+	void set_data(const ListListSharedArrayDouble1D &list_jump_times, const double end_time);
+
+	void set_packed_data(const SharedArrayDouble1D &timestamps, const SharedArrayLong2D &offsets, const double end_time);
+
+	void set_decay(const double decay);
+
+	void set_n_threads(const int n_threads);
+
+	void set_subset(ModelHawkesExpLogLikelihood &model, const SharedArrayLong1D &repetitions);
+
+	void compute_weights();
+
+	double compute_averaged_loss(const SharedArrayDouble2D &theta, const bool neg);
+
+	SharedArrayDouble2D compute_averaged_grad(const SharedArrayDouble2D &theta, const bool neg);
+
+	double compute_averaged_loss_and_grad(const SharedArrayDouble2D &theta, SharedArrayDouble2D &grad, const bool neg);
+
+	SharedArrayDouble1D compute_rows_loss(const SharedArrayDouble2D &theta, const SharedArrayLong1D &rows, const bool neg);
 
-	SharedArrayDouble2D compute_averaged_grad(const ListListSharedArrayDouble1D &list_jump_times, const double end_time, const double decay, const SharedArrayDouble2D &theta, const bool neg);
+	SharedArrayDouble1D compute_rows_loss_and_grad(const SharedArrayDouble2D &theta, SharedArrayDouble2D &grad, const SharedArrayLong1D &rows, const bool neg);
 };
 
 
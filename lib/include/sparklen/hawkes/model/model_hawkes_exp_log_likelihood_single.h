@@ -18,6 +18,9 @@ class ModelHawkesExpLogLikelihoodSingle{
 	ArrayDouble1D I;
 	ListArrayDouble2D Psi;
 	bool weights_computed;
+	double weights_end_time, weights_decay; // the weights are only valid for these values
+
+	bool has_weights(const double end_time, const double decay) const;
 
 	void compute_weights(const ListSharedArrayDouble1D &jump_times, const double end_time, const double decay);
 
@@ -25,6 +28,8 @@ class ModelHawkesExpLogLikelihoodSingle{
 
 	void compute_grad_i(const size_t i, const ListSharedArrayDouble1D &jump_times, const double end_time, const double decay, const SharedArrayDouble2D &theta, SharedArrayDouble2D &grad, const bool neg);
 
+	double compute_loss_and_grad_i(const size_t i, const ListSharedArrayDouble1D &jump_times, const double end_time, const double decay, const SharedArrayDouble2D &theta, SharedArrayDouble2D &grad, const bool neg);
+
 	public:
 
 	ModelHawkesExpLogLikelihoodSingle();
@@ -37,6 +42,8 @@ class ModelHawkesExpLogLikelihoodSingle{
 
 	SharedArrayDouble2D compute_grad(const ListSharedArrayDouble1D &jump_times, const double end_time, const double decay, const SharedArrayDouble2D &theta, const bool neg);
 
+	double compute_loss_and_grad(const ListSharedArrayDouble1D &jump_times, const double end_time, const double decay, const SharedArrayDouble2D &theta, SharedArrayDouble2D &grad, const bool neg);
+
 	friend class ModelHawkesExpLogLikelihood;
 };
 
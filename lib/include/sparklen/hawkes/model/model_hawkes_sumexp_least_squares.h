@@ -0,0 +1,76 @@
+// Author : Romain E. Lacoste
+// License : BSD-3-Clause
+
+#ifndef LIB_INCLUDE_SPARKLEN_HAWKES_MODEL_MODEL_HAWKES_SUMEXP_LEAST_SQUARES_H_
+#define LIB_INCLUDE_SPARKLEN_HAWKES_MODEL_MODEL_HAWKES_SUMEXP_LEAST_SQUARES_H_
+
+#include "sparklen/hawkes/model/model_hawkes_sumexp_least_squares_single.h"
+#include "sparklen/hawkes/model/packed_events.h"
+#include <memory>
+#include <mutex>
+#include <vector>
+
+
+class ModelHawkesSumExpLeastSquares{
+
+	private:
+
+	size_t n_repetitions;
+
+	size_t n_components;
+
+	size_t n_decays;
+
+	ListListSharedArrayDouble1D list_jump_times; // shares the memory of the registered event times
+
+	double end_time;
+
+	std::vector<double> decays;
+
+	int n_threads;
+
+	std::vector<std::shared_ptr<ModelHawkesSumExpLeastSquaresSingle>> multivariate_model; // shared with the models built on a subset of the repetitions
+
+	ModelHawkesSumExpLeastSquaresSingle pooled_model; // sufficient statistics averaged over the repetitions
+
+	bool multivariate_model_computed; // when the model is agreagated, we can compute averaged loss and grad
+
+	std::mutex weights_mutex; // guards the lazy computation of the weights, the GIL being released
+
+	void reset_weights();
+
+	void compute_pooled_weights();
+
+	public:
+
+	ModelHawkesSumExpLeastSquares();
+
+	ModelHawkesSumExpLeastSquares(size_t n_rep, size_t n_comp, size_t n_dec);
+
+	void set_data(const ListListSharedArrayDouble1D &list_jump_times, const double end_time);
+
+	void set_packed_data(const SharedArrayDouble1D &timestamps, const SharedArrayLong2D &offsets, const double end_time);
+
+	void set_decays(const SharedArrayDouble1D &decays);
+
+	void set_n_threads(const int n_threads);
+
+	void set_subset(ModelHawkesSumExpLeastSquares &model, const SharedArrayLong1D &repetitions);
+
+	void compute_weights();
+
+	double compute_averaged_loss(const SharedArrayDouble2D &theta);
+
+	SharedArrayDouble2D compute_averaged_grad(const SharedArrayDouble2D &theta);
+
+	double compute_averaged_loss_and_grad(const SharedArrayDouble2D &theta, SharedArrayDouble2D &grad);
+
+	SharedArrayDouble1D compute_rows_loss(const SharedArrayDouble2D &theta, const SharedArrayLong1D &rows);
+
+	SharedArrayDouble1D compute_rows_loss_and_grad(const SharedArrayDouble2D &theta, SharedArrayDouble2D &grad, const SharedArrayLong1D &rows);
+
+	SharedArrayDouble2D compute_averaged_hessian();
+};
+
+
+#endif /* LIB_INCLUDE_SPARKLEN_HAWKES_MODEL_MODEL_HAWKES_SUMEXP_LEAST_SQUARES_H_ */
@@ -0,0 +1,52 @@
+// Author : Romain E. Lacoste
+// License : BSD-3-Clause
+
+#ifndef LIB_INCLUDE_SPARKLEN_HAWKES_MODEL_MODEL_HAWKES_SUMEXP_LEAST_SQUARES_SINGLE_H_
+#define LIB_INCLUDE_SPARKLEN_HAWKES_MODEL_MODEL_HAWKES_SUMEXP_LEAST_SQUARES_SINGLE_H_
+
+#include "sparklen/array/array.h"
+#include "sparklen/array/array2D.h"
+#include "sparklen/array/sharedarray.h"
+#include "sparklen/array/sharedarray2D.h"
+#include <vector>
+
+// The features of the intensity are indexed by k = u*d + j, for the decay u and the component j,
+// so that the columns 1 + u*d, ..., (u+1)*d of theta hold the interaction matrix of the decay u
+class ModelHawkesSumExpLeastSquaresSingle{
+
+	private:
+
+	size_t n_components;
+	size_t n_decays;
+	ArrayDouble1D N, I;
+	ArrayDouble2D V, H; // H is the Gram matrix of the features over [0, T]
+	bool weights_computed;
+	double weights_end_time;
+	std::vector<double> weights_decays; // the weights are only valid for these values
+
+	bool has_weights(const double end_time, const std::vector<double> &decays) const;
+
+	void compute_weights(const ListSharedArrayDouble1D &jump_times, const double end_time, const std::vector<double> &decays);
+
+	double compute_loss_i(const size_t i, const double end_time, const SharedArrayDouble2D &theta);
+
+	void compute_grad_i(const size_t i, const double end_time, const SharedArrayDouble2D &theta, SharedArrayDouble2D &grad);
+
+	SharedArrayDouble2D compute_hessian(const double end_time);
+
+	public:
+
+	ModelHawkesSumExpLeastSquaresSingle();
+
+	ModelHawkesSumExpLeastSquaresSingle(size_t n, size_t n_dec);
+
+	size_t get_n_components();
+
+	size_t get_n_decays();
+
+	friend class ModelHawkesSumExpLeastSquares;
+
+};
+
+
+#endif /* LIB_INCLUDE_SPARKLEN_HAWKES_MODEL_MODEL_HAWKES_SUMEXP_LEAST_SQUARES_SINGLE_H_ */
@@ -0,0 +1,32 @@
+// Author : Romain E. Lacoste
+// License : BSD-3-Clause
+
+#ifndef LIB_INCLUDE_SPARKLEN_HAWKES_MODEL_PACKED_EVENTS_H_
+#define LIB_INCLUDE_SPARKLEN_HAWKES_MODEL_PACKED_EVENTS_H_
+
+#include "sparklen/array/sharedarray.h"
+#include "sparklen/array/sharedarray2D.h"
+
+
+// Split a packed layout into per-repetition, per-component views of the timestamps buffer.
+// The events of component j in repetition i are timestamps[offsets(i, j) : offsets(i, j+1)].
+inline ListListSharedArrayDouble1D unpack_events(const SharedArrayDouble1D &timestamps, const SharedArrayLong2D &offsets){
+
+	size_t n_repetitions = offsets.rows();
+	size_t n_components = offsets.cols() - 1;
+
+	ListListSharedArrayDouble1D list_jump_times(n_repetitions);
+	for (size_t rep=0; rep<n_repetitions; ++rep){
+		list_jump_times[rep].resize(n_components);
+		for (size_t j=0; j<n_components; ++j){
+			size_t start = offsets(rep, j);
+			size_t end = offsets(rep, j+1);
+			list_jump_times[rep][j] = SharedArrayDouble1D(end-start, timestamps.data()+start);
+			list_jump_times[rep][j].setPythonOwner(true);
+		}
+	}
+	return list_jump_times;
+}
+
+
+#endif /* LIB_INCLUDE_SPARKLEN_HAWKES_MODEL_PACKED_EVENTS_H_ */
@@ -0,0 +1,75 @@
+// Author : Romain E. Lacoste
+// License : BSD-3-Clause
+
+#ifndef LIB_INCLUDE_SPARKLEN_HAWKES_SIMULATION_SIMU_HAWKES_EXP_H_
+#define LIB_INCLUDE_SPARKLEN_HAWKES_SIMULATION_SIMU_HAWKES_EXP_H_
+
+#include "sparklen/array/sharedarray.h"
+#include "sparklen/array/sharedarray2D.h"
+#include <cstdint>
+#include <random>
+#include <vector>
+
+
+class SimuHawkesExp{
+
+	private:
+
+	size_t n_components;
+
+	std::vector<double> mu;
+
+	std::vector<double> mu_cdf; // cumulative exogenous intensities, to draw the component of an immigrant
+
+	double decay;
+
+	double end_time;
+
+	std::vector<double> branching; // total interaction of each source component over its targets
+
+	std::vector<std::vector<size_t>> targets; // components excited by each source component, with a positive interaction
+
+	std::vector<std::vector<double>> targets_alpha; // the corresponding interactions
+
+	std::vector<std::vector<double>> targets_cdf; // and their cumulative shares, to draw the component of an offspring
+
+	std::mt19937_64 generator; // reseeded for each path, the distributions being computed from its raw output so that the streams do not depend on the standard library
+
+	std::vector<double> timestamps; // packed buffer of the simulated paths
+
+	std::vector<std::int64_t> offsets; // offset table of the simulated paths, row by row
+
+	double uniform();
+
+	double exponential(const double rate);
+
+	std::int64_t poisson(double mean);
+
+	void simulate_cluster_path(const double start_time, const double *state, std::vector<double> &times, std::vector<size_t> &components);
+
+	void simulate_ogata_path(const double start_time, const double *state, std::vector<double> &times, std::vector<size_t> &components);
+
+	void simulate_paths(const SharedArrayLong1D &seeds, const double start_time, const SharedArrayDouble2D *states, const bool ogata);
+
+	void pack_path(const std::vector<double> &times, const std::vector<size_t> &components, const bool time_ordered);
+
+	public:
+
+	SimuHawkesExp(const SharedArrayDouble1D &mu, const SharedArrayLong1D &alpha_indptr, const SharedArrayLong1D &alpha_indices,
+				  const SharedArrayDouble1D &alpha_data, const double decay, const double end_time);
+
+	void simulate_cluster(const SharedArrayLong1D &seeds);
+
+	void simulate_ogata(const SharedArrayLong1D &seeds);
+
+	void extend_cluster(const SharedArrayLong1D &seeds, const double start_time, const SharedArrayDouble2D &states);
+
+	void extend_ogata(const SharedArrayLong1D &seeds, const double start_time, const SharedArrayDouble2D &states);
+
+	SharedArrayDouble1D get_timestamps();
+
+	SharedArrayLong2D get_offsets();
+};
+
+
+#endif /* LIB_INCLUDE_SPARKLEN_HAWKES_SIMULATION_SIMU_HAWKES_EXP_H_ */
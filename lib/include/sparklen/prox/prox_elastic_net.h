@@ -24,6 +24,8 @@ class ProxElasticNet{
 	ProxElasticNet(double l1_r, double pen_const, size_t st, size_t ed, bool pos);
 
 	void apply(SharedArrayDouble2D &x, const double step_size);
+
+	void apply_rows(SharedArrayDouble2D &x, const SharedArrayDouble1D &step_sizes, const SharedArrayLong1D &rows);
 };
 
 #endif /* LIB_INCLUDE_SPARKLEN_PROX_PROX_ELASTIC_NET_H_ */
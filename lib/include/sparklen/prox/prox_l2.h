@@ -23,6 +23,8 @@ class ProxL2{
 	ProxL2(double pen_const, size_t st, size_t ed, bool pos);
 
 	void apply(SharedArrayDouble2D &x, const double step_size);
+
+	void apply_rows(SharedArrayDouble2D &x, const SharedArrayDouble1D &step_sizes, const SharedArrayLong1D &rows);
 };
 
 #endif /* LIB_INCLUDE_SPARKLEN_PROX_PROX_L2_H_ */
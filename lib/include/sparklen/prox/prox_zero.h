@@ -23,6 +23,8 @@ class ProxZero{
 	ProxZero(double pen_const, size_t st, size_t ed, bool pos);
 
 	void apply(SharedArrayDouble2D &x, const double step_size);
+
+	void apply_rows(SharedArrayDouble2D &x, const SharedArrayDouble1D &step_sizes, const SharedArrayLong1D &rows);
 };
 
 #endif /* LIB_INCLUDE_SPARKLEN_PROX_PROX_ZERO_H_ */
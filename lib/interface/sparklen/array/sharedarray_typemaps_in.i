@@ -58,6 +58,55 @@
 }
 
 
+%typemap(in) (SharedArrayLong1D &) (SharedArrayLong1D res) {
+    if (!PyArray_Check($input)) {
+        PyErr_SetString(PyExc_TypeError, "The input argument should be a NumPy Array");
+        SWIG_fail;
+    }
+    if (PyArray_TYPE((PyArrayObject*)$input) != NPY_INT64) {
+        PyErr_SetString(PyExc_TypeError, "The data type of the NumPy Array should be int64");
+        SWIG_fail;
+    }
+	if (PyArray_NDIM((PyArrayObject*)$input) != 1) {
+        PyErr_SetString(PyExc_ValueError, "The Expected Numpy Array should be 1-dimensional");
+        SWIG_fail;
+    }
+    // Collect NumPy Array features
+    npy_intp size = PyArray_SIZE((PyArrayObject*)$input);
+    std::int64_t *data = static_cast<std::int64_t*>(PyArray_DATA((PyArrayObject*)$input));
+
+    // Instantiate SharedArray from NumPy array features
+    res = SharedArrayLong1D(size, data);
+    res.setPythonOwner(true);
+    $1 = &res;
+}
+
+
+%typemap(in) (SharedArrayLong2D &) (SharedArrayLong2D res) {
+    if (!PyArray_Check($input)) {
+        PyErr_SetString(PyExc_TypeError, "The input argument should be a NumPy Array");
+        SWIG_fail;
+    }
+    if (PyArray_TYPE((PyArrayObject*)$input) != NPY_INT64) {
+        PyErr_SetString(PyExc_TypeError, "The data type of the NumPy Array should be int64");
+        SWIG_fail;
+    }
+	if (PyArray_NDIM((PyArrayObject*)$input) != 2) {
+        PyErr_SetString(PyExc_ValueError, "The Expected Numpy Array should be 2-dimensional");
+        SWIG_fail;
+    }
+    // Collect NumPy Array features
+    npy_intp n_rows = PyArray_DIM((PyArrayObject*)$input, 0);
+    npy_intp n_cols = PyArray_DIM((PyArrayObject*)$input, 1);
+    std::int64_t *data = static_cast<std::int64_t*>(PyArray_DATA((PyArrayObject*)$input));
+
+    // Instantiate SharedArray2D from NumPy array features
+    res = SharedArrayLong2D(n_rows, n_cols, data);
+    res.setPythonOwner(true);
+    $1 = &res;
+}
+
+
 //////////////////////////////////////////////////////////////////
 // Python List of Numpy Array ---> C++ Vector of SharedArray<T> //
 //////////////////////////////////////////////////////////////////
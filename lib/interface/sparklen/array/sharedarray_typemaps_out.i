@@ -89,6 +89,45 @@
 }
 
 
+%typemap(out) SharedArrayLong2D {
+    SharedArrayLong2D arr = $1;
+
+    // Retrieve dimensions and data from the SharedArray2D<std::int64_t>
+    size_t n_rows = arr.rows();
+    size_t n_cols = arr.cols();
+    std::int64_t* data = arr.data();
+
+    if (!data) {
+        PyErr_SetString(PyExc_RuntimeError, "SharedArray2D has no underlying data");
+        SWIG_fail;
+    }
+    // Create a NumPy array from the data
+    npy_intp dims[2] = { static_cast<npy_intp>(n_rows), static_cast<npy_intp>(n_cols) };
+    PyObject* npArray = PyArray_SimpleNewFromData(2, dims, NPY_INT64, data);
+    if (!npArray) {
+        PyErr_SetString(PyExc_RuntimeError, "Failed to create NumPy array");
+        SWIG_fail;
+    }
+    // Handle ownership and manage data transfer to Python
+    if (arr.isPythonOwner()) {
+        if (arr.own()) {
+            // C++ owns the data; transfer ownership to Python and release C++ ownership
+            PyArray_ENABLEFLAGS(reinterpret_cast<PyArrayObject*>(npArray), NPY_ARRAY_OWNDATA);
+            arr.clear(); // Clear the internal state to reflect Python ownership
+        } else {
+            // Python owns the data; ensure NumPy takes ownership correctly
+            PyArray_ENABLEFLAGS(reinterpret_cast<PyArrayObject*>(npArray), NPY_ARRAY_OWNDATA);
+        }
+    } else {
+        // C++ is the owner; transfer ownership to Python
+        PyArray_ENABLEFLAGS(reinterpret_cast<PyArrayObject*>(npArray), NPY_ARRAY_OWNDATA);
+        arr.clear(); // Clear the internal state to release C++ ownership
+    }
+    // Set the result to the NumPy array
+    $result = npArray;
+}
+
+
 //////////////////////////////////////////////////////////////////
 // C++ Vector of SharedArray<T> ---> Python List of Numpy Array //
 //////////////////////////////////////////////////////////////////
@@ -0,0 +1,18 @@
+// Author : Romain E. Lacoste
+// License : BSD-3-Clause
+
+%module(threads="1") hawkes_diagnostics
+
+%{
+#define SWIG_FILE_WITH_INIT
+#include "sparklen/hawkes/diagnostics/hawkes_exp_compensator.h"
+%}
+
+// The GIL is only released around the sweeps of the paths, once the inputs have been marshalled
+%nothread;
+%thread HawkesExpCompensator::compute_at_events;
+%thread HawkesExpCompensator::compute_at_times;
+
+%include sparklen/array/array_module.i
+
+%include "sparklen/hawkes/diagnostics/hawkes_exp_compensator.h"
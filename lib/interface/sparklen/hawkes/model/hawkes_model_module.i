@@ -1,7 +1,7 @@
 // Author : Romain E. Lacoste
 // License : BSD-3-Clause
 
-%module hawkes_model
+%module(threads="1") hawkes_model
 
 %{
 #define SWIG_FILE_WITH_INIT
@@ -9,13 +9,51 @@
 #include "sparklen/hawkes/model/model_hawkes_exp_least_squares.h"
 #include "sparklen/hawkes/model/model_hawkes_exp_log_likelihood_single.h"
 #include "sparklen/hawkes/model/model_hawkes_exp_log_likelihood.h"
+#include "sparklen/hawkes/model/model_hawkes_sumexp_least_squares.h"
+#include "sparklen/hawkes/model/model_hawkes_sumexp_log_likelihood.h"
 %}
 
+// The GIL is only released around the numerical kernels, once the inputs have been marshalled,
+// so that Python threads can evaluate models concurrently
+%nothread;
+%thread ModelHawkesExpLeastSquares::compute_weights;
+%thread ModelHawkesExpLeastSquares::set_subset;
+%thread ModelHawkesExpLeastSquares::compute_averaged_loss;
+%thread ModelHawkesExpLeastSquares::compute_averaged_grad;
+%thread ModelHawkesExpLeastSquares::compute_averaged_loss_and_grad;
+%thread ModelHawkesExpLeastSquares::compute_rows_loss;
+%thread ModelHawkesExpLeastSquares::compute_rows_loss_and_grad;
+%thread ModelHawkesExpLeastSquares::compute_averaged_hessian;
+%thread ModelHawkesExpLogLikelihood::compute_weights;
+%thread ModelHawkesExpLogLikelihood::set_subset;
+%thread ModelHawkesExpLogLikelihood::compute_averaged_loss;
+%thread ModelHawkesExpLogLikelihood::compute_averaged_grad;
+%thread ModelHawkesExpLogLikelihood::compute_averaged_loss_and_grad;
+%thread ModelHawkesExpLogLikelihood::compute_rows_loss;
+%thread ModelHawkesExpLogLikelihood::compute_rows_loss_and_grad;
+%thread ModelHawkesSumExpLeastSquares::compute_weights;
+%thread ModelHawkesSumExpLeastSquares::set_subset;
+%thread ModelHawkesSumExpLeastSquares::compute_averaged_loss;
+%thread ModelHawkesSumExpLeastSquares::compute_averaged_grad;
+%thread ModelHawkesSumExpLeastSquares::compute_averaged_loss_and_grad;
+%thread ModelHawkesSumExpLeastSquares::compute_rows_loss;
+%thread ModelHawkesSumExpLeastSquares::compute_rows_loss_and_grad;
+%thread ModelHawkesSumExpLeastSquares::compute_averaged_hessian;
+%thread ModelHawkesSumExpLogLikelihood::compute_weights;
+%thread ModelHawkesSumExpLogLikelihood::set_subset;
+%thread ModelHawkesSumExpLogLikelihood::compute_averaged_loss;
+%thread ModelHawkesSumExpLogLikelihood::compute_averaged_grad;
+%thread ModelHawkesSumExpLogLikelihood::compute_averaged_loss_and_grad;
+%thread ModelHawkesSumExpLogLikelihood::compute_rows_loss;
+%thread ModelHawkesSumExpLogLikelihood::compute_rows_loss_and_grad;
+
 %include sparklen/array/array_module.i
 
 %include "sparklen/hawkes/model/model_hawkes_exp_least_squares_single.h"
 %include "sparklen/hawkes/model/model_hawkes_exp_least_squares.h"
 %include "sparklen/hawkes/model/model_hawkes_exp_log_likelihood_single.h"
-%include "sparklen/hawkes/model/model_hawkes_exp_log_likelihood.h"         
+%include "sparklen/hawkes/model/model_hawkes_exp_log_likelihood.h"
+%include "sparklen/hawkes/model/model_hawkes_sumexp_least_squares.h"
+%include "sparklen/hawkes/model/model_hawkes_sumexp_log_likelihood.h"         
 
   
\ No newline at end of file
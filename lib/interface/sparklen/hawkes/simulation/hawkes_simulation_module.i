@@ -0,0 +1,20 @@
+// Author : Romain E. Lacoste
+// License : BSD-3-Clause
+
+%module(threads="1") hawkes_simulation
+
+%{
+#define SWIG_FILE_WITH_INIT
+#include "sparklen/hawkes/simulation/simu_hawkes_exp.h"
+%}
+
+// The GIL is only released around the simulation of the paths, once the parameters have been marshalled
+%nothread;
+%thread SimuHawkesExp::simulate_cluster;
+%thread SimuHawkesExp::simulate_ogata;
+%thread SimuHawkesExp::extend_cluster;
+%thread SimuHawkesExp::extend_ogata;
+
+%include sparklen/array/array_module.i
+
+%include "sparklen/hawkes/simulation/simu_hawkes_exp.h"
@@ -1,7 +1,7 @@
 // Author : Romain E. Lacoste
 // License : BSD-3-Clause
 
-%module prox
+%module(threads="1") prox
 
 %{
 #define SWIG_FILE_WITH_INIT
@@ -11,6 +11,17 @@
 #include "sparklen/prox/prox_elastic_net.h"
 %}
 
+// The GIL is only released around the proximal kernels, once the inputs have been marshalled
+%nothread;
+%thread ProxZero::apply;
+%thread ProxZero::apply_rows;
+%thread ProxL1::apply;
+%thread ProxL1::apply_rows;
+%thread ProxL2::apply;
+%thread ProxL2::apply_rows;
+%thread ProxElasticNet::apply;
+%thread ProxElasticNet::apply_rows;
+
 %include sparklen/array/array_module.i
 
 %include "sparklen/prox/prox_zero.h"   
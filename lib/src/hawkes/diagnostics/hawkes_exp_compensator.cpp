@@ -0,0 +1,181 @@
+// Author : Romain E. Lacoste
+// License : BSD-3-Clause
+
+#include "sparklen/hawkes/diagnostics/hawkes_exp_compensator.h"
+#include <algorithm>
+#include <cmath>
+
+
+namespace {
+
+// Interaction part of the compensators of all the components along a path, swept event by event.
+// The compensator of the j-th component is mu_j*t + total[j] - sum_u excitation[u*d+j](t), where
+// total[j] sums the interactions of the past events and excitation[u*d+j] their exponential
+// kernels of decay u, stored at its last update time so that an event only updates its targets
+class CompensatorState{
+
+	private:
+
+	size_t n_components;
+
+	const std::vector<double> &decays;
+
+	std::vector<double> total;
+
+	std::vector<double> excitation;
+
+	std::vector<double> updated; // time of the last update of each excitation
+
+	public:
+
+	CompensatorState(size_t n_components, const std::vector<double> &decays) : n_components(n_components), decays(decays),
+		total(n_components, 0.), excitation(n_components*decays.size(), 0.), updated(n_components*decays.size(), 0.) {}
+
+	double interaction(const size_t j, const double t) const {
+		double value = total[j];
+		for (size_t u=0; u<decays.size(); ++u){
+			const size_t k = u*n_components+j;
+			value -= excitation[k]*std::exp(-decays[u]*(t-updated[k]));
+		}
+		return value;
+	}
+
+	void add(const size_t u, const size_t j, const double alpha, const double t){
+		const size_t k = u*n_components+j;
+		total[j] += alpha;
+		excitation[k] = excitation[k]*std::exp(-decays[u]*(t-updated[k])) + alpha;
+		updated[k] = t;
+	}
+};
+
+}
+
+
+// Constructor, the interactions being given in compressed sparse column format,
+// the column u*d+j' holding the interactions of the j'-th component for the u-th decay
+HawkesExpCompensator::HawkesExpCompensator(const SharedArrayDouble1D &mu, const SharedArrayLong1D &alpha_indptr, const SharedArrayLong1D &alpha_indices,
+										   const SharedArrayDouble1D &alpha_data, const SharedArrayDouble1D &decays){
+
+	n_components = mu.size();
+	n_decays = decays.size();
+	n_threads = 1;
+
+	this->mu = std::vector<double>(mu.data(), mu.data()+n_components);
+	this->decays = std::vector<double>(decays.data(), decays.data()+n_decays);
+
+	targets = std::vector<std::vector<size_t>>(n_components*n_decays);
+	targets_alpha = std::vector<std::vector<double>>(n_components*n_decays);
+	for (size_t k=0; k<n_components*n_decays; ++k){
+		for (std::int64_t l=alpha_indptr[k]; l<alpha_indptr[k+1]; ++l){
+			if (alpha_data[l] != 0){
+				targets[k].push_back(static_cast<size_t>(alpha_indices[l]));
+				targets_alpha[k].push_back(alpha_data[l]);
+			}
+		}
+	}
+}
+
+void HawkesExpCompensator::set_n_threads(const int n_threads){
+	this->n_threads = (n_threads > 0) ? n_threads : 1;
+}
+
+std::vector<std::pair<double, size_t>> HawkesExpCompensator::merge_path(const SharedArrayDouble1D &timestamps, const SharedArrayLong2D &offsets, const size_t rep) const{
+	// Single time-sorted stream of the events of the path, each given by its time and its position in the buffer
+	std::vector<std::pair<double, size_t>> events;
+	events.reserve(offsets(rep, n_components) - offsets(rep, 0));
+	for (std::int64_t h=offsets(rep, 0); h<offsets(rep, n_components); ++h){
+		events.push_back(std::make_pair(timestamps[h], static_cast<size_t>(h)));
+	}
+	std::sort(events.begin(), events.end());
+	return events;
+}
+
+SharedArrayDouble1D HawkesExpCompensator::compute_at_events(const SharedArrayDouble1D &timestamps, const SharedArrayLong2D &offsets){
+
+	const size_t n_repetitions = offsets.rows();
+	SharedArrayDouble1D result(timestamps.size());
+	double *values = result.data();
+
+	// The repetitions are independent, each thread only writes the values of the events of its own paths
+	#pragma omp parallel for num_threads(n_threads) schedule(dynamic)
+	for (std::int64_t rep=0; rep<static_cast<std::int64_t>(n_repetitions); ++rep){
+
+		const std::vector<std::pair<double, size_t>> events = merge_path(timestamps, offsets, rep);
+
+		// Component of each event, from its position in the buffer
+		std::vector<size_t> components(events.size());
+		for (size_t j=0; j<n_components; ++j){
+			for (std::int64_t h=offsets(rep, j); h<offsets(rep, j+1); ++h){
+				components[h-offsets(rep, 0)] = j;
+			}
+		}
+
+		CompensatorState state(n_components, decays);
+		size_t first = 0;
+		while (first < events.size()){
+			const double t = events[first].first;
+			// Events sharing the same time only see the strictly earlier ones
+			size_t last = first;
+			while (last < events.size() && events[last].first == t){
+				const size_t j = components[events[last].second-offsets(rep, 0)];
+				values[events[last].second] = mu[j]*t + state.interaction(j, t);
+				++last;
+			}
+			for (size_t h=first; h<last; ++h){
+				const size_t source = components[events[h].second-offsets(rep, 0)];
+				for (size_t u=0; u<n_decays; ++u){
+					const size_t k = u*n_components+source;
+					for (size_t l=0; l<targets[k].size(); ++l){
+						state.add(u, targets[k][l], targets_alpha[k][l], t);
+					}
+				}
+			}
+			first = last;
+		}
+	}
+	return result;
+}
+
+SharedArrayDouble2D HawkesExpCompensator::compute_at_times(const SharedArrayDouble1D &timestamps, const SharedArrayLong2D &offsets, const SharedArrayDouble1D &times){
+
+	// The query times are sorted, the values of the i-th path fill the rows i*m to (i+1)*m
+	const size_t n_repetitions = offsets.rows();
+	const size_t n_times = times.size();
+	SharedArrayDouble2D result(n_repetitions*n_times, n_components);
+	double *values = result.data();
+
+	#pragma omp parallel for num_threads(n_threads) schedule(dynamic)
+	for (std::int64_t rep=0; rep<static_cast<std::int64_t>(n_repetitions); ++rep){
+
+		const std::vector<std::pair<double, size_t>> events = merge_path(timestamps, offsets, rep);
+
+		std::vector<size_t> components(events.size());
+		for (size_t j=0; j<n_components; ++j){
+			for (std::int64_t h=offsets(rep, j); h<offsets(rep, j+1); ++h){
+				components[h-offsets(rep, 0)] = j;
+			}
+		}
+
+		CompensatorState state(n_components, decays);
+		size_t next = 0;
+		for (size_t q=0; q<n_times; ++q){
+			const double t = times[q];
+			// The compensator is continuous, the events at the query time do not contribute
+			for (; next<events.size() && events[next].first < t; ++next){
+				const double event_time = events[next].first;
+				const size_t source = components[events[next].second-offsets(rep, 0)];
+				for (size_t u=0; u<n_decays; ++u){
+					const size_t k = u*n_components+source;
+					for (size_t l=0; l<targets[k].size(); ++l){
+						state.add(u, targets[k][l], targets_alpha[k][l], event_time);
+					}
+				}
+			}
+			double *row = values + (rep*n_times+q)*n_components;
+			for (size_t j=0; j<n_components; ++j){
+				row[j] = mu[j]*t + state.interaction(j, t);
+			}
+		}
+	}
+	return result;
+}
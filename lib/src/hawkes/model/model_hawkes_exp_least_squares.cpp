@@ -9,57 +9,219 @@
 ModelHawkesExpLeastSquares::ModelHawkesExpLeastSquares(){
 	n_repetitions = 0;
 	n_components = 0;
-	multivariate_model = std::vector<ModelHawkesExpLeastSquaresSingle>(n_repetitions);
-	for (size_t rep=0; rep<n_repetitions; ++rep){
-		multivariate_model[rep] = ModelHawkesExpLeastSquaresSingle(n_components);
-	}
-	multivariate_model_computed = false;
-
+	end_time = 0.;
+	decay = 0.;
+	n_threads = 1;
+	reset_weights();
 }
 ModelHawkesExpLeastSquares::ModelHawkesExpLeastSquares(size_t n_rep, size_t n_comp){
 
 	n_repetitions = n_rep;
 	n_components = n_comp;
-	multivariate_model = std::vector<ModelHawkesExpLeastSquaresSingle>(n_repetitions);
+	end_time = 0.;
+	decay = 0.;
+	n_threads = 1;
+	reset_weights();
+}
+
+void ModelHawkesExpLeastSquares::reset_weights(){
+	multivariate_model = std::vector<std::shared_ptr<ModelHawkesExpLeastSquaresSingle>>(n_repetitions);
 	for (size_t rep=0; rep<n_repetitions; ++rep){
-		multivariate_model[rep] = ModelHawkesExpLeastSquaresSingle(n_components);
+		multivariate_model[rep] = std::make_shared<ModelHawkesExpLeastSquaresSingle>(n_components);
 	}
+	pooled_model = ModelHawkesExpLeastSquaresSingle(n_components);
 	multivariate_model_computed = false;
 }
 
-double ModelHawkesExpLeastSquares::compute_averaged_loss(const ListListSharedArrayDouble1D &list_jump_times, const double end_time, const double decay, const SharedArrayDouble2D &theta){
+void ModelHawkesExpLeastSquares::set_data(const ListListSharedArrayDouble1D &list_jump_times, const double end_time){
 
-	double averaged_loss{0.};
+	// The shared arrays only reference the event times, no copy is made
+	this->list_jump_times = list_jump_times;
+	this->end_time = end_time;
+	n_repetitions = list_jump_times.size();
+	n_components = (n_repetitions > 0) ? list_jump_times[0].size() : 0;
+	reset_weights();
+}
 
-	for (size_t rep=0; rep<n_repetitions; ++rep){
-		averaged_loss += multivariate_model[rep].compute_loss(list_jump_times[rep], end_time, decay, theta);
+void ModelHawkesExpLeastSquares::set_packed_data(const SharedArrayDouble1D &timestamps, const SharedArrayLong2D &offsets, const double end_time){
+	set_data(unpack_events(timestamps, offsets), end_time);
+}
+
+void ModelHawkesExpLeastSquares::set_decay(const double decay){
+	if (decay != this->decay){
+		this->decay = decay;
+		reset_weights();
 	}
-	averaged_loss /= n_repetitions;
-	return averaged_loss;
 }
 
-SharedArrayDouble2D ModelHawkesExpLeastSquares::compute_averaged_grad(const ListListSharedArrayDouble1D &list_jump_times, const double end_time, const double decay, const SharedArrayDouble2D &theta){
+void ModelHawkesExpLeastSquares::set_n_threads(const int n_threads){
+	this->n_threads = (n_threads > 0) ? n_threads : 1;
+}
+
+void ModelHawkesExpLeastSquares::set_subset(ModelHawkesExpLeastSquares &model, const SharedArrayLong1D &repetitions){
 
-	SharedArrayDouble2D averaged_grad(n_components, n_components+1);
+	// The weights of the repetitions are computed once by the full model, then shared without copy,
+	// so that the models on several subsets never write them concurrently
+	model.compute_weights();
 
+	std::lock_guard<std::mutex> lock(weights_mutex);
+	n_repetitions = repetitions.size();
+	n_components = model.n_components;
+	decay = model.decay;
+	end_time = model.end_time;
+	// The indices are checked on the Python side
+	list_jump_times = ListListSharedArrayDouble1D(n_repetitions);
+	multivariate_model = std::vector<std::shared_ptr<ModelHawkesExpLeastSquaresSingle>>(n_repetitions);
 	for (size_t rep=0; rep<n_repetitions; ++rep){
-		averaged_grad.add(multivariate_model[rep].compute_grad(list_jump_times[rep], end_time, decay, theta));
+		list_jump_times[rep] = model.list_jump_times[repetitions[rep]];
+		multivariate_model[rep] = model.multivariate_model[repetitions[rep]];
 	}
-	averaged_grad /= n_repetitions;
+	pooled_model = ModelHawkesExpLeastSquaresSingle(n_components);
+	multivariate_model_computed = false;
+}
+
+void ModelHawkesExpLeastSquares::compute_weights(){
 
-	return averaged_grad;
+	// Several Python threads may evaluate the same model, the first one computes the weights
+	std::lock_guard<std::mutex> lock(weights_mutex);
+	if (!multivariate_model_computed){
+		compute_pooled_weights();
+	}
 }
 
-SharedArrayDouble2D ModelHawkesExpLeastSquares::compute_averaged_hessian(const ListListSharedArrayDouble1D &list_jump_times, const double end_time, const double decay){
+void ModelHawkesExpLeastSquares::compute_pooled_weights(){
 
-	SharedArrayDouble2D averaged_hessian(n_components+1, n_components+1);
+	// The least-squares contrast is quadratic in theta and linear in the weights,
+	// so averaging the losses over the repetitions amounts to averaging the weights
+	pooled_model = ModelHawkesExpLeastSquaresSingle(n_components);
 
+	// The repetitions are independent, each thread only writes the weights of its own models
+	const long long n_rep = static_cast<long long>(n_repetitions);
+	#pragma omp parallel for num_threads(n_threads) schedule(dynamic)
+	for (long long rep=0; rep<n_rep; ++rep){
+		ModelHawkesExpLeastSquaresSingle &model = *multivariate_model[rep];
+		if (!model.has_weights(end_time, decay)){
+			model.compute_weights(list_jump_times[rep], end_time, decay);
+		}
+	}
+
+	// The pooling is kept sequential so that the summation order does not depend on the threads
 	for (size_t rep=0; rep<n_repetitions; ++rep){
-		averaged_hessian.add(multivariate_model[rep].compute_hessian(list_jump_times[rep], end_time, decay));
+		ModelHawkesExpLeastSquaresSingle &model = *multivariate_model[rep];
+		pooled_model.N.add(model.N);
+		pooled_model.I.add(model.I);
+		pooled_model.I2.add(model.I2);
+		pooled_model.V.add(model.V);
+		pooled_model.W.add(model.W);
 	}
-	averaged_hessian /= n_repetitions;
+	pooled_model.N /= n_repetitions;
+	pooled_model.I /= n_repetitions;
+	pooled_model.I2 /= n_repetitions;
+	pooled_model.V /= n_repetitions;
+	pooled_model.W /= n_repetitions;
+
+	pooled_model.weights_end_time = end_time;
+	pooled_model.weights_decay = decay;
+	pooled_model.weights_computed = true;
+	multivariate_model_computed = true;
+}
+
+double ModelHawkesExpLeastSquares::compute_averaged_loss(const SharedArrayDouble2D &theta){
 
-	return averaged_hessian;
+	compute_weights();
+
+	// The rows of theta are decoupled, their contributions are summed afterwards in a fixed order
+	std::vector<double> loss_rows(n_components, 0.);
+	const long long n_comp = static_cast<long long>(n_components);
+	#pragma omp parallel for num_threads(n_threads) schedule(static)
+	for (long long i=0; i<n_comp; ++i){
+		loss_rows[i] = pooled_model.compute_loss_i(i, list_jump_times[0], end_time, decay, theta);
+	}
+
+	double loss{0.};
+	for (size_t i=0; i<n_components; ++i){
+		loss += loss_rows[i];
+	}
+	loss /= end_time;
+	return loss;
 }
 
+SharedArrayDouble2D ModelHawkesExpLeastSquares::compute_averaged_grad(const SharedArrayDouble2D &theta){
+
+	compute_weights();
+
+	SharedArrayDouble2D grad(n_components, n_components+1);
 
+	const long long n_comp = static_cast<long long>(n_components);
+	#pragma omp parallel for num_threads(n_threads) schedule(static)
+	for (long long i=0; i<n_comp; ++i){
+		pooled_model.compute_grad_i(i, list_jump_times[0], end_time, decay, theta, grad);
+	}
+	grad /= end_time;
+	return grad;
+}
+
+double ModelHawkesExpLeastSquares::compute_averaged_loss_and_grad(const SharedArrayDouble2D &theta, SharedArrayDouble2D &grad){
+
+	compute_weights();
+
+	std::vector<double> loss_rows(n_components, 0.);
+	const long long n_comp = static_cast<long long>(n_components);
+	#pragma omp parallel for num_threads(n_threads) schedule(static)
+	for (long long i=0; i<n_comp; ++i){
+		loss_rows[i] = pooled_model.compute_loss_i(i, list_jump_times[0], end_time, decay, theta);
+		pooled_model.compute_grad_i(i, list_jump_times[0], end_time, decay, theta, grad);
+	}
+
+	double loss{0.};
+	for (size_t i=0; i<n_components; ++i){
+		loss += loss_rows[i];
+	}
+	loss /= end_time;
+	grad /= end_time;
+	return loss;
+}
+
+SharedArrayDouble2D ModelHawkesExpLeastSquares::compute_averaged_hessian(){
+
+	compute_weights();
+
+	return pooled_model.compute_hessian(list_jump_times[0], end_time, decay);
+}
+
+SharedArrayDouble1D ModelHawkesExpLeastSquares::compute_rows_loss(const SharedArrayDouble2D &theta, const SharedArrayLong1D &rows){
+
+	compute_weights();
+
+	// The indices are checked on the Python side
+	SharedArrayDouble1D loss_rows(rows.size());
+	const long long n_rows = static_cast<long long>(rows.size());
+	#pragma omp parallel for num_threads(n_threads) schedule(static)
+	for (long long r=0; r<n_rows; ++r){
+		loss_rows[r] = pooled_model.compute_loss_i(rows[r], list_jump_times[0], end_time, decay, theta)/end_time;
+	}
+	return loss_rows;
+}
+
+SharedArrayDouble1D ModelHawkesExpLeastSquares::compute_rows_loss_and_grad(const SharedArrayDouble2D &theta, SharedArrayDouble2D &grad, const SharedArrayLong1D &rows){
+
+	compute_weights();
+
+	// Only the given rows are evaluated, the other rows of the gradient are set to zero
+	for (size_t k=0; k<grad.size(); ++k){
+		grad.data()[k] = 0.;
+	}
+
+	SharedArrayDouble1D loss_rows(rows.size());
+	const long long n_rows = static_cast<long long>(rows.size());
+	#pragma omp parallel for num_threads(n_threads) schedule(static)
+	for (long long r=0; r<n_rows; ++r){
+		const size_t i = rows[r];
+		loss_rows[r] = pooled_model.compute_loss_i(i, list_jump_times[0], end_time, decay, theta)/end_time;
+		pooled_model.compute_grad_i(i, list_jump_times[0], end_time, decay, theta, grad);
+		for (size_t k=0; k<n_components+1; ++k){
+			grad(i,k) /= end_time;
+		}
+	}
+	return loss_rows;
+}
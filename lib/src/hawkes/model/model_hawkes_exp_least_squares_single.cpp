@@ -3,12 +3,17 @@
 
 #include "sparklen/hawkes/model/model_hawkes_exp_least_squares_single.h"
 #include <math.h>
+#include <algorithm>
+#include <utility>
+#include <vector>
 
 // Constructor
 ModelHawkesExpLeastSquaresSingle::ModelHawkesExpLeastSquaresSingle(){
 	n_components = 0;
 	weights_computed = false;
-	N = ArrayInt1D(n_components);
+	weights_end_time = 0.;
+	weights_decay = 0.;
+	N = ArrayDouble1D(n_components);
 	I = ArrayDouble1D(n_components);
 	I2 = ArrayDouble1D(n_components);
 	V = ArrayDouble2D(n_components, n_components);
@@ -18,7 +23,9 @@ ModelHawkesExpLeastSquaresSingle::ModelHawkesExpLeastSquaresSingle(){
 ModelHawkesExpLeastSquaresSingle::ModelHawkesExpLeastSquaresSingle(size_t n){
 	n_components = n;
 	weights_computed = false;
-	N = ArrayInt1D(n_components);
+	weights_end_time = 0.;
+	weights_decay = 0.;
+	N = ArrayDouble1D(n_components);
 	I = ArrayDouble1D(n_components);
 	I2 = ArrayDouble1D(n_components);
 	V = ArrayDouble2D(n_components, n_components);
@@ -29,34 +36,68 @@ size_t ModelHawkesExpLeastSquaresSingle::get_n_components(){
 	return n_components;
 }
 
+bool ModelHawkesExpLeastSquaresSingle::has_weights(const double end_time, const double decay) const{
+	return weights_computed && end_time == weights_end_time && decay == weights_decay;
+}
+
 void ModelHawkesExpLeastSquaresSingle::compute_weights(const ListSharedArrayDouble1D &jump_times, const double end_time, const double decay){
 
+	// The weights are accumulated, start from scratch in case of a new decay or end time
+	I = ArrayDouble1D(n_components);
+	I2 = ArrayDouble1D(n_components);
+	V = ArrayDouble2D(n_components, n_components);
+	W = ArrayDouble2D(n_components, n_components);
+
+	// Merge the components into a single time-sorted stream of events
+	std::vector<std::pair<double, size_t>> events;
 	for (size_t j=0; j<n_components; ++j){
 		const SharedArrayDouble1D &jump_times_j = jump_times[j];
 		N[j] = jump_times_j.size();
+		for (size_t h=0; h<jump_times_j.size(); ++h){
+			events.push_back(std::make_pair(jump_times_j[h], j));
+		}
+	}
+	std::sort(events.begin(), events.end());
+
+	// G[j2] holds the sum of decay*exp(-decay*(t-t')) over the past events t' of j2,
+	// it is carried from one event to the next with a single exponential per gap
+	ArrayDouble1D G(n_components);
+	double previous_time = 0.;
+	size_t first = 0;
+	while (first < events.size()){
+		const double t = events[first].first;
+		const double decay_factor = exp(-decay*(t-previous_time));
 		for (size_t j2=0; j2<n_components; ++j2){
-			const SharedArrayDouble1D &jump_times_j2 = jump_times[j2];
-			size_t h2 = 0;
-			double G = 0;
-			for (size_t h=0; h<jump_times_j.size(); ++h){
-				if (h > 0) {
-					G *= exp(-decay*(jump_times_j[h]-jump_times_j[h-1]));
-				}
-				while (h2 < jump_times_j2.size() && jump_times_j2[h2] <jump_times_j[h]){
-					G += decay*(exp(-decay*(jump_times_j[h]-jump_times_j2[h2])));
-					h2++;
-				}
-				V(j,j2) += G;
-				W(j,j2) += (1-exp(-2*decay*(end_time-jump_times_j[h])))*G;
+			G[j2] *= decay_factor;
+		}
+		// Events sharing the same time only see the strictly earlier ones
+		size_t last = first;
+		while (last < events.size() && events[last].first == t){
+			++last;
+		}
+		const double exp_end = exp(-decay*(end_time-t));
+		const double weight_end = 1-exp_end*exp_end;
+		for (size_t h=first; h<last; ++h){
+			const size_t j = events[h].second;
+			for (size_t j2=0; j2<n_components; ++j2){
+				V(j,j2) += G[j2];
+				W(j,j2) += weight_end*G[j2];
 			}
+			I[j] += 1-exp_end;
+			I2[j] += weight_end;
 		}
-		for (size_t h=0; h<jump_times_j.size(); ++h){
-			I[j] += 1-exp(-decay*(end_time-jump_times_j[h]));
-			I2[j] += 1-exp(-2*decay*(end_time-jump_times_j[h]));
+		for (size_t h=first; h<last; ++h){
+			G[events[h].second] += decay;
 		}
+		previous_time = t;
+		first = last;
+	}
+	for (size_t j=0; j<n_components; ++j){
 		I2[j] *= decay/2;
 	}
 
+	weights_end_time = end_time;
+	weights_decay = decay;
 	weights_computed = true;
 }
 
@@ -88,7 +129,7 @@ double ModelHawkesExpLeastSquaresSingle::compute_loss(const ListSharedArrayDoubl
 
 	double loss{0.};
 
-	if (!weights_computed){
+	if (!has_weights(end_time, decay)){
 		compute_weights(jump_times, end_time, decay);
 	}
 
@@ -120,7 +161,7 @@ SharedArrayDouble2D ModelHawkesExpLeastSquaresSingle::compute_grad(const ListSha
 
 	SharedArrayDouble2D grad(n_components, n_components+1);
 
-	if (!weights_computed){
+	if (!has_weights(end_time, decay)){
 		compute_weights(jump_times, end_time, decay);
 	}
 
@@ -131,18 +172,35 @@ SharedArrayDouble2D ModelHawkesExpLeastSquaresSingle::compute_grad(const ListSha
 	return grad;
 }
 
+double ModelHawkesExpLeastSquaresSingle::compute_loss_and_grad(const ListSharedArrayDouble1D &jump_times, const double end_time, const double decay, const SharedArrayDouble2D &theta, SharedArrayDouble2D &grad){
+
+	double loss{0.};
+
+	if (!has_weights(end_time, decay)){
+		compute_weights(jump_times, end_time, decay);
+	}
+
+	for (size_t i=0; i<n_components; ++i){
+		loss += ModelHawkesExpLeastSquaresSingle::compute_loss_i(i, jump_times, end_time, decay, theta);
+		ModelHawkesExpLeastSquaresSingle::compute_grad_i(i, jump_times, end_time, decay, theta, grad);
+	}
+	loss /= end_time;
+	grad /= end_time;
+	return loss;
+}
+
 SharedArrayDouble2D ModelHawkesExpLeastSquaresSingle::compute_hessian(const ListSharedArrayDouble1D &jump_times, const double end_time, const double decay){
 
 	SharedArrayDouble2D hessian(n_components+1, n_components+1);
-	if (!weights_computed){
+	if (!has_weights(end_time, decay)){
 		compute_weights(jump_times, end_time, decay);
 	}
 
 	hessian(0,0) = 2.*end_time;
 
 	for (size_t j=0; j<n_components; ++j){
-		hessian(0,j) = 2*I[j];
-		hessian(j,0) = 2*I[j];
+		hessian(0,j+1) = 2*I[j];
+		hessian(j+1,0) = 2*I[j];
 	}
 
 	for (size_t j=0; j<n_components; ++j){
@@ -2,6 +2,7 @@
 // License : BSD-3-Clause
 
 #include "sparklen/hawkes/model/model_hawkes_exp_log_likelihood.h"
+#include <algorithm>
 #include <iostream>
 
 
@@ -9,45 +10,216 @@
 ModelHawkesExpLogLikelihood::ModelHawkesExpLogLikelihood(){
 	n_repetitions = 0;
 	n_components = 0;
-	multivariate_model = std::vector<ModelHawkesExpLogLikelihoodSingle>(n_repetitions);
-	for (size_t rep=0; rep<n_repetitions; ++rep){
-		multivariate_model[rep] = ModelHawkesExpLogLikelihoodSingle(n_components);
-	}
-	multivariate_model_computed = false;
+	end_time = 0.;
+	decay = 0.;
+	n_threads = 1;
+	reset_weights();
 }
 ModelHawkesExpLogLikelihood::ModelHawkesExpLogLikelihood(size_t n_rep, size_t n_comp){
 
 	n_repetitions = n_rep;
 	n_components = n_comp;
-	multivariate_model = std::vector<ModelHawkesExpLogLikelihoodSingle>(n_repetitions);
+	end_time = 0.;
+	decay = 0.;
+	n_threads = 1;
+	reset_weights();
+}
+
+void ModelHawkesExpLogLikelihood::reset_weights(){
+	multivariate_model = std::vector<std::shared_ptr<ModelHawkesExpLogLikelihoodSingle>>(n_repetitions);
 	for (size_t rep=0; rep<n_repetitions; ++rep){
-		multivariate_model[rep] = ModelHawkesExpLogLikelihoodSingle(n_components);
+		multivariate_model[rep] = std::make_shared<ModelHawkesExpLogLikelihoodSingle>(n_components);
 	}
 	multivariate_model_computed = false;
 }
 
-double ModelHawkesExpLogLikelihood::compute_averaged_loss(const ListListSharedArrayDouble1D &list_jump_times, const double end_time, const double decay, const SharedArrayDouble2D &theta, const bool neg){
+void ModelHawkesExpLogLikelihood::set_data(const ListListSharedArrayDouble1D &list_jump_times, const double end_time){
 
-	double averaged_loss{0.};
+	// The shared arrays only reference the event times, no copy is made
+	this->list_jump_times = list_jump_times;
+	this->end_time = end_time;
+	n_repetitions = list_jump_times.size();
+	n_components = (n_repetitions > 0) ? list_jump_times[0].size() : 0;
+	reset_weights();
+}
 
-	for (size_t rep=0; rep<n_repetitions; ++rep){
-		averaged_loss += multivariate_model[rep].compute_loss(list_jump_times[rep], end_time, decay, theta, neg);
+void ModelHawkesExpLogLikelihood::set_packed_data(const SharedArrayDouble1D &timestamps, const SharedArrayLong2D &offsets, const double end_time){
+	set_data(unpack_events(timestamps, offsets), end_time);
+}
+
+void ModelHawkesExpLogLikelihood::set_decay(const double decay){
+	if (decay != this->decay){
+		this->decay = decay;
+		reset_weights();
 	}
+}
 
-	return averaged_loss;
+void ModelHawkesExpLogLikelihood::set_n_threads(const int n_threads){
+	this->n_threads = (n_threads > 0) ? n_threads : 1;
 }
 
-SharedArrayDouble2D ModelHawkesExpLogLikelihood::compute_averaged_grad(const ListListSharedArrayDouble1D &list_jump_times, const double end_time, const double decay, const SharedArrayDouble2D &theta, const bool neg){
+void ModelHawkesExpLogLikelihood::set_subset(ModelHawkesExpLogLikelihood &model, const SharedArrayLong1D &repetitions){
 
-	SharedArrayDouble2D averaged_grad(n_components, n_components+1);
+	// The weights of the repetitions are computed once by the full model, then shared without copy,
+	// so that the models on several subsets never write them concurrently
+	model.compute_weights();
 
+	std::lock_guard<std::mutex> lock(weights_mutex);
+	n_repetitions = repetitions.size();
+	n_components = model.n_components;
+	decay = model.decay;
+	end_time = model.end_time;
+	// The indices are checked on the Python side
+	list_jump_times = ListListSharedArrayDouble1D(n_repetitions);
+	multivariate_model = std::vector<std::shared_ptr<ModelHawkesExpLogLikelihoodSingle>>(n_repetitions);
 	for (size_t rep=0; rep<n_repetitions; ++rep){
-		averaged_grad.add(multivariate_model[rep].compute_grad(list_jump_times[rep], end_time, decay, theta, neg));
+		list_jump_times[rep] = model.list_jump_times[repetitions[rep]];
+		multivariate_model[rep] = model.multivariate_model[repetitions[rep]];
+	}
+	multivariate_model_computed = false;
+}
+
+void ModelHawkesExpLogLikelihood::compute_weights(){
+
+	// Several Python threads may evaluate the same model, the first one computes the weights
+	std::lock_guard<std::mutex> lock(weights_mutex);
+	if (multivariate_model_computed){
+		return;
 	}
 
+	// The repetitions are independent, each thread only writes the weights of its own models
+	const long long n_rep = static_cast<long long>(n_repetitions);
+	#pragma omp parallel for num_threads(n_threads) schedule(dynamic)
+	for (long long rep=0; rep<n_rep; ++rep){
+		ModelHawkesExpLogLikelihoodSingle &model = *multivariate_model[rep];
+		if (!model.has_weights(end_time, decay)){
+			model.compute_weights(list_jump_times[rep], end_time, decay);
+		}
+	}
+	multivariate_model_computed = true;
+}
+
+size_t ModelHawkesExpLogLikelihood::get_n_blocks() const{
+
+	// The repetitions are split into a fixed number of contiguous blocks, which only depends
+	// on the data, so that the reduction order, hence the result, does not depend on the threads.
+	// The gradient buffers of all blocks are bounded by about 2^20 doubles.
+	const size_t block_size = std::max<size_t>(1, n_components*(n_components+1));
+	const size_t max_blocks = std::max<size_t>(1, std::min<size_t>(64, (1 << 20)/block_size));
+	return std::max<size_t>(1, std::min(n_repetitions, max_blocks));
+}
+
+std::vector<size_t> ModelHawkesExpLogLikelihood::all_rows() const{
+	std::vector<size_t> rows(n_components);
+	for (size_t i=0; i<n_components; ++i){
+		rows[i] = i;
+	}
+	return rows;
+}
+
+std::vector<size_t> ModelHawkesExpLogLikelihood::to_rows(const SharedArrayLong1D &rows) const{
+	// The indices are checked on the Python side
+	std::vector<size_t> row_indices(rows.size());
+	for (size_t r=0; r<rows.size(); ++r){
+		row_indices[r] = rows[r];
+	}
+	return row_indices;
+}
+
+double ModelHawkesExpLogLikelihood::compute_blocks(const SharedArrayDouble2D &theta, const std::vector<size_t> &rows, const bool with_loss, SharedArrayDouble2D *grad, const bool neg, double *loss_rows){
+
+	compute_weights();
+
+	const size_t n_blocks = get_n_blocks();
+
+	const size_t n_rows = rows.size();
+
+	// One task per (block, row): the rows of theta are decoupled, so tasks never write the same entries
+	std::vector<double> loss_tasks(n_blocks*n_rows, 0.);
+	std::vector<SharedArrayDouble2D> grad_blocks, grad_reps;
+	if (grad != nullptr){
+		for (size_t b=0; b<n_blocks; ++b){
+			grad_blocks.push_back(SharedArrayDouble2D(n_components, n_components+1));
+			grad_reps.push_back(SharedArrayDouble2D(n_components, n_components+1));
+		}
+	}
+
+	const long long n_tasks = static_cast<long long>(n_blocks*n_rows);
+	#pragma omp parallel for num_threads(n_threads) schedule(dynamic)
+	for (long long task=0; task<n_tasks; ++task){
+		const size_t b = task / n_rows;
+		const size_t i = rows[task % n_rows];
+		const size_t rep_start = b*n_repetitions/n_blocks;
+		const size_t rep_end = (b+1)*n_repetitions/n_blocks;
+
+		for (size_t rep=rep_start; rep<rep_end; ++rep){
+			ModelHawkesExpLogLikelihoodSingle &model = *multivariate_model[rep];
+			if (grad == nullptr){
+				loss_tasks[task] += model.compute_loss_i(i, list_jump_times[rep], end_time, decay, theta, neg);
+				continue;
+			}
+			if (with_loss){
+				loss_tasks[task] += model.compute_loss_and_grad_i(i, list_jump_times[rep], end_time, decay, theta, grad_reps[b], neg);
+			}
+			else {
+				model.compute_grad_i(i, list_jump_times[rep], end_time, decay, theta, grad_reps[b], neg);
+			}
+			for (size_t j=0; j<n_components+1; ++j){
+				grad_blocks[b](i,j) += grad_reps[b](i,j);
+			}
+		}
+	}
+
+	double loss{0.};
+	for (size_t task=0; task<loss_tasks.size(); ++task){
+		loss += loss_tasks[task];
+	}
+	if (loss_rows != nullptr){
+		for (size_t r=0; r<n_rows; ++r){
+			loss_rows[r] = 0.;
+			for (size_t b=0; b<n_blocks; ++b){
+				loss_rows[r] += loss_tasks[b*n_rows+r];
+			}
+		}
+	}
+
+	if (grad != nullptr){
+		for (size_t k=0; k<grad->size(); ++k){
+			grad->data()[k] = 0.;
+		}
+		for (size_t b=0; b<n_blocks; ++b){
+			grad->add(grad_blocks[b]);
+		}
+	}
+
+	return loss;
+}
+
+double ModelHawkesExpLogLikelihood::compute_averaged_loss(const SharedArrayDouble2D &theta, const bool neg){
+	return compute_blocks(theta, all_rows(), true, nullptr, neg);
+}
+
+SharedArrayDouble2D ModelHawkesExpLogLikelihood::compute_averaged_grad(const SharedArrayDouble2D &theta, const bool neg){
+
+	SharedArrayDouble2D averaged_grad(n_components, n_components+1);
+	compute_blocks(theta, all_rows(), false, &averaged_grad, neg);
 	return averaged_grad;
 }
 
+double ModelHawkesExpLogLikelihood::compute_averaged_loss_and_grad(const SharedArrayDouble2D &theta, SharedArrayDouble2D &grad, const bool neg){
+	return compute_blocks(theta, all_rows(), true, &grad, neg);
+}
+
+SharedArrayDouble1D ModelHawkesExpLogLikelihood::compute_rows_loss(const SharedArrayDouble2D &theta, const SharedArrayLong1D &rows, const bool neg){
 
+	SharedArrayDouble1D loss_rows(rows.size());
+	compute_blocks(theta, to_rows(rows), true, nullptr, neg, loss_rows.data());
+	return loss_rows;
+}
 
+SharedArrayDouble1D ModelHawkesExpLogLikelihood::compute_rows_loss_and_grad(const SharedArrayDouble2D &theta, SharedArrayDouble2D &grad, const SharedArrayLong1D &rows, const bool neg){
 
+	SharedArrayDouble1D loss_rows(rows.size());
+	compute_blocks(theta, to_rows(rows), true, &grad, neg, loss_rows.data());
+	return loss_rows;
+}
@@ -3,11 +3,16 @@
 
 #include "sparklen/hawkes/model/model_hawkes_exp_log_likelihood_single.h"
 #include <math.h>
+#include <algorithm>
+#include <utility>
+#include <vector>
 
 // Constructor
 ModelHawkesExpLogLikelihoodSingle::ModelHawkesExpLogLikelihoodSingle(){
 	n_components = 0;
 	weights_computed = false;
+	weights_end_time = 0.;
+	weights_decay = 0.;
 	N = ArrayInt1D(n_components);
 	I = ArrayDouble1D(n_components);
 	ListArrayDouble2D Psi;
@@ -17,6 +22,8 @@ ModelHawkesExpLogLikelihoodSingle::ModelHawkesExpLogLikelihoodSingle(){
 ModelHawkesExpLogLikelihoodSingle::ModelHawkesExpLogLikelihoodSingle(size_t n){
 	n_components = n;
 	weights_computed = false;
+	weights_end_time = 0.;
+	weights_decay = 0.;
 	N = ArrayInt1D(n_components);
 	I = ArrayDouble1D(n_components);
 	ListArrayDouble2D Psi;
@@ -26,31 +33,62 @@ size_t ModelHawkesExpLogLikelihoodSingle::get_n_components(){
 	return n_components;
 }
 
+bool ModelHawkesExpLogLikelihoodSingle::has_weights(const double end_time, const double decay) const{
+	return weights_computed && end_time == weights_end_time && decay == weights_decay;
+}
+
 void ModelHawkesExpLogLikelihoodSingle::compute_weights(const ListSharedArrayDouble1D &jump_times, const double end_time, const double decay){
 
+	// The weights are accumulated, start from scratch in case of a new decay or end time
+	I = ArrayDouble1D(n_components);
+	Psi.clear();
+
+	// Merge the components into a single time-sorted stream of events
+	std::vector<std::pair<double, size_t>> events;
 	for (size_t j=0; j<n_components; ++j){
 		const SharedArrayDouble1D &jump_times_j = jump_times[j];
 		N[j] = jump_times_j.size();
 		Psi.push_back(ArrayDouble2D(N[j], n_components));
+		for (size_t h=0; h<jump_times_j.size(); ++h){
+			events.push_back(std::make_pair(jump_times_j[h], j));
+		}
+	}
+	std::sort(events.begin(), events.end());
+
+	// G[j2] holds the sum of decay*exp(-decay*(t-t')) over the past events t' of j2,
+	// it is carried from one event to the next with a single exponential per gap
+	ArrayDouble1D G(n_components);
+	std::vector<size_t> position(n_components, 0);
+	double previous_time = 0.;
+	size_t first = 0;
+	while (first < events.size()){
+		const double t = events[first].first;
+		const double decay_factor = exp(-decay*(t-previous_time));
 		for (size_t j2=0; j2<n_components; ++j2){
-			const SharedArrayDouble1D &jump_times_j2 = jump_times[j2];
-			size_t h2 = 0;
-			double G = 0;
-			for (int l=0; l<jump_times_j.size(); ++l){
-				if (l > 0) {
-					G *= exp(-decay*(jump_times_j[l]-jump_times_j[l-1]));
-				}
-				while (h2 < jump_times_j2.size() && jump_times_j2[h2] <jump_times_j[l]){
-					G += decay*(exp(-decay*(jump_times_j[l]-jump_times_j2[h2])));
-					h2++;
-				}
-				Psi[j](l,j2) += G;
+			G[j2] *= decay_factor;
+		}
+		// Events sharing the same time only see the strictly earlier ones
+		size_t last = first;
+		while (last < events.size() && events[last].first == t){
+			++last;
+		}
+		const double exp_end = exp(-decay*(end_time-t));
+		for (size_t h=first; h<last; ++h){
+			const size_t j = events[h].second;
+			const size_t l = position[j]++;
+			for (size_t j2=0; j2<n_components; ++j2){
+				Psi[j](l,j2) = G[j2];
 			}
+			I[j] += 1-exp_end;
 		}
-		for (size_t h=0; h<jump_times_j.size(); ++h){
-			I[j] += 1-exp(-decay*(end_time-jump_times_j[h]));
+		for (size_t h=first; h<last; ++h){
+			G[events[h].second] += decay;
 		}
+		previous_time = t;
+		first = last;
 	}
+	weights_end_time = end_time;
+	weights_decay = decay;
 	weights_computed = true;
 }
 
@@ -86,7 +124,7 @@ double ModelHawkesExpLogLikelihoodSingle::compute_loss(const ListSharedArrayDoub
 
 	double loss{0.};
 
-	if (!weights_computed){
+	if (!has_weights(end_time, decay)){
 		compute_weights(jump_times, end_time, decay);
 	}
 
@@ -101,37 +139,71 @@ double ModelHawkesExpLogLikelihoodSingle::compute_loss(const ListSharedArrayDoub
 void ModelHawkesExpLogLikelihoodSingle::compute_grad_i(const size_t i, const ListSharedArrayDouble1D &jump_times, const double end_time, const double decay, const SharedArrayDouble2D &theta, SharedArrayDouble2D &grad, const bool neg){
 
 	grad(i,0) = -end_time;
+	for (size_t j=0; j<n_components; ++j){
+		grad(i,j+1) = -I[j];
+	}
+
+	// The intensity at each event is evaluated once and shared by all the entries of the row
 	for (int l=0; l<N[i]; ++l){
 		double term_denom = theta(i,0);
-		for (size_t j2=0; j2<n_components; ++j2){
-			term_denom += theta(i,j2+1)*Psi[i](l,j2);
+		for (size_t j=0; j<n_components; ++j){
+			term_denom += theta(i,j+1)*Psi[i](l,j);
 		}
 		grad(i,0) += 1/term_denom;
+		for (size_t j=0; j<n_components; ++j){
+			grad(i,j+1) += Psi[i](l,j)/term_denom;
+		}
 	}
+
 	if (neg){
-		grad(i,0) *= -1;
+		for (size_t j=0; j<n_components+1; ++j){
+			grad(i,j) *= -1;
+		}
 	}
+}
 
+double ModelHawkesExpLogLikelihoodSingle::compute_loss_and_grad_i(const size_t i, const ListSharedArrayDouble1D &jump_times, const double end_time, const double decay, const SharedArrayDouble2D &theta, SharedArrayDouble2D &grad, const bool neg){
+
+	double ll_value_i{0.};
+
+	double term_integral{0.};
+	double term_stieltjes{0.};
+
+	grad(i,0) = -end_time;
 	for (size_t j=0; j<n_components; ++j){
-		for (int l=0; l<N[i]; ++l){
-			double term_denom = theta(i,0);
-			for (size_t j2=0; j2<n_components; ++j2){
-				term_denom += theta(i,j2+1)*Psi[i](l,j2);
-			}
-			grad(i,j+1) += Psi[i](l,j)/term_denom;
+		grad(i,j+1) = -I[j];
+		term_integral += theta(i,j+1)*I[j];
+	}
+
+	// The intensity at each event is evaluated once and shared by the loss and the gradient
+	for (int l=0; l<N[i]; ++l){
+		double term_in_log = theta(i,0);
+		for (size_t j=0; j<n_components; ++j){
+			term_in_log += theta(i,j+1)*Psi[i](l,j);
 		}
-		grad(i,j+1) -= I[j];
-		if (neg){
-			grad(i,j+1) *= -1;
+		term_stieltjes += log(term_in_log);
+		grad(i,0) += 1/term_in_log;
+		for (size_t j=0; j<n_components; ++j){
+			grad(i,j+1) += Psi[i](l,j)/term_in_log;
 		}
 	}
+	ll_value_i += -theta(i,0)*end_time - term_integral + term_stieltjes;
+
+	if (neg){
+		ll_value_i *= -1;
+		for (size_t j=0; j<n_components+1; ++j){
+			grad(i,j) *= -1;
+		}
+	}
+
+	return ll_value_i;
 }
 
 SharedArrayDouble2D ModelHawkesExpLogLikelihoodSingle::compute_grad(const ListSharedArrayDouble1D &jump_times, const double end_time, const double decay, const SharedArrayDouble2D &theta, const bool neg){
 
 	SharedArrayDouble2D grad(n_components, n_components+1);
 
-	if (!weights_computed){
+	if (!has_weights(end_time, decay)){
 		compute_weights(jump_times, end_time, decay);
 	}
 
@@ -141,5 +213,17 @@ SharedArrayDouble2D ModelHawkesExpLogLikelihoodSingle::compute_grad(const ListSh
 	return grad;
 }
 
+double ModelHawkesExpLogLikelihoodSingle::compute_loss_and_grad(const ListSharedArrayDouble1D &jump_times, const double end_time, const double decay, const SharedArrayDouble2D &theta, SharedArrayDouble2D &grad, const bool neg){
+
+	double loss{0.};
+
+	if (!has_weights(end_time, decay)){
+		compute_weights(jump_times, end_time, decay);
+	}
 
+	for (size_t i=0; i<n_components; ++i){
+		loss += ModelHawkesExpLogLikelihoodSingle::compute_loss_and_grad_i(i, jump_times, end_time, decay, theta, grad, neg);
+	}
 
+	return loss;
+}
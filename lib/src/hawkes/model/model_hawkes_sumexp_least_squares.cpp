@@ -0,0 +1,228 @@
+// Author : Romain E. Lacoste
+// License : BSD-3-Clause
+
+#include "sparklen/hawkes/model/model_hawkes_sumexp_least_squares.h"
+#include <iostream>
+
+
+// Constructor
+ModelHawkesSumExpLeastSquares::ModelHawkesSumExpLeastSquares(){
+	n_repetitions = 0;
+	n_components = 0;
+	n_decays = 0;
+	end_time = 0.;
+	n_threads = 1;
+	reset_weights();
+}
+ModelHawkesSumExpLeastSquares::ModelHawkesSumExpLeastSquares(size_t n_rep, size_t n_comp, size_t n_dec){
+
+	n_repetitions = n_rep;
+	n_components = n_comp;
+	n_decays = n_dec;
+	end_time = 0.;
+	n_threads = 1;
+	reset_weights();
+}
+
+void ModelHawkesSumExpLeastSquares::reset_weights(){
+	multivariate_model = std::vector<std::shared_ptr<ModelHawkesSumExpLeastSquaresSingle>>(n_repetitions);
+	for (size_t rep=0; rep<n_repetitions; ++rep){
+		multivariate_model[rep] = std::make_shared<ModelHawkesSumExpLeastSquaresSingle>(n_components, n_decays);
+	}
+	pooled_model = ModelHawkesSumExpLeastSquaresSingle(n_components, n_decays);
+	multivariate_model_computed = false;
+}
+
+void ModelHawkesSumExpLeastSquares::set_data(const ListListSharedArrayDouble1D &list_jump_times, const double end_time){
+
+	// The shared arrays only reference the event times, no copy is made
+	this->list_jump_times = list_jump_times;
+	this->end_time = end_time;
+	n_repetitions = list_jump_times.size();
+	n_components = (n_repetitions > 0) ? list_jump_times[0].size() : 0;
+	reset_weights();
+}
+
+void ModelHawkesSumExpLeastSquares::set_packed_data(const SharedArrayDouble1D &timestamps, const SharedArrayLong2D &offsets, const double end_time){
+	set_data(unpack_events(timestamps, offsets), end_time);
+}
+
+void ModelHawkesSumExpLeastSquares::set_decays(const SharedArrayDouble1D &decays){
+	std::vector<double> new_decays(decays.data(), decays.data()+decays.size());
+	if (new_decays != this->decays){
+		this->decays = new_decays;
+		n_decays = new_decays.size();
+		reset_weights();
+	}
+}
+
+void ModelHawkesSumExpLeastSquares::set_n_threads(const int n_threads){
+	this->n_threads = (n_threads > 0) ? n_threads : 1;
+}
+
+void ModelHawkesSumExpLeastSquares::set_subset(ModelHawkesSumExpLeastSquares &model, const SharedArrayLong1D &repetitions){
+
+	// The weights of the repetitions are computed once by the full model, then shared without copy,
+	// so that the models on several subsets never write them concurrently
+	model.compute_weights();
+
+	std::lock_guard<std::mutex> lock(weights_mutex);
+	n_repetitions = repetitions.size();
+	n_components = model.n_components;
+	n_decays = model.n_decays;
+	decays = model.decays;
+	end_time = model.end_time;
+	// The indices are checked on the Python side
+	list_jump_times = ListListSharedArrayDouble1D(n_repetitions);
+	multivariate_model = std::vector<std::shared_ptr<ModelHawkesSumExpLeastSquaresSingle>>(n_repetitions);
+	for (size_t rep=0; rep<n_repetitions; ++rep){
+		list_jump_times[rep] = model.list_jump_times[repetitions[rep]];
+		multivariate_model[rep] = model.multivariate_model[repetitions[rep]];
+	}
+	pooled_model = ModelHawkesSumExpLeastSquaresSingle(n_components, n_decays);
+	multivariate_model_computed = false;
+}
+
+void ModelHawkesSumExpLeastSquares::compute_weights(){
+
+	// Several Python threads may evaluate the same model, the first one computes the weights
+	std::lock_guard<std::mutex> lock(weights_mutex);
+	if (!multivariate_model_computed){
+		compute_pooled_weights();
+	}
+}
+
+void ModelHawkesSumExpLeastSquares::compute_pooled_weights(){
+
+	// The least-squares contrast is quadratic in theta and linear in the weights,
+	// so averaging the losses over the repetitions amounts to averaging the weights
+	pooled_model = ModelHawkesSumExpLeastSquaresSingle(n_components, n_decays);
+
+	// The repetitions are independent, each thread only writes the weights of its own models
+	const long long n_rep = static_cast<long long>(n_repetitions);
+	#pragma omp parallel for num_threads(n_threads) schedule(dynamic)
+	for (long long rep=0; rep<n_rep; ++rep){
+		ModelHawkesSumExpLeastSquaresSingle &model = *multivariate_model[rep];
+		if (!model.has_weights(end_time, decays)){
+			model.compute_weights(list_jump_times[rep], end_time, decays);
+		}
+	}
+
+	// The pooling is kept sequential so that the summation order does not depend on the threads
+	for (size_t rep=0; rep<n_repetitions; ++rep){
+		ModelHawkesSumExpLeastSquaresSingle &model = *multivariate_model[rep];
+		pooled_model.N.add(model.N);
+		pooled_model.I.add(model.I);
+		pooled_model.V.add(model.V);
+		pooled_model.H.add(model.H);
+	}
+	pooled_model.N /= n_repetitions;
+	pooled_model.I /= n_repetitions;
+	pooled_model.V /= n_repetitions;
+	pooled_model.H /= n_repetitions;
+
+	pooled_model.weights_end_time = end_time;
+	pooled_model.weights_decays = decays;
+	pooled_model.weights_computed = true;
+	multivariate_model_computed = true;
+}
+
+double ModelHawkesSumExpLeastSquares::compute_averaged_loss(const SharedArrayDouble2D &theta){
+
+	compute_weights();
+
+	// The rows of theta are decoupled, their contributions are summed afterwards in a fixed order
+	std::vector<double> loss_rows(n_components, 0.);
+	const long long n_comp = static_cast<long long>(n_components);
+	#pragma omp parallel for num_threads(n_threads) schedule(static)
+	for (long long i=0; i<n_comp; ++i){
+		loss_rows[i] = pooled_model.compute_loss_i(i, end_time, theta);
+	}
+
+	double loss{0.};
+	for (size_t i=0; i<n_components; ++i){
+		loss += loss_rows[i];
+	}
+	loss /= end_time;
+	return loss;
+}
+
+SharedArrayDouble2D ModelHawkesSumExpLeastSquares::compute_averaged_grad(const SharedArrayDouble2D &theta){
+
+	compute_weights();
+
+	SharedArrayDouble2D grad(n_components, n_components*n_decays+1);
+
+	const long long n_comp = static_cast<long long>(n_components);
+	#pragma omp parallel for num_threads(n_threads) schedule(static)
+	for (long long i=0; i<n_comp; ++i){
+		pooled_model.compute_grad_i(i, end_time, theta, grad);
+	}
+	grad /= end_time;
+	return grad;
+}
+
+double ModelHawkesSumExpLeastSquares::compute_averaged_loss_and_grad(const SharedArrayDouble2D &theta, SharedArrayDouble2D &grad){
+
+	compute_weights();
+
+	std::vector<double> loss_rows(n_components, 0.);
+	const long long n_comp = static_cast<long long>(n_components);
+	#pragma omp parallel for num_threads(n_threads) schedule(static)
+	for (long long i=0; i<n_comp; ++i){
+		loss_rows[i] = pooled_model.compute_loss_i(i, end_time, theta);
+		pooled_model.compute_grad_i(i, end_time, theta, grad);
+	}
+
+	double loss{0.};
+	for (size_t i=0; i<n_components; ++i){
+		loss += loss_rows[i];
+	}
+	loss /= end_time;
+	grad /= end_time;
+	return loss;
+}
+
+SharedArrayDouble2D ModelHawkesSumExpLeastSquares::compute_averaged_hessian(){
+
+	compute_weights();
+
+	return pooled_model.compute_hessian(end_time);
+}
+
+SharedArrayDouble1D ModelHawkesSumExpLeastSquares::compute_rows_loss(const SharedArrayDouble2D &theta, const SharedArrayLong1D &rows){
+
+	compute_weights();
+
+	// The indices are checked on the Python side
+	SharedArrayDouble1D loss_rows(rows.size());
+	const long long n_rows = static_cast<long long>(rows.size());
+	#pragma omp parallel for num_threads(n_threads) schedule(static)
+	for (long long r=0; r<n_rows; ++r){
+		loss_rows[r] = pooled_model.compute_loss_i(rows[r], end_time, theta)/end_time;
+	}
+	return loss_rows;
+}
+
+SharedArrayDouble1D ModelHawkesSumExpLeastSquares::compute_rows_loss_and_grad(const SharedArrayDouble2D &theta, SharedArrayDouble2D &grad, const SharedArrayLong1D &rows){
+
+	compute_weights();
+
+	// Only the given rows are evaluated, the other rows of the gradient are set to zero
+	for (size_t k=0; k<grad.size(); ++k){
+		grad.data()[k] = 0.;
+	}
+
+	SharedArrayDouble1D loss_rows(rows.size());
+	const long long n_rows = static_cast<long long>(rows.size());
+	#pragma omp parallel for num_threads(n_threads) schedule(static)
+	for (long long r=0; r<n_rows; ++r){
+		const size_t i = rows[r];
+		loss_rows[r] = pooled_model.compute_loss_i(i, end_time, theta)/end_time;
+		pooled_model.compute_grad_i(i, end_time, theta, grad);
+		for (size_t k=0; k<n_components*n_decays+1; ++k){
+			grad(i,k) /= end_time;
+		}
+	}
+	return loss_rows;
+}
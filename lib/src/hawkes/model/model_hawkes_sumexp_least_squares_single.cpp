@@ -0,0 +1,190 @@
+// Author : Romain E. Lacoste
+// License : BSD-3-Clause
+
+#include "sparklen/hawkes/model/model_hawkes_sumexp_least_squares_single.h"
+#include <math.h>
+#include <algorithm>
+#include <utility>
+
+// Constructor
+ModelHawkesSumExpLeastSquaresSingle::ModelHawkesSumExpLeastSquaresSingle(){
+	n_components = 0;
+	n_decays = 0;
+	weights_computed = false;
+	weights_end_time = 0.;
+	N = ArrayDouble1D(n_components);
+	I = ArrayDouble1D(n_components*n_decays);
+	V = ArrayDouble2D(n_components, n_components*n_decays);
+	H = ArrayDouble2D(n_components*n_decays, n_components*n_decays);
+}
+
+ModelHawkesSumExpLeastSquaresSingle::ModelHawkesSumExpLeastSquaresSingle(size_t n, size_t n_dec){
+	n_components = n;
+	n_decays = n_dec;
+	weights_computed = false;
+	weights_end_time = 0.;
+	N = ArrayDouble1D(n_components);
+	I = ArrayDouble1D(n_components*n_decays);
+	V = ArrayDouble2D(n_components, n_components*n_decays);
+	H = ArrayDouble2D(n_components*n_decays, n_components*n_decays);
+}
+
+size_t ModelHawkesSumExpLeastSquaresSingle::get_n_components(){
+	return n_components;
+}
+
+size_t ModelHawkesSumExpLeastSquaresSingle::get_n_decays(){
+	return n_decays;
+}
+
+bool ModelHawkesSumExpLeastSquaresSingle::has_weights(const double end_time, const std::vector<double> &decays) const{
+	return weights_computed && end_time == weights_end_time && decays == weights_decays;
+}
+
+void ModelHawkesSumExpLeastSquaresSingle::compute_weights(const ListSharedArrayDouble1D &jump_times, const double end_time, const std::vector<double> &decays){
+
+	const size_t n_features = n_components*n_decays;
+
+	// The weights are accumulated, start from scratch in case of new decays or end time
+	I = ArrayDouble1D(n_features);
+	V = ArrayDouble2D(n_components, n_features);
+	H = ArrayDouble2D(n_features, n_features);
+
+	// Merge the components into a single time-sorted stream of events
+	std::vector<std::pair<double, size_t>> events;
+	for (size_t j=0; j<n_components; ++j){
+		const SharedArrayDouble1D &jump_times_j = jump_times[j];
+		N[j] = jump_times_j.size();
+		for (size_t h=0; h<jump_times_j.size(); ++h){
+			events.push_back(std::make_pair(jump_times_j[h], j));
+		}
+	}
+	std::sort(events.begin(), events.end());
+
+	// The integral over [t, T] of the product of the kernels of the decays u and v, started at t
+	std::vector<double> coeff_self(n_decays*n_decays), coeff_cross(n_decays*n_decays);
+	for (size_t u=0; u<n_decays; ++u){
+		for (size_t v=0; v<n_decays; ++v){
+			coeff_cross[u*n_decays+v] = decays[u]/(decays[u]+decays[v]);
+			coeff_self[u*n_decays+v] = decays[v]*coeff_cross[u*n_decays+v];
+		}
+	}
+
+	// G[v*d+j2] holds the sum of decay_v*exp(-decay_v*(t-t')) over the past events t' of j2,
+	// all the decays are carried together along one sweep, with one exponential per decay and gap.
+	// W(k, k2) gathers the products of features over the ordered pairs of distinct events
+	ArrayDouble1D G(n_features);
+	ArrayDouble2D W(n_features, n_features);
+	std::vector<double> exp_end(n_decays);
+	double previous_time = 0.;
+	size_t first = 0;
+	while (first < events.size()){
+		const double t = events[first].first;
+		for (size_t v=0; v<n_decays; ++v){
+			const double decay_factor = exp(-decays[v]*(t-previous_time));
+			for (size_t j2=0; j2<n_components; ++j2){
+				G[v*n_components+j2] *= decay_factor;
+			}
+			exp_end[v] = exp(-decays[v]*(end_time-t));
+		}
+		// Events sharing the same time only see the strictly earlier ones
+		size_t last = first;
+		while (last < events.size() && events[last].first == t){
+			++last;
+		}
+		for (size_t h=first; h<last; ++h){
+			const size_t j = events[h].second;
+			for (size_t k2=0; k2<n_features; ++k2){
+				V(j,k2) += G[k2];
+			}
+			for (size_t u=0; u<n_decays; ++u){
+				const size_t k = u*n_components+j;
+				I[k] += 1-exp_end[u];
+				for (size_t v=0; v<n_decays; ++v){
+					const double weight_end = 1-exp_end[u]*exp_end[v];
+					H(k,v*n_components+j) += coeff_self[u*n_decays+v]*weight_end;
+					const double weight_cross = coeff_cross[u*n_decays+v]*weight_end;
+					for (size_t j2=0; j2<n_components; ++j2){
+						W(k,v*n_components+j2) += weight_cross*G[v*n_components+j2];
+					}
+				}
+			}
+		}
+		for (size_t h=first; h<last; ++h){
+			const size_t j = events[h].second;
+			for (size_t v=0; v<n_decays; ++v){
+				G[v*n_components+j] += decays[v];
+			}
+		}
+		previous_time = t;
+		first = last;
+	}
+	for (size_t k=0; k<n_features; ++k){
+		for (size_t k2=0; k2<n_features; ++k2){
+			H(k,k2) += W(k,k2) + W(k2,k);
+		}
+	}
+
+	weights_end_time = end_time;
+	weights_decays = decays;
+	weights_computed = true;
+}
+
+double ModelHawkesSumExpLeastSquaresSingle::compute_loss_i(const size_t i, const double end_time, const SharedArrayDouble2D &theta){
+
+	const size_t n_features = n_components*n_decays;
+
+	double ls_contrast_value_i{0.};
+
+	double term_cross_mu{0.};
+	double term_stieltjes{0.};
+	double term_square{0.};
+
+	ls_contrast_value_i += theta(i,0)*theta(i,0)*end_time - 2*theta(i,0)*N[i];
+
+	for (size_t k=0; k<n_features; ++k){
+		term_cross_mu += theta(i,k+1)*I[k];
+		term_stieltjes += theta(i,k+1)*V(i,k);
+		for (size_t k2=0; k2<n_features; ++k2){
+			term_square += theta(i,k+1)*theta(i,k2+1)*H(k,k2);
+		}
+	}
+	ls_contrast_value_i += 2*theta(i,0)*term_cross_mu - 2*term_stieltjes + term_square;
+
+	return ls_contrast_value_i;
+}
+
+void ModelHawkesSumExpLeastSquaresSingle::compute_grad_i(const size_t i, const double end_time, const SharedArrayDouble2D &theta, SharedArrayDouble2D &grad){
+
+	const size_t n_features = n_components*n_decays;
+
+	grad(i,0) = 2*(theta(i,0)*end_time - N[i]);
+
+	for (size_t k=0; k<n_features; ++k){
+		grad(i,0) += 2*theta(i,k+1)*I[k];
+		grad(i,k+1) = 2*theta(i,0)*I[k] - 2*V(i,k);
+		for (size_t k2=0; k2<n_features; ++k2){
+			grad(i,k+1) += 2*theta(i,k2+1)*H(k,k2);
+		}
+	}
+}
+
+SharedArrayDouble2D ModelHawkesSumExpLeastSquaresSingle::compute_hessian(const double end_time){
+
+	const size_t n_features = n_components*n_decays;
+
+	// The contrast is separable over the rows of theta, which all share this hessian
+	SharedArrayDouble2D hessian(n_features+1, n_features+1);
+
+	hessian(0,0) = 2.*end_time;
+	for (size_t k=0; k<n_features; ++k){
+		hessian(0,k+1) = 2*I[k];
+		hessian(k+1,0) = 2*I[k];
+		for (size_t k2=0; k2<n_features; ++k2){
+			hessian(k+1,k2+1) = 2*H(k,k2);
+		}
+	}
+	hessian /= end_time;
+
+	return hessian;
+}
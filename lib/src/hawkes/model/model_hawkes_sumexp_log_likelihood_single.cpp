@@ -0,0 +1,199 @@
+// Author : Romain E. Lacoste
+// License : BSD-3-Clause
+
+#include "sparklen/hawkes/model/model_hawkes_sumexp_log_likelihood_single.h"
+#include <math.h>
+#include <algorithm>
+#include <utility>
+
+// Constructor
+ModelHawkesSumExpLogLikelihoodSingle::ModelHawkesSumExpLogLikelihoodSingle(){
+	n_components = 0;
+	n_decays = 0;
+	weights_computed = false;
+	weights_end_time = 0.;
+	N = ArrayInt1D(n_components);
+	I = ArrayDouble1D(n_components*n_decays);
+}
+
+ModelHawkesSumExpLogLikelihoodSingle::ModelHawkesSumExpLogLikelihoodSingle(size_t n, size_t n_dec){
+	n_components = n;
+	n_decays = n_dec;
+	weights_computed = false;
+	weights_end_time = 0.;
+	N = ArrayInt1D(n_components);
+	I = ArrayDouble1D(n_components*n_decays);
+}
+
+size_t ModelHawkesSumExpLogLikelihoodSingle::get_n_components(){
+	return n_components;
+}
+
+size_t ModelHawkesSumExpLogLikelihoodSingle::get_n_decays(){
+	return n_decays;
+}
+
+bool ModelHawkesSumExpLogLikelihoodSingle::has_weights(const double end_time, const std::vector<double> &decays) const{
+	return weights_computed && end_time == weights_end_time && decays == weights_decays;
+}
+
+void ModelHawkesSumExpLogLikelihoodSingle::compute_weights(const ListSharedArrayDouble1D &jump_times, const double end_time, const std::vector<double> &decays){
+
+	const size_t n_features = n_components*n_decays;
+
+	// The weights are accumulated, start from scratch in case of new decays or end time
+	I = ArrayDouble1D(n_features);
+	Psi.clear();
+
+	// Merge the components into a single time-sorted stream of events
+	std::vector<std::pair<double, size_t>> events;
+	for (size_t j=0; j<n_components; ++j){
+		const SharedArrayDouble1D &jump_times_j = jump_times[j];
+		N[j] = jump_times_j.size();
+		Psi.push_back(ArrayDouble2D(N[j], n_features));
+		for (size_t h=0; h<jump_times_j.size(); ++h){
+			events.push_back(std::make_pair(jump_times_j[h], j));
+		}
+	}
+	std::sort(events.begin(), events.end());
+
+	// G[v*d+j2] holds the sum of decay_v*exp(-decay_v*(t-t')) over the past events t' of j2,
+	// all the decays are carried together along one sweep, with one exponential per decay and gap
+	ArrayDouble1D G(n_features);
+	std::vector<size_t> position(n_components, 0);
+	std::vector<double> exp_end(n_decays);
+	double previous_time = 0.;
+	size_t first = 0;
+	while (first < events.size()){
+		const double t = events[first].first;
+		for (size_t v=0; v<n_decays; ++v){
+			const double decay_factor = exp(-decays[v]*(t-previous_time));
+			for (size_t j2=0; j2<n_components; ++j2){
+				G[v*n_components+j2] *= decay_factor;
+			}
+			exp_end[v] = exp(-decays[v]*(end_time-t));
+		}
+		// Events sharing the same time only see the strictly earlier ones
+		size_t last = first;
+		while (last < events.size() && events[last].first == t){
+			++last;
+		}
+		for (size_t h=first; h<last; ++h){
+			const size_t j = events[h].second;
+			const size_t l = position[j]++;
+			for (size_t k2=0; k2<n_features; ++k2){
+				Psi[j](l,k2) = G[k2];
+			}
+			for (size_t u=0; u<n_decays; ++u){
+				I[u*n_components+j] += 1-exp_end[u];
+			}
+		}
+		for (size_t h=first; h<last; ++h){
+			const size_t j = events[h].second;
+			for (size_t v=0; v<n_decays; ++v){
+				G[v*n_components+j] += decays[v];
+			}
+		}
+		previous_time = t;
+		first = last;
+	}
+	weights_end_time = end_time;
+	weights_decays = decays;
+	weights_computed = true;
+}
+
+double ModelHawkesSumExpLogLikelihoodSingle::compute_loss_i(const size_t i, const double end_time, const SharedArrayDouble2D &theta, const bool neg){
+
+	const size_t n_features = n_components*n_decays;
+
+	double ll_value_i{0.};
+
+	double term_integral{0.};
+	double term_stieltjes{0.};
+
+	for (int l=0; l<N[i]; ++l){
+		double term_in_log = theta(i,0);
+		for (size_t k=0; k<n_features; ++k){
+			term_in_log += theta(i,k+1)*Psi[i](l,k);
+		}
+		term_stieltjes += log(term_in_log);
+	}
+
+	for (size_t k=0; k<n_features; ++k){
+		term_integral += theta(i,k+1)*I[k];
+	}
+	ll_value_i += -theta(i,0)*end_time - term_integral + term_stieltjes;
+
+	if (neg){
+		ll_value_i *= -1;
+	}
+
+	return ll_value_i;
+}
+
+void ModelHawkesSumExpLogLikelihoodSingle::compute_grad_i(const size_t i, const double end_time, const SharedArrayDouble2D &theta, SharedArrayDouble2D &grad, const bool neg){
+
+	const size_t n_features = n_components*n_decays;
+
+	grad(i,0) = -end_time;
+	for (size_t k=0; k<n_features; ++k){
+		grad(i,k+1) = -I[k];
+	}
+
+	// The intensity at each event is evaluated once and shared by all the entries of the row
+	for (int l=0; l<N[i]; ++l){
+		double term_denom = theta(i,0);
+		for (size_t k=0; k<n_features; ++k){
+			term_denom += theta(i,k+1)*Psi[i](l,k);
+		}
+		grad(i,0) += 1/term_denom;
+		for (size_t k=0; k<n_features; ++k){
+			grad(i,k+1) += Psi[i](l,k)/term_denom;
+		}
+	}
+
+	if (neg){
+		for (size_t k=0; k<n_features+1; ++k){
+			grad(i,k) *= -1;
+		}
+	}
+}
+
+double ModelHawkesSumExpLogLikelihoodSingle::compute_loss_and_grad_i(const size_t i, const double end_time, const SharedArrayDouble2D &theta, SharedArrayDouble2D &grad, const bool neg){
+
+	const size_t n_features = n_components*n_decays;
+
+	double ll_value_i{0.};
+
+	double term_integral{0.};
+	double term_stieltjes{0.};
+
+	grad(i,0) = -end_time;
+	for (size_t k=0; k<n_features; ++k){
+		grad(i,k+1) = -I[k];
+		term_integral += theta(i,k+1)*I[k];
+	}
+
+	// The intensity at each event is evaluated once and shared by the loss and the gradient
+	for (int l=0; l<N[i]; ++l){
+		double term_in_log = theta(i,0);
+		for (size_t k=0; k<n_features; ++k){
+			term_in_log += theta(i,k+1)*Psi[i](l,k);
+		}
+		term_stieltjes += log(term_in_log);
+		grad(i,0) += 1/term_in_log;
+		for (size_t k=0; k<n_features; ++k){
+			grad(i,k+1) += Psi[i](l,k)/term_in_log;
+		}
+	}
+	ll_value_i += -theta(i,0)*end_time - term_integral + term_stieltjes;
+
+	if (neg){
+		ll_value_i *= -1;
+		for (size_t k=0; k<n_features+1; ++k){
+			grad(i,k) *= -1;
+		}
+	}
+
+	return ll_value_i;
+}
@@ -0,0 +1,327 @@
+// Author : Romain E. Lacoste
+// License : BSD-3-Clause
+
+#include "sparklen/hawkes/simulation/simu_hawkes_exp.h"
+#include <algorithm>
+#include <cmath>
+
+
+namespace {
+
+// Fenwick tree over nonnegative weights, to draw an index proportionally to its weight in O(log d)
+class FenwickTree{
+
+	private:
+
+	std::vector<double> tree;
+
+	size_t top; // largest power of two not above the size
+
+	public:
+
+	FenwickTree(size_t n) : tree(n+1, 0.), top(1) {
+		while (2*top <= n){
+			top *= 2;
+		}
+	}
+
+	void add(size_t i, const double value){
+		for (++i; i<tree.size(); i+=i&(~i+1)){
+			tree[i] += value;
+		}
+	}
+
+	double total() const {
+		double sum = 0.;
+		for (size_t i=tree.size()-1; i>0; i-=i&(~i+1)){
+			sum += tree[i];
+		}
+		return sum;
+	}
+
+	// Smallest index whose prefix sum exceeds the value
+	size_t search(double value) const {
+		size_t pos = 0;
+		for (size_t step=top; step>0; step/=2){
+			if (pos+step < tree.size() && tree[pos+step] <= value){
+				pos += step;
+				value -= tree[pos];
+			}
+		}
+		return std::min(pos, tree.size()-2);
+	}
+
+	void reset(const std::vector<double> &values){
+		std::fill(tree.begin(), tree.end(), 0.);
+		for (size_t i=0; i<values.size(); ++i){
+			add(i, values[i]);
+		}
+	}
+};
+
+// Index of the first cumulative share above the value, guarding against the rounding of the last one
+inline size_t draw_index(const std::vector<double> &cdf, const double value){
+	size_t index = std::upper_bound(cdf.begin(), cdf.end(), value) - cdf.begin();
+	return std::min(index, cdf.size()-1);
+}
+
+}
+
+
+// Constructor, the interactions being given in compressed sparse column format, one column per source component
+SimuHawkesExp::SimuHawkesExp(const SharedArrayDouble1D &mu, const SharedArrayLong1D &alpha_indptr, const SharedArrayLong1D &alpha_indices,
+							 const SharedArrayDouble1D &alpha_data, const double decay, const double end_time){
+
+	n_components = mu.size();
+	this->decay = decay;
+	this->end_time = end_time;
+
+	this->mu = std::vector<double>(n_components);
+	mu_cdf = std::vector<double>(n_components);
+	double cumulative = 0.;
+	for (size_t j=0; j<n_components; ++j){
+		this->mu[j] = mu[j];
+		cumulative += mu[j];
+		mu_cdf[j] = cumulative;
+	}
+
+	// Only the positive interactions are kept, so that sparse networks cost their number of edges
+	branching = std::vector<double>(n_components, 0.);
+	targets = std::vector<std::vector<size_t>>(n_components);
+	targets_alpha = std::vector<std::vector<double>>(n_components);
+	targets_cdf = std::vector<std::vector<double>>(n_components);
+	for (size_t source=0; source<n_components; ++source){
+		for (std::int64_t k=alpha_indptr[source]; k<alpha_indptr[source+1]; ++k){
+			if (alpha_data[k] > 0){
+				branching[source] += alpha_data[k];
+				targets[source].push_back(static_cast<size_t>(alpha_indices[k]));
+				targets_alpha[source].push_back(alpha_data[k]);
+				targets_cdf[source].push_back(branching[source]);
+			}
+		}
+		for (double &share : targets_cdf[source]){
+			share /= branching[source];
+		}
+	}
+
+	generator.seed(0);
+}
+
+double SimuHawkesExp::uniform(){
+	// The 53 upper bits give a uniform double in [0, 1)
+	return (generator() >> 11) * (1.0/9007199254740992.0);
+}
+
+double SimuHawkesExp::exponential(const double rate){
+	return -std::log1p(-uniform())/rate;
+}
+
+std::int64_t SimuHawkesExp::poisson(double mean){
+	// Multiplication method, the mean being split into parts small enough for exp(-mean) not to underflow
+	std::int64_t count = 0;
+	while (mean > 0.){
+		const double part = std::min(mean, 30.);
+		const double threshold = std::exp(-part);
+		double product = uniform();
+		while (product >= threshold){
+			++count;
+			product *= uniform();
+		}
+		mean -= part;
+	}
+	return count;
+}
+
+void SimuHawkesExp::simulate_cluster_path(const double start_time, const double *state, std::vector<double> &times, std::vector<size_t> &components){
+
+	times.clear();
+	components.clear();
+
+	// Simulation of the immigrants, as homogeneous Poisson processes
+	for (size_t j=0; j<n_components; ++j){
+		if (mu[j] <= 0.){
+			continue;
+		}
+		for (double t=start_time+exponential(mu[j]); t<end_time; t+=exponential(mu[j])){
+			times.push_back(t);
+			components.push_back(j);
+		}
+	}
+
+	// Offsprings of the events before the start time born after it. The kernel being exponential, 
+	// their number only depends on the kernel sums at the start time, and their delays are exponential
+	if (state != nullptr){
+		for (size_t source=0; source<n_components; ++source){
+			if (branching[source] <= 0. || state[source] <= 0.){
+				continue;
+			}
+			const std::int64_t n_offsprings = poisson(branching[source]*state[source]);
+			for (std::int64_t l=0; l<n_offsprings; ++l){
+				const size_t target = targets[source][draw_index(targets_cdf[source], uniform())];
+				const double t = start_time + exponential(decay);
+				if (t < end_time){
+					times.push_back(t);
+					components.push_back(target);
+				}
+			}
+		}
+	}
+
+	// Simulation of the offsprings, each event spawning its own once, in order of creation.
+	// The offsprings born after the end time are dropped with their whole progeny
+	for (size_t k=0; k<times.size(); ++k){
+		const size_t source = components[k];
+		if (branching[source] <= 0.){
+			continue;
+		}
+		const double parent_time = times[k];
+		const std::int64_t n_offsprings = poisson(branching[source]);
+		for (std::int64_t l=0; l<n_offsprings; ++l){
+			const size_t target = targets[source][draw_index(targets_cdf[source], uniform())];
+			const double t = parent_time + exponential(decay);
+			if (t < end_time){
+				times.push_back(t);
+				components.push_back(target);
+			}
+		}
+	}
+}
+
+void SimuHawkesExp::simulate_ogata_path(const double start_time, const double *state, std::vector<double> &times, std::vector<size_t> &components){
+
+	times.clear();
+	components.clear();
+
+	// The excitations all decay at the same rate, so they are stored up to a common scale,
+	// which is the only quantity updated between two events
+	const double total_mu = n_components > 0 ? mu_cdf.back() : 0.;
+	std::vector<double> excitation(n_components, 0.);
+	FenwickTree excitation_tree(n_components);
+	double scale = 1.;
+
+	// Excitations left by the events before the start time, from the kernel sums of their components
+	if (state != nullptr){
+		for (size_t source=0; source<n_components; ++source){
+			for (size_t l=0; l<targets[source].size(); ++l){
+				excitation[targets[source][l]] += decay*targets_alpha[source][l]*state[source];
+			}
+		}
+		excitation_tree.reset(excitation);
+	}
+
+	double t = start_time;
+	while (true){
+		// The intensity decreases between events, so its current value bounds it until the next one
+		const double bound = total_mu + scale*excitation_tree.total();
+		if (!(bound > 0.)){
+			break;
+		}
+		const double waiting_time = exponential(bound);
+		t += waiting_time;
+		if (!(t < end_time)){
+			break;
+		}
+
+		scale *= std::exp(-decay*waiting_time);
+		if (scale < 1e-100){
+			// Rescale the stored excitations before the scale underflows
+			for (double &value : excitation){
+				value *= scale;
+			}
+			excitation_tree.reset(excitation);
+			scale = 1.;
+		}
+
+		// Thinning, the accepted draw then selects the component proportionally to its intensity
+		const double u = uniform()*bound;
+		if (!(u < total_mu + scale*excitation_tree.total())){
+			continue;
+		}
+		const size_t j = (u < total_mu) ? draw_index(mu_cdf, u) : excitation_tree.search((u - total_mu)/scale);
+		times.push_back(t);
+		components.push_back(j);
+
+		for (size_t l=0; l<targets[j].size(); ++l){
+			const double jump = decay*targets_alpha[j][l]/scale;
+			excitation[targets[j][l]] += jump;
+			excitation_tree.add(targets[j][l], jump);
+		}
+	}
+}
+
+void SimuHawkesExp::pack_path(const std::vector<double> &times, const std::vector<size_t> &components, const bool time_ordered){
+
+	// Counting sort of the events by component, which keeps their order within a component
+	const std::int64_t start = static_cast<std::int64_t>(timestamps.size());
+	std::vector<std::int64_t> row(n_components+1, 0);
+	for (size_t j : components){
+		++row[j+1];
+	}
+	row[0] = start;
+	for (size_t j=0; j<n_components; ++j){
+		row[j+1] += row[j];
+	}
+
+	timestamps.resize(start + times.size());
+	std::vector<std::int64_t> position(row.begin(), row.end()-1);
+	for (size_t k=0; k<times.size(); ++k){
+		timestamps[position[components[k]]++] = times[k];
+	}
+	if (!time_ordered){
+		for (size_t j=0; j<n_components; ++j){
+			std::sort(timestamps.begin()+row[j], timestamps.begin()+row[j+1]);
+		}
+	}
+	offsets.insert(offsets.end(), row.begin(), row.end());
+}
+
+void SimuHawkesExp::simulate_paths(const SharedArrayLong1D &seeds, const double start_time, const SharedArrayDouble2D *states, const bool ogata){
+	timestamps.clear();
+	offsets.clear();
+	std::vector<double> times;
+	std::vector<size_t> components;
+	// Each path has its own seed, so that it does not depend on the paths simulated before it
+	for (size_t i=0; i<seeds.size(); ++i){
+		generator.seed(static_cast<std::uint64_t>(seeds[i]));
+		const double *state = (states != nullptr) ? states->data() + i*n_components : nullptr;
+		if (ogata){
+			simulate_ogata_path(start_time, state, times, components);
+		}
+		else{
+			simulate_cluster_path(start_time, state, times, components);
+		}
+		pack_path(times, components, ogata);
+	}
+}
+
+void SimuHawkesExp::simulate_cluster(const SharedArrayLong1D &seeds){
+	simulate_paths(seeds, 0., nullptr, false);
+}
+
+void SimuHawkesExp::simulate_ogata(const SharedArrayLong1D &seeds){
+	simulate_paths(seeds, 0., nullptr, true);
+}
+
+void SimuHawkesExp::extend_cluster(const SharedArrayLong1D &seeds, const double start_time, const SharedArrayDouble2D &states){
+	simulate_paths(seeds, start_time, &states, false);
+}
+
+void SimuHawkesExp::extend_ogata(const SharedArrayLong1D &seeds, const double start_time, const SharedArrayDouble2D &states){
+	simulate_paths(seeds, start_time, &states, true);
+}
+
+SharedArrayDouble1D SimuHawkesExp::get_timestamps(){
+	// The buffer is handed over, the simulator keeps no copy of it
+	SharedArrayDouble1D result(timestamps.size());
+	std::copy(timestamps.begin(), timestamps.end(), result.data());
+	std::vector<double>().swap(timestamps);
+	return result;
+}
+
+SharedArrayLong2D SimuHawkesExp::get_offsets(){
+	const size_t n_samples = offsets.size()/(n_components+1);
+	SharedArrayLong2D result(n_samples, n_components+1);
+	std::copy(offsets.begin(), offsets.end(), result.data());
+	std::vector<std::int64_t>().swap(offsets);
+	return result;
+}
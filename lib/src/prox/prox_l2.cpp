@@ -33,6 +33,23 @@ void ProxL2::apply(SharedArrayDouble2D &x, const double step_size) {
     }
 }
 
+void ProxL2::apply_rows(SharedArrayDouble2D &x, const SharedArrayDouble1D &step_sizes, const SharedArrayLong1D &rows) {
+    size_t n_rows = x.rows();
+    size_t n_cols = x.cols();
+
+    if (n_cols < end) throw std::invalid_argument("The number of columns in x must exceed the value of the end attribute.");
+    if (step_sizes.size() != rows.size()) throw std::invalid_argument("There must be one step size per row.");
+
+    // Only the given rows are processed, each with its own step size
+    for (size_t r = 0; r < rows.size(); ++r) {
+        size_t i = rows[r];
+        if (i >= n_rows) throw std::invalid_argument("The rows must be smaller than the number of rows in x.");
+        for (size_t j = start; j < end; ++j) {
+        	x(i,j) = apply_single(x(i,j), step_sizes[r]);
+        }
+    }
+}
+
 
 
 
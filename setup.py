@@ -3,8 +3,11 @@
 
 import os
 import subprocess
+import tempfile
 import numpy
 from setuptools import Extension, setup, find_packages
+from setuptools.command.build_ext import build_ext
+from setuptools.errors import CompileError, LinkError
 
 def ensure_init_files(root_dir):
     for dirpath, dirnames, filenames in os.walk(root_dir):
@@ -69,6 +72,36 @@ def create_extension(module_name, module_dir, source_files):
         language='c++'
     )
     
+class BuildExtOpenMP(build_ext):
+    """ Build the extensions with OpenMP when the compiler supports it """
+    
+    def build_extensions(self):
+        if self.compiler.compiler_type == 'msvc':
+            compile_args, link_args = ['/openmp'], []
+        else:
+            compile_args, link_args = ['-fopenmp'], ['-fopenmp']
+        
+        if self._check_openmp(compile_args, link_args):
+            for ext in self.extensions:
+                ext.extra_compile_args += compile_args
+                ext.extra_link_args += link_args
+        else:
+            print("OpenMP is not supported by the compiler, the models will run on a single thread.")
+        
+        super().build_extensions()
+        
+    def _check_openmp(self, compile_args, link_args):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            source = os.path.join(tmp_dir, 'check_openmp.cpp')
+            with open(source, 'w') as f:
+                f.write("#include <omp.h>\nint main() { return omp_get_max_threads() > 0 ? 0 : 1; }\n")
+            try:
+                objects = self.compiler.compile([source], output_dir=tmp_dir, extra_postargs=compile_args)
+                self.compiler.link_executable(objects, 'check_openmp', output_dir=tmp_dir, extra_postargs=link_args)
+            except (CompileError, LinkError):
+                return False
+        return True
+    
 # Create extensions for module1 and module2 with multiple source files
 array_extension = create_extension(
     module_name='array',
@@ -84,7 +117,27 @@ hawkes_model_extension = create_extension(
         'model_hawkes_exp_least_squares_single.cpp',
         'model_hawkes_exp_least_squares.cpp',
         'model_hawkes_exp_log_likelihood_single.cpp',
-        'model_hawkes_exp_log_likelihood.cpp'
+        'model_hawkes_exp_log_likelihood.cpp',
+        'model_hawkes_sumexp_least_squares_single.cpp',
+        'model_hawkes_sumexp_least_squares.cpp',
+        'model_hawkes_sumexp_log_likelihood_single.cpp',
+        'model_hawkes_sumexp_log_likelihood.cpp'
+    ]
+)
+
+hawkes_simulation_extension = create_extension(
+    module_name='hawkes_simulation',
+    module_dir='hawkes/simulation',
+    source_files=[
+        'simu_hawkes_exp.cpp'
+    ]
+)
+
+hawkes_diagnostics_extension = create_extension(
+    module_name='hawkes_diagnostics',
+    module_dir='hawkes/diagnostics',
+    source_files=[
+        'hawkes_exp_compensator.cpp'
     ]
 )
 
@@ -102,11 +155,14 @@ prox_extention = create_extension(
 ext_sparklen_modules = [
     array_extension,
     hawkes_model_extension,
+    hawkes_simulation_extension,
+    hawkes_diagnostics_extension,
     prox_extention
 ]
 
 setup(
     ext_modules=ext_sparklen_modules,
+    cmdclass={'build_ext': BuildExtOpenMP},
     packages=find_packages(),
     include_package_data=True,
   )
@@ -1,11 +1,20 @@
 # Author: Romain E. Lacoste
 # License: BSD-3-Clause
 
+import numpy as np
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
 from sparklen.hawkes.model import ModelHawkesExpLeastSquares, ModelHawkesExpLogLikelihood
+from sparklen.hawkes.model import ModelHawkesSumExpLeastSquares, ModelHawkesSumExpLogLikelihood
+
+from sparklen.calibration.base.regularization_path import RegularizationPath
 
 from sparklen.prox import ProxZero, ProxL1, ProxL2, ProxElasticNet
 
-from sparklen.optim.optimizer import GD, AGD
+from sparklen.optim.optimizer import GD, AGD, Direct, RowAGD, CD
 
 from sparklen.optim.lr import LipschitzLR, BacktrackingLineSearchLR
 
@@ -18,6 +27,11 @@ class Calibration(ABC):
         "log-likelihood" : ModelHawkesExpLogLikelihood
     }
     
+    _sumexp_losses = {
+        "least-squares" : ModelHawkesSumExpLeastSquares,
+        "log-likelihood" : ModelHawkesSumExpLogLikelihood
+    }
+    
     _penalties = {
         "none" : ProxZero,
         "lasso" : ProxL1,
@@ -27,15 +41,21 @@ class Calibration(ABC):
     
     _optimizers = {
         "gd" : GD,
-        "agd" : AGD
+        "agd" : AGD,
+        "row-agd" : RowAGD,
+        "cd" : CD,
+        "direct" : Direct
     }
     
     _lr_schedulers = {
         "lipschitz" : LipschitzLR,
         "backtracking" : BacktrackingLineSearchLR
     }
+    
+    # Number of consecutive constants of the grid solved along one branch of a path
+    _segment_size = 20
 
-    def __init__(self, loss="least-squares", penalty="lasso", optimizer="agd", lr_scheduler="backtracking", max_iter=100, tol=1e-5, penalty_mu=False, verbose_bar=True, verbose=True):
+    def __init__(self, loss="least-squares", penalty="lasso", optimizer="agd", lr_scheduler="backtracking", max_iter=100, tol=1e-5, penalty_mu=False, verbose_bar=True, verbose=True, n_threads=1, n_jobs=1):
         
         if loss not in self._losses:
             raise ValueError(f"The choosen loss, '{loss}', is not available for Hawkes model with exponential kernel. Choose instead from {list(self._losses.keys())}.")
@@ -44,20 +64,117 @@ class Calibration(ABC):
         if penalty not in self._penalties:
             raise ValueError(f"The choosen penalty, '{penalty}', is not available. Choose instead from {list(self._penalties.keys())}.")
         self._prox = self._penalties[penalty]()
+        self._str_penalty = penalty
         
         if optimizer not in self._optimizers:
             raise ValueError(f"The choosen optimizer, '{optimizer}', is not available. Choose instead from {list(self._optimizers.keys())}.")
         self._optimizer = self._optimizers[optimizer](lr_scheduler, max_iter, tol, verbose_bar=False, verbose=False, print_every=1, record_every=10)
+        self._str_optimizer = optimizer
+        self._str_lr_scheduler = lr_scheduler
+        self._max_iter = max_iter
+        self._tol = tol
+        
+        if not isinstance(n_jobs, (int, np.integer)) or n_jobs == 0 or n_jobs < -1:
+            raise ValueError(f"The number of jobs should be a positive integer or -1, but got {n_jobs} instead.")
+        self._n_jobs = n_jobs
         
         self._penalty_mu = penalty_mu
+        self._n_threads = n_threads
         self._verbose_bar = verbose_bar
         self._verbose = verbose
         
         self._best_kappa = None
         self._best_score = None
+        self._best_params = None
+        
+    def _new_model(self, loss, decay):
+        # Several decays select the sum-of-exponentials kernel
+        losses = self._sumexp_losses if np.ndim(decay) > 0 else self._losses
+        return losses[loss](decay, self._n_threads)
+    
+    def _set_model(self, decay, data, end_time, model=None):
+        # A given model already holds the data, and possibly its weights, so it is used as is
+        if model is None:
+            model = self._new_model(self._str_loss, decay)
+            model.set_data(data, end_time)
+        else:
+            losses = self._sumexp_losses if np.ndim(decay) > 0 else self._losses
+            if not isinstance(model, losses[self._str_loss]):
+                raise ValueError(f"The given model should be a {losses[self._str_loss].__name__}, but got {type(model).__name__} instead.")
+            model.check_set_state()
+            if model.decay != model._check_decay(decay):
+                raise ValueError(f"The decay of the given model, {model.decay}, does not match the calibrated decay {decay}.")
+        self._model = model
+    
+    def _new_solver(self, n_coeffs):
+        # Each path segment has its own optimizer and prox, so that they can run concurrently
+        optimizer = self._optimizers[self._str_optimizer](self._str_lr_scheduler, self._max_iter, self._tol, verbose_bar=False, verbose=False, print_every=1, record_every=10)
+        prox = self._penalties[self._str_penalty]()
+        # The penalty applies to the interactions, and to the baselines if penalty_mu
+        if self._penalty_mu:
+            prox.set_application_range(0, n_coeffs)
+        else:
+            prox.set_application_range(1, n_coeffs)
+        return optimizer, prox
+        
+    def _new_path(self, model):
+        optimizer, prox = self._new_solver(model.n_coeffs())
+        return RegularizationPath(model, optimizer, prox)
+    
+    def _solve_paths(self, paths, scores, grid, pbar=None):
+        """
+        Internal method to solve each path over the grid, in decreasing order, 
+        and to score the solutions.
+        
+        The grid is split into contiguous segments of `_segment_size` constants, 
+        and the segments of all the paths are shared between the `n_jobs` threads. 
+        Each segment runs down its own branch of the path, warm started from the 
+        solutions already in the path, which then collects the solutions of all 
+        its branches. The split does not depend on `n_jobs`, which only 
+        schedules the segments, so that the results do not either.
+        
+        Returns the scores of the solutions, of shape (len(paths), len(grid)), 
+        the grid being sorted in decreasing order.
+        """
+        grid = np.sort(grid)[::-1]
+        n_jobs = self._n_jobs if self._n_jobs > 0 else (os.cpu_count() or 1)
+        segments = [grid[start:start+self._segment_size] for start in range(0, len(grid), self._segment_size)]
+        
+        tasks = []
+        for index, path in enumerate(paths):
+            for segment in segments:
+                tasks.append((index, path.branch(*self._new_solver(path.model.n_coeffs())), segment))
+        
+        lock = threading.Lock()
+        
+        def run(task):
+            index, branch, segment = task
+            segment_scores = []
+            for kappa in segment:
+                segment_scores.append(scores[index](branch.solve(kappa)))
+                if pbar is not None:
+                    # The progress bar is shared by the threads
+                    with lock:
+                        pbar.update(1)
+                        if self._verbose:
+                            pbar.set_postfix({"kappa": kappa, "score": segment_scores[-1]})
+            return segment_scores
+        
+        if n_jobs == 1:
+            results = [run(task) for task in tasks]
+        else:
+            with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+                results = list(executor.map(run, tasks))
+        
+        grid_scores = np.empty((len(paths), len(grid)))
+        for index, path in enumerate(paths):
+            grid_scores[index] = np.concatenate([result for task, result in zip(tasks, results) if task[0] == index])
+        for index, branch, _ in tasks:
+            paths[index].merge(branch)
+        return grid_scores
         
     @abstractmethod
-    def calibrate(self, decay, data, end_time=None, grid_max=2.0, grid_step=0.1, refinement=True, refined_grid_step=0.01):
+    def calibrate(self, decay, data, end_time=None, grid_max=2.0, grid_step=0.1, refinement=True, refined_grid_step=0.01, model=None):
         # This part must be implemented in the subclasses method
         pass
     
@@ -69,6 +186,10 @@ class Calibration(ABC):
     def best_score(self):
         return self._best_score
     
+    @property
+    def best_params(self):
+        return self._best_params
+    
     @abstractmethod
     def print_info(self):
         pass
\ No newline at end of file
@@ -0,0 +1,208 @@
+# Author: Romain E. Lacoste
+# License: BSD-3-Clause
+
+from sparklen.hawkes.data import PackedEvents
+
+from sparklen.prox import ProxL1, ProxElasticNet
+
+import numpy as np
+
+import copy
+
+class RegularizationPath():
+    """
+    Solutions of the penalized problem of a model along the regularization path.
+
+    The problem is solved for decreasing values of the penalization constant
+    :math:`\\kappa`, each solve being warm started from the solution of the
+    closest larger :math:`\\kappa` already solved. The path starts from the
+    homogeneous fit :math:`\\theta_0`, with the mean event rates as baselines
+    and no interactions, which solves the problem when the interactions only
+    are penalized and :math:`\\kappa \\geq \\kappa_{\\max}`, where
+    :math:`\\kappa_{\\max}` is the largest entry of the gradient of the loss
+    at :math:`\\theta_0` over the penalized entries.
+
+    For the penalties with an :math:`\\ell_1` part, the sequential strong
+    rule discards, before solving at :math:`\\kappa`, the penalized entries
+    whose gradient at the previous solution, obtained at
+    :math:`\\kappa' > \\kappa`, satisfies
+
+    .. math::
+        |\\nabla_{i,j} F(\\hat{\\theta}(\\kappa'))| < 2 \\kappa - \\kappa'
+
+    The discarded entries, which are never baselines, are held at zero by
+    the proximal operator. Since the rule may wrongly discard some entries,
+    the optimality conditions
+    :math:`|\\nabla_{i,j} F(\\hat{\\theta}(\\kappa))| \\leq \\kappa` are
+    checked on them afterwards, and the problem is solved again with the
+    violating entries released until none remains.
+
+    Parameters
+    ----------
+    model : ModelHawkes
+        The model holding the data, whose loss is penalized.
+
+    optimizer : Optimizer
+        The optimizer used to solve the problems. It is set with the model
+        and the proximal operator before each solve.
+
+    prox : Prox
+        The proximal operator of the penalty, whose application range must
+        have been set.
+
+    Attributes
+    ----------
+    kappa_max : float or None
+        The smallest penalization constant for which the homogeneous fit is
+        the solution, or None if there is no such constant, i.e. if the
+        penalty has no :math:`\\ell_1` part or also applies to the baselines.
+        This is a read-only property.
+    """
+
+    def __init__(self, model, optimizer, prox):
+        self._model = model
+        self._optimizer = optimizer
+        self._prox = prox
+
+        # Relative slack of the optimality conditions, the solutions being approximate
+        self._kkt_tol = 1e-3
+
+        theta_0 = self._homogeneous_params()
+        grad_0 = model.grad(theta_0)
+
+        self._kappa_max = None
+        if self._l1_ratio() > 0 and prox.start >= 1:
+            self._kappa_max = np.max(self._screening_score(grad_0), initial=0.0) / self._l1_ratio()
+
+        # Solutions already computed, keyed by penalization constant
+        self._solutions = {np.inf: (theta_0, grad_0)}
+
+    @property
+    def model(self):
+        return self._model
+
+    @property
+    def kappa_max(self):
+        return self._kappa_max
+
+    def branch(self, optimizer, prox):
+        """
+        Return a branch of the path, holding the solutions already computed
+        and solving with its own optimizer and proximal operator, so that
+        several branches can run concurrently on the same model.
+
+        Parameters
+        ----------
+        optimizer : Optimizer
+            The optimizer of the branch.
+
+        prox : Prox
+            The proximal operator of the branch, with the same penalty and
+            application range as the path.
+
+        Returns
+        -------
+        branch : RegularizationPath
+            The branch of the path.
+        """
+        branch = copy.copy(self)
+        branch._optimizer = optimizer
+        branch._prox = prox
+        branch._solutions = dict(self._solutions)
+        return branch
+
+    def merge(self, branch):
+        """ Collect the solutions computed by a branch of the path. """
+        for kappa, solution in branch._solutions.items():
+            self._solutions.setdefault(kappa, solution)
+
+    def _homogeneous_params(self):
+        """ Return the parameters of the homogeneous fit, with the mean event rates as baselines. """
+        data = self._model.data
+        if isinstance(data, PackedEvents):
+            n_events = np.diff(data.offsets, axis=1).sum(axis=0)
+        else:
+            n_events = np.sum([[events.shape[0] for events in inner] for inner in data], axis=0)
+        theta = np.zeros((self._model.n_components(), self._model.n_coeffs()))
+        if self._model.end_time > 0:
+            theta[:, 0] = n_events / (self._model.n_repetitions() * self._model.end_time)
+        return theta
+
+    def _l1_ratio(self):
+        """ Return the share of the penalization constant weighting the l1 norm. """
+        if isinstance(self._prox, ProxElasticNet):
+            return self._prox.l1_ratio
+        if isinstance(self._prox, ProxL1):
+            return 1.0
+        return 0.0
+
+    def _screening_score(self, grad):
+        """
+        Return the entries of the gradient compared to the l1 penalization
+        constant by the optimality conditions, zero outside the penalized range.
+        """
+        score = np.zeros_like(grad)
+        penalized = grad[:, self._prox.start:self._prox.end]
+        score[:, self._prox.start:self._prox.end] = -penalized if self._prox.positive else np.abs(penalized)
+        return score
+
+    def solve(self, kappa):
+        """
+        Solve the penalized problem, warm started from the solution of the
+        closest larger penalization constant already solved.
+
+        Parameters
+        ----------
+        kappa : float
+            The penalization constant.
+
+        Returns
+        -------
+        theta_hat : ndarray of shape (d, d+1)
+            The solution of the penalized problem.
+        """
+        previous = min(key for key in self._solutions if key >= kappa)
+        theta_prev, grad_prev = self._solutions[previous]
+        if previous == kappa:
+            return theta_prev.copy()
+
+        if self._kappa_max is not None and kappa >= self._kappa_max:
+            # The homogeneous fit is the solution, no computation needed
+            self._solutions[kappa] = self._solutions[np.inf]
+            return self._solutions[kappa][0].copy()
+
+        l1_ratio = self._l1_ratio()
+        screened = None
+        if l1_ratio > 0:
+            # Sequential strong rule from the previous solution of the path
+            kappa_prev = self._kappa_max if previous == np.inf else previous
+            if kappa_prev is not None:
+                # The previous solution being approximate, its nonzero entries are always kept
+                screened = (self._screening_score(grad_prev) < l1_ratio * (2 * kappa - kappa_prev)) & (theta_prev == 0)
+                # The baselines are never discarded, the log-likelihood being undefined without them
+                screened[:, :max(self._prox.start, 1)] = False
+                screened[:, self._prox.end:] = False
+
+        self._prox.set_pen_const(pen_const=kappa)
+        self._optimizer.set_model(self._model)
+        self._optimizer.set_prox(self._prox)
+        theta_init = theta_prev
+        try:
+            while True:
+                self._prox.set_screened(screened)
+                self._optimizer.optimize(theta_init)
+                theta_hat = self._optimizer.minimizer
+                grad_hat = self._model.grad(theta_hat)
+                if screened is None:
+                    break
+                # Release the discarded entries violating the optimality conditions
+                violations = screened & (self._screening_score(grad_hat) > l1_ratio * kappa * (1 + self._kkt_tol))
+                if not violations.any():
+                    break
+                screened = screened & ~violations
+                theta_init = theta_hat
+        finally:
+            self._prox.set_screened(None)
+
+        self._solutions[kappa] = (theta_hat, grad_hat)
+        return theta_hat.copy()
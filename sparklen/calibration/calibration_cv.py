@@ -3,8 +3,6 @@
 
 from sparklen.calibration.base.calibration import Calibration
 
-from sparklen.hawkes.model import ModelHawkesExpLogLikelihood
-
 import numpy as np
 
 from sklearn.model_selection import KFold
@@ -30,6 +28,10 @@ class CalibrationCV(Calibration):
     
     The strategy involves exploring a grid :math:`\\Delta` of :math:`\\kappa` 
     values and selecting the one that minimizes the criterion of interest. 
+    The grid is run down the regularization path, in decreasing order of 
+    :math:`\\kappa`, each problem being warm started from the solution 
+    of the previous one, and the strong rule screening out interactions 
+    for the penalties with an :math:`\\ell_1` part. 
     In the case of Cross-Validation, this entails partitioning the dataset 
     into folds and aiming to minimize the cross-validated risk
     
@@ -82,6 +84,19 @@ class CalibrationCV(Calibration):
     verbose : bool, default=True
         Controls whether recorded information during the searching process is printed.
         If `verbose=False`, no information is printed.
+    
+    n_threads : int, default=1
+        The number of threads used by the models to compute the weights and 
+        to evaluate the loss and its gradient. If `n_threads=-1`, all the 
+        processors are used.
+    
+    n_jobs : int, default=1
+        The number of threads solving the penalized problems concurrently. 
+        The grid is split into fixed contiguous segments, each run down its 
+        own branch of the regularization path, so that the results do not 
+        depend on `n_jobs`. The compiled models release the GIL and share 
+        their weights between the threads. 
+        If `n_jobs=-1`, all the processors are used.
         
     Attributes
     ----------
@@ -91,6 +106,10 @@ class CalibrationCV(Calibration):
     best_score : float
         The best score achieved, namely the best cross-validated risk, 
         associated with the `best_kappa` value.
+        
+    best_params : ndarray
+        The average over the folds of the solutions at `best_kappa`, 
+        e.g. to warm start the fit on the whole data.
     
     Notes
     ----------
@@ -101,24 +120,25 @@ class CalibrationCV(Calibration):
     def __init__(self, cv=5, loss="least-squares", penalty="lasso", 
                  optimizer="agd", lr_scheduler="backtracking",
                  max_iter=100, tol=1e-5, penalty_mu=False, 
-                 verbose_bar=True, verbose=True):
+                 verbose_bar=True, verbose=True, n_threads=1, n_jobs=1):
         
         # Call the initializer of the base class ModelHawkes
-        super().__init__(loss, penalty, optimizer, lr_scheduler, max_iter, tol, penalty_mu, verbose_bar, verbose)
+        super().__init__(loss, penalty, optimizer, lr_scheduler, max_iter, tol, penalty_mu, verbose_bar, verbose, n_threads, n_jobs)
         
         self._cv = cv
         
-    def calibrate(self, decay, data, end_time=None, grid_max=2.0, grid_step=0.1, refinement=True, refined_grid_step=0.01):    
+    def calibrate(self, decay, data, end_time=None, grid_max=2.0, grid_step=0.1, refinement=True, refined_grid_step=0.01, model=None):    
         """
         Calibrate the regularization constant given training data.
         
         Parameters
         ----------
-        decay : float
+        decay : float or array-like of shape (U,)
             The decay hyperparameter of the exponential kernel of the process. 
             This scalar dictates how quick the influences vanish over time. 
+            Several decays select the sum-of-exponentials kernel.
             
-        data : list of list of ndarray
+        data : list of list of ndarray or PackedEvents
             Repeated paths of a Hawkes process. The outer list has length `n`, 
             representing the number of repetitions. Each inner list has length `d`, 
             corresponding to the number of components (dimensions) of the Hawkes process. 
@@ -150,40 +170,41 @@ class CalibrationCV(Calibration):
             Step size of the finer searching grid.
             This parameter is only considered if `refinement='True'`
         
+        model : ModelHawkes, default=None
+            A model with the loss of the calibration and the given decay, 
+            already holding the data, e.g. the one of a learner. It is used 
+            with its weights instead of a new model, and `data` and 
+            `end_time` are then ignored.
+        
         Returns
         -------
         self : object
             The instance of the calibrated object.
         """
-        self._model = self._losses[self._str_loss](decay)
-        self._model.set_data(data, end_time)
-    
-        self._model_likelihood = ModelHawkesExpLogLikelihood(decay)
-        self._model_likelihood.set_data(data, end_time)
-        
-        if self._penalty_mu:
-            self._prox.set_application_range(0, self._model.n_components()+1)
-        else:
-            self._prox.set_application_range(1, self._model.n_components()+1)
-            
-        self._prox.set_pen_const(pen_const=0.0)
+        self._set_model(decay, data, end_time, model)
         
-        self._optimizer.set_model(self._model)
-        self._optimizer.set_prox(self._prox)
+        # The folds are split once, each training set following its own regularization path. 
+        # They are built on the weights of the full model, computed once for all the folds
+        self._model.compute_weights()
+        self._folds = []
+        for train_index, val_index in KFold(n_splits=self._cv).split(np.arange(self._model.n_repetitions())):
+            self._folds.append((self._new_path(self._model.subset(train_index)), self._model.subset(val_index)))
         
         coarse_grid = np.arange(0, grid_max, grid_step)
-        best_kappa, best_score = self._search_grid(decay, data, end_time, coarse_grid)
+        best_kappa, best_score = self._search_grid(coarse_grid)
         
         if refinement:
             # Perform a refined search around the best coarse parameter with refined_grid_step
             refined_grid_min = max(0, best_kappa - grid_step + refined_grid_step)  # Ensure lower bound is not negative
             refined_grid_max = min(grid_max, best_kappa + grid_step)  # Prevent exceeding upper bound
             refine_grid = np.arange(round(refined_grid_min, 2), round(refined_grid_max, 2), refined_grid_step)
-            best_kappa, best_score = self._search_grid(decay, data, end_time, refine_grid, title="Refined Searching")
+            best_kappa, best_score = self._search_grid(refine_grid, title="Refined Searching")
             
         self._best_kappa, self._best_score = best_kappa, best_score
+        # The solutions of the folds at the best constant are averaged
+        self._best_params = np.mean([path.solve(best_kappa) for path, _ in self._folds], axis=0) if best_kappa is not None else None
     
-    def _search_grid(self, decay, data, end_time, grid, title="Searching"):
+    def _search_grid(self, grid, title="Searching"):
         """
         Internal method to perform a grid search and return the best parameter and its BIC score.
         """
@@ -196,19 +217,15 @@ class CalibrationCV(Calibration):
         pbar = None
         if self._verbose_bar:
             # Setup the progress bar
-            pbar = tqdm(total=len(grid), desc=title, unit="it")
+            pbar = tqdm(total=len(grid)*len(self._folds), desc=title, unit="it")
 
         try:
-            for kappa in grid:
-                score = self._cv_score(kappa, decay, data, end_time)
-                
-                # Update progress bar with current kappa and score
-                if self._verbose_bar:
-                    pbar.update(1)
-                    if self._verbose:
-                        pbar.set_postfix({"kappa": kappa, "score": score})
-
-                if score < best_score:
+            # The grid is run down the regularization path of each fold, each kappa warm starting the next one
+            paths = [path_train for path_train, _ in self._folds]
+            fold_scores = self._solve_paths(paths, [model_val.loss for _, model_val in self._folds], grid, pbar)
+            for kappa, score in zip(np.sort(grid)[::-1], np.mean(fold_scores, axis=0)):
+                # Ties are resolved in favor of the smallest kappa, as in an increasing search
+                if score <= best_score:
                     best_score = score
                     best_kappa = round(kappa, 2)
 
@@ -228,31 +245,5 @@ class CalibrationCV(Calibration):
 
         return best_kappa, best_score
     
-    def _cv_score(self, kappa, decay, data, end_time):
-
-        kf = KFold(n_splits=self._cv)
-        scores = []
-        for train_index, val_index in kf.split(data):
-            data_train = [data[i] for i in train_index]
-            data_val = [data[i] for i in val_index]
-            
-            model_train = self._losses[self._str_loss](decay)
-            model_train.set_data(data_train, end_time)
-            
-            self._prox.set_pen_const(pen_const=kappa)
-            
-            theta_init = np.ones((model_train.n_components(), model_train.n_components()+1))*0.2
-            self._optimizer.set_model(model_train)
-            self._optimizer.set_prox(self._prox)
-            self._optimizer.optimize(theta_init)
-            theta_hat = self._optimizer.minimizer
-            
-            model_val = self._losses[self._str_loss](decay)
-            model_val.set_data(data_val, end_time)
-            score = model_val.loss(theta_hat)
-            scores.append(score)
-        avg_score = np.mean(scores)
-        return avg_score
-    
     def print_info(self):
         pass
\ No newline at end of file
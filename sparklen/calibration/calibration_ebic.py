@@ -3,8 +3,6 @@
 
 from sparklen.calibration.base.calibration import Calibration
 
-from sparklen.hawkes.model import ModelHawkesExpLogLikelihood
-
 import numpy as np
 from scipy.special import gammaln
 
@@ -29,6 +27,10 @@ class CalibrationEBIC(Calibration):
     
     The strategy involves exploring a grid :math:`\\Delta` of :math:`\\kappa` 
     values and selecting the one that minimizes the criterion of interest. 
+    The grid is run down the regularization path, in decreasing order of 
+    :math:`\\kappa`, each problem being warm started from the solution 
+    of the previous one, and the strong rule screening out interactions 
+    for the penalties with an :math:`\\ell_1` part. 
     
     Parameters
     ----------
@@ -83,6 +85,19 @@ class CalibrationEBIC(Calibration):
     verbose : bool, default=True
         Controls whether recorded information during the searching process is printed.
         If `verbose=False`, no information is printed.
+    
+    n_threads : int, default=1
+        The number of threads used by the models to compute the weights and 
+        to evaluate the loss and its gradient. If `n_threads=-1`, all the 
+        processors are used.
+    
+    n_jobs : int, default=1
+        The number of threads solving the penalized problems concurrently. 
+        The grid is split into fixed contiguous segments, each run down its 
+        own branch of the regularization path, so that the results do not 
+        depend on `n_jobs`. The compiled models release the GIL and share 
+        their weights between the threads. 
+        If `n_jobs=-1`, all the processors are used.
         
     Attributes
     ----------
@@ -92,6 +107,9 @@ class CalibrationEBIC(Calibration):
     best_score : float
         The best score achieved, namely the best EBIC criterion value, 
         associated with the `best_kappa` value.
+        
+    best_params : ndarray
+        The solution of the penalized problem at `best_kappa`.
     
     Notes
     ----------
@@ -102,24 +120,25 @@ class CalibrationEBIC(Calibration):
     def __init__(self, gamma=1.0, loss="least-squares", penalty="lasso", 
                  optimizer="agd", lr_scheduler="backtracking", 
                  max_iter=100, tol=1e-5, penalty_mu=False, 
-                 verbose_bar=True, verbose=True):
+                 verbose_bar=True, verbose=True, n_threads=1, n_jobs=1):
         
         # Call the initializer of the base class ModelHawkes
-        super().__init__(loss, penalty, optimizer, lr_scheduler, max_iter, tol, penalty_mu, verbose_bar, verbose)
+        super().__init__(loss, penalty, optimizer, lr_scheduler, max_iter, tol, penalty_mu, verbose_bar, verbose, n_threads, n_jobs)
         
         self._gamma = gamma
         
-    def calibrate(self, decay, data, end_time=None, grid_max=2.0, grid_step=0.1, refinement=True, refined_grid_step=0.01):    
+    def calibrate(self, decay, data, end_time=None, grid_max=2.0, grid_step=0.1, refinement=True, refined_grid_step=0.01, model=None):    
         """
         Calibrate the regularization constant given training data.
         
         Parameters
         ----------
-        decay : float
+        decay : float or array-like of shape (U,)
             The decay hyperparameter of the exponential kernel of the process. 
             This scalar dictates how quick the influences vanish over time. 
+            Several decays select the sum-of-exponentials kernel.
             
-        data : list of list of ndarray
+        data : list of list of ndarray or PackedEvents
             Repeated paths of a Hawkes process. The outer list has length `n`, 
             representing the number of repetitions. Each inner list has length `d`, 
             corresponding to the number of components (dimensions) of the Hawkes process. 
@@ -151,26 +170,28 @@ class CalibrationEBIC(Calibration):
             Step size of the finer searching grid.
             This parameter is only considered if `refinement='True'`
         
+        model : ModelHawkes, default=None
+            A model with the loss of the calibration and the given decay, 
+            already holding the data, e.g. the one of a learner. It is used 
+            with its weights instead of a new model, and `data` and 
+            `end_time` are then ignored.
+        
         Returns
         -------
         self : object
             The instance of the calibrated object.
         """
-        self._model = self._losses[self._str_loss](decay)
-        self._model.set_data(data, end_time)
+        self._set_model(decay, data, end_time, model)
     
-        self._model_likelihood = ModelHawkesExpLogLikelihood(decay)
-        self._model_likelihood.set_data(data, end_time)
-        
-        if self._penalty_mu:
-            self._prox.set_application_range(0, self._model.n_components()+1)
+        if self._str_loss == "log-likelihood":
+            self._model_likelihood = self._model
         else:
-            self._prox.set_application_range(1, self._model.n_components()+1)
-            
-        self._prox.set_pen_const(pen_const=0.0)
+            self._model_likelihood = self._new_model("log-likelihood", decay)
+            self._model_likelihood.set_data(self._model.data, self._model.end_time)
+        # The weights are computed once, then shared by the threads
+        self._model_likelihood.compute_weights()
         
-        self._optimizer.set_model(self._model)
-        self._optimizer.set_prox(self._prox)
+        self._path = self._new_path(self._model)
         
         coarse_grid = np.arange(0, grid_max, grid_step)
         best_kappa, best_score = self._search_grid(coarse_grid)
@@ -183,6 +204,8 @@ class CalibrationEBIC(Calibration):
             best_kappa, best_score = self._search_grid(refine_grid, title="Refined Searching")
             
         self._best_kappa, self._best_score = best_kappa, best_score
+        # The solution at the best constant is already on the path, up to the rounding of the constant
+        self._best_params = self._path.solve(best_kappa) if best_kappa is not None else None
         
     def _search_grid(self, grid, title="Searching"):
         """
@@ -200,16 +223,11 @@ class CalibrationEBIC(Calibration):
             pbar = tqdm(total=len(grid), desc=title, unit="it")
 
         try:
-            for kappa in grid:
-                score = self._ebic_score(kappa)
-
-                # Update progress bar with current kappa and score
-                if self._verbose_bar:
-                    pbar.update(1)
-                    if self._verbose:
-                        pbar.set_postfix({"kappa": kappa, "score": score})
-
-                if score < best_score:
+            # The grid is run down the regularization path, each kappa warm starting the next one
+            scores = self._solve_paths([self._path], [self._ebic_score], grid, pbar)[0]
+            for kappa, score in zip(np.sort(grid)[::-1], scores):
+                # Ties are resolved in favor of the smallest kappa, as in an increasing search
+                if score <= best_score:
                     best_score = score
                     best_kappa = round(kappa, 2)
 
@@ -229,23 +247,18 @@ class CalibrationEBIC(Calibration):
 
         return best_kappa, best_score
         
-    def _ebic_score(self, kappa):
+    def _ebic_score(self, theta_hat):
         n = self._model_likelihood.n_repetitions()
         d = self._model_likelihood.n_components()
         
-        theta_init = np.ones((d, d + 1)) * 0.2
-        
-        self._prox.set_pen_const(pen_const=kappa)
-        self._optimizer.set_prox(self._prox)
-        self._optimizer.optimize(theta_init)
-        theta_hat = self._optimizer.minimizer
+        p = self._model_likelihood.n_coeffs()
         
         if self._penalty_mu:
             non_zero = np.count_nonzero(theta_hat)
-            total = d * (d + 1)
+            total = d * p
         else:
             non_zero = np.count_nonzero(theta_hat[:, 1:])
-            total = d * d
+            total = d * (p - 1)
         
         log_comb_term = gammaln(total + 1) - (gammaln(non_zero + 1) + gammaln(total - non_zero + 1))
         
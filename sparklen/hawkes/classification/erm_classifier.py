@@ -9,6 +9,8 @@ from sparklen.plot import plot_confusion_matrix
 
 import numpy as np
 
+from sparklen.hawkes.data import PackedEvents
+
 from tqdm import tqdm
 
 import time
@@ -129,7 +131,7 @@ class ERMCLassifier():
         
         Parameters
         ----------
-        X : list of list of ndarray
+        X : list of list of ndarray or PackedEvents
             The training input samples. The outer list has length `n`, 
             representing repetitions. Each inner list has length `d`, where 
             each element is a one-dimensional ndarray containing the 
@@ -231,7 +233,7 @@ class ERMCLassifier():
 
         Parameters
         ----------
-        X : list of list of ndarray
+        X : list of list of ndarray or PackedEvents
             The input samples. The outer list has length `n`, representing  
             repetitions. Each inner list has length `d`, where each element  
             is a one-dimensional `ndarray` containing the event times of a  
@@ -262,7 +264,7 @@ class ERMCLassifier():
         
         Parameters
         ----------
-        X : list of list of ndarray
+        X : list of list of ndarray or PackedEvents
             The input samples. The outer list has length `n`, representing  
             repetitions. Each inner list has length `d`, where each element  
             is a one-dimensional `ndarray` containing the event times of a  
@@ -284,6 +286,9 @@ class ERMCLassifier():
         if not self._is_fitted:
                 raise ValueError("Training has not been completed. You must call fit() before getting the predict class probabilities.")
         
+        if isinstance(X, PackedEvents):
+            X = X.to_list()
+        
         if end_time is None:
             end_time = max([max((np.max(events, initial=0.0) for events in inner), default=0.0) for inner in X])
             
@@ -311,7 +316,7 @@ class ERMCLassifier():
         
         Parameters
         ----------
-        X : list of list of ndarray
+        X : list of list of ndarray or PackedEvents
             The test input samples. The outer list has length `n`, representing  
             repetitions. Each inner list has length `d`, where each element  
             is a one-dimensional `ndarray` containing the event times of a  
@@ -353,7 +358,7 @@ class ERMCLassifier():
 
         Parameters
         ----------
-        X : list of list of ndarray
+        X : list of list of ndarray or PackedEvents
             The test input samples. The outer list has length `n`, representing  
             repetitions. Each inner list has length `d`, where each element  
             is a one-dimensional `ndarray` containing the event times of a  
@@ -11,6 +11,8 @@ from sparklen.plot import plot_confusion_matrix
 
 import numpy as np
 
+from sparklen.hawkes.data import PackedEvents
+
 from tqdm import tqdm
 
 import time
@@ -177,7 +179,7 @@ class ERMLRCLassifier():
         
         Parameters
         ----------
-        X : list of list of ndarray
+        X : list of list of ndarray or PackedEvents
             The training input samples. The outer list has length `n`, 
             representing repetitions. Each inner list has length `d`, where 
             each element is a one-dimensional ndarray containing the 
@@ -282,7 +284,7 @@ class ERMLRCLassifier():
 
         Parameters
         ----------
-        X : list of list of ndarray
+        X : list of list of ndarray or PackedEvents
             The input samples. The outer list has length `n`, representing  
             repetitions. Each inner list has length `d`, where each element  
             is a one-dimensional `ndarray` containing the event times of a  
@@ -313,7 +315,7 @@ class ERMLRCLassifier():
         
         Parameters
         ----------
-        X : list of list of ndarray
+        X : list of list of ndarray or PackedEvents
             The input samples. The outer list has length `n`, representing  
             repetitions. Each inner list has length `d`, where each element  
             is a one-dimensional `ndarray` containing the event times of a  
@@ -335,6 +337,9 @@ class ERMLRCLassifier():
         if not self._is_fitted:
                 raise ValueError("Training has not been completed. You must call fit() before getting the predict class probabilities.")
         
+        if isinstance(X, PackedEvents):
+            X = X.to_list()
+        
         if end_time is None:
             end_time = max([max((np.max(events, initial=0.0) for events in inner), default=0.0) for inner in X])
             
@@ -362,7 +367,7 @@ class ERMLRCLassifier():
         
         Parameters
         ----------
-        X : list of list of ndarray
+        X : list of list of ndarray or PackedEvents
             The test input samples. The outer list has length `n`, representing  
             repetitions. Each inner list has length `d`, where each element  
             is a one-dimensional `ndarray` containing the event times of a  
@@ -404,7 +409,7 @@ class ERMLRCLassifier():
 
         Parameters
         ----------
-        X : list of list of ndarray
+        X : list of list of ndarray or PackedEvents
             The test input samples. The outer list has length `n`, representing  
             repetitions. Each inner list has length `d`, where each element  
             is a one-dimensional `ndarray` containing the event times of a  
@@ -0,0 +1,8 @@
+# init file for package
+
+from .packed_events import PackedEvents, PackedEventsWriter
+
+__all__ = [
+    'PackedEvents',
+    'PackedEventsWriter'
+]
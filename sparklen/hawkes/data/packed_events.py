@@ -0,0 +1,382 @@
+# Author: Romain E. Lacoste
+# License: BSD-3-Clause
+
+import os
+import struct
+
+import numpy as np
+
+class PackedEvents():
+    """
+    Packed container for repeated paths of a multivariate point process.
+
+    All the event times are stored in a single flat buffer, ordered by
+    repetition and then by component, together with an offset table
+    locating each path inside this buffer.
+
+    The events of the `j`-th component in the `i`-th repetition are
+
+    .. code-block:: python
+
+        timestamps[offsets[i, j]:offsets[i, j+1]]
+
+    The container behaves as the nested `list of list of ndarray` form used
+    throughout the package: `len`, iteration and integer indexing return
+    the repetitions as lists of `d` arrays, which are views on the buffer.
+    It can therefore be passed wherever such data is expected, the compiled
+    models reading the buffer directly without any conversion.
+
+    Parameters
+    ----------
+    timestamps : ndarray of shape (n_events, )
+        Flat buffer of event times, ordered by repetition, then by component.
+
+    offsets : ndarray of shape (n, d+1)
+        Offset table of the paths. Each row must be non-decreasing, the
+        first row must start at zero, each row must start where the previous
+        one ends and the last row must end at `n_events`.
+
+    Attributes
+    ----------
+    timestamps : ndarray of shape (n_events, )
+        The flat buffer of event times. This is a read-only property.
+
+    offsets : ndarray of shape (n, d+1)
+        The offset table of the paths. This is a read-only property.
+
+    components : ndarray of shape (n_events, )
+        The component index of each event of the buffer. It is computed
+        on first access. This is a read-only property.
+
+    Notes
+    ----------
+    The conversion from the nested form, see :meth:`from_list`, requires one
+    copy of the event times into the flat buffer. The conversion back to the
+    nested form, see :meth:`to_list`, as well as slicing a contiguous range
+    of repetitions, do not copy any event time.
+
+    On disk, the container is a directory holding the buffer and the offset
+    table as `timestamps.npy` and `offsets.npy`, see :meth:`save`. It can be
+    written in chunks with a :class:`PackedEventsWriter`, and :meth:`load`
+    maps the buffer into memory, so that the compiled models read paths
+    larger than the memory without loading them.
+    """
+
+    def __init__(self, timestamps, offsets):
+        timestamps = np.ascontiguousarray(timestamps, dtype=np.float64)
+        offsets = np.ascontiguousarray(offsets, dtype=np.int64)
+
+        if timestamps.ndim != 1:
+            raise ValueError(f"The timestamps buffer should be one-dimensional, but got {timestamps.ndim} dimensions instead.")
+        if offsets.ndim != 2 or offsets.shape[0] < 1:
+            raise ValueError("The offset table should be two-dimensional with at least one repetition")
+        if offsets.shape[1] < 2:
+            raise ValueError("The dimension of the network should be at least one")
+        if offsets[0, 0] != 0 or offsets[-1, -1] != timestamps.shape[0]:
+            raise ValueError(f"The offset table should span the whole timestamps buffer [0, {timestamps.shape[0]}], "
+                             f"but got [{offsets[0, 0]}, {offsets[-1, -1]}] instead.")
+        if np.any(np.diff(offsets, axis=1) < 0):
+            raise ValueError("The offsets of each repetition should be non-decreasing")
+        if np.any(offsets[1:, 0] != offsets[:-1, -1]):
+            raise ValueError("Each repetition should start where the previous one ends")
+
+        self._timestamps = timestamps
+        self._offsets = offsets
+        self._components = None
+
+    @classmethod
+    def from_list(cls, data):
+        """
+        Pack repeated paths given in the nested form.
+
+        Parameters
+        ----------
+        data : list of list of ndarray
+            Repeated paths of a point process. The outer list has length `n`,
+            representing the number of repetitions. Each inner list has length `d`,
+            corresponding to the number of components of the process.
+
+        Returns
+        -------
+        PackedEvents
+            The packed container holding a copy of the event times.
+        """
+        if isinstance(data, PackedEvents):
+            return data
+        if not len(data) >= 1:
+            raise ValueError("The data should have at least one repetition")
+        n_components = len(data[0])
+        if not n_components >= 1:
+            raise ValueError("The dimension of the network should be at least one")
+        for index, sublist in enumerate(data):
+            if len(sublist) != n_components:
+                raise ValueError(f"The inner length of the {index}-th repetition of data should match the number of components {n_components}, "
+                          f"but got {len(sublist)} instead.")
+
+        events = [np.asarray(path, dtype=np.float64).ravel() for inner in data for path in inner]
+        lengths = np.fromiter((path.shape[0] for path in events), dtype=np.int64, count=len(events))
+
+        offsets = np.zeros((len(data), n_components+1), dtype=np.int64)
+        offsets[:, 1:] = np.cumsum(lengths).reshape(len(data), n_components)
+        offsets[1:, 0] = offsets[:-1, -1]
+
+        return cls(np.concatenate(events), offsets)
+
+    @classmethod
+    def concatenate(cls, parts):
+        """
+        Concatenate the repetitions of several packed containers.
+
+        Parameters
+        ----------
+        parts : list of PackedEvents
+            The containers to concatenate, in order. They must have the
+            same number of components.
+
+        Returns
+        -------
+        PackedEvents
+            The packed container holding a copy of the repetitions of all
+            the containers.
+        """
+        if not len(parts) >= 1:
+            raise ValueError("There should be at least one container to concatenate")
+        n_components = parts[0].n_components
+        for index, part in enumerate(parts):
+            if part.n_components != n_components:
+                raise ValueError(f"The {index}-th container should have {n_components} components, "
+                                 f"but got {part.n_components} instead.")
+
+        shifts = np.cumsum([0] + [part.n_events for part in parts[:-1]])
+        offsets = np.concatenate([part.offsets - part.offsets[0, 0] + shift for part, shift in zip(parts, shifts)])
+        timestamps = np.concatenate([part.timestamps for part in parts])
+
+        return cls(timestamps, offsets)
+
+    def save(self, path):
+        """
+        Save the container to a directory, which is created if needed.
+
+        Parameters
+        ----------
+        path : str
+            The directory receiving `timestamps.npy` and `offsets.npy`.
+        """
+        with PackedEventsWriter(path, self.n_components) as writer:
+            writer.write(self)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """
+        Load a container saved to a directory.
+
+        Parameters
+        ----------
+        path : str
+            The directory holding `timestamps.npy` and `offsets.npy`.
+
+        mmap : bool, default=True
+            Determines whether the timestamps buffer is memory-mapped in
+            read-only mode, its pages being read on access, rather than
+            loaded into memory. The offset table is always loaded.
+
+        Returns
+        -------
+        PackedEvents
+            The packed container.
+        """
+        timestamps = np.load(os.path.join(path, "timestamps.npy"), mmap_mode="r" if mmap else None)
+        offsets = np.load(os.path.join(path, "offsets.npy"))
+        return cls(timestamps, offsets)
+
+    def to_list(self):
+        """
+        Convert to the nested form, without copying the event times.
+
+        Returns
+        -------
+        list of list of ndarray
+            Repeated paths, where each array is a view on the timestamps buffer.
+        """
+        return [self._unpack(row) for row in self._offsets.tolist()]
+
+    def _unpack(self, row):
+        return [self._timestamps[start:end] for start, end in zip(row[:-1], row[1:])]
+
+    @property
+    def timestamps(self):
+        return self._timestamps
+
+    @property
+    def offsets(self):
+        return self._offsets
+
+    @property
+    def components(self):
+        if self._components is None:
+            component_index = np.tile(np.arange(self.n_components, dtype=np.int64), self.n_repetitions)
+            self._components = np.repeat(component_index, np.diff(self._offsets, axis=1).ravel())
+        return self._components
+
+    @property
+    def n_repetitions(self):
+        return self._offsets.shape[0]
+
+    @property
+    def n_components(self):
+        return self._offsets.shape[1] - 1
+
+    @property
+    def n_events(self):
+        return self._timestamps.shape[0]
+
+    def __len__(self):
+        return self.n_repetitions
+
+    def __iter__(self):
+        for row in self._offsets.tolist():
+            yield self._unpack(row)
+
+    def __getitem__(self, key):
+        """
+        Index the repetitions.
+
+        An integer returns the corresponding path as a list of `d` views.
+        A slice returns a `PackedEvents` sharing the timestamps buffer when
+        its step is one. An array of indices or a boolean mask returns a
+        `PackedEvents` holding a copy of the selected repetitions.
+        """
+        if isinstance(key, (int, np.integer)):
+            return self._unpack(self._offsets[key].tolist())
+
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self.n_repetitions)
+            if step == 1 and stop > start:
+                begin, end = self._offsets[start, 0], self._offsets[stop-1, -1]
+                return PackedEvents(self._timestamps[begin:end], self._offsets[start:stop] - begin)
+
+        indices = np.arange(self.n_repetitions)[key]
+        if indices.ndim != 1 or indices.shape[0] < 1:
+            raise IndexError("The selection should contain at least one repetition")
+
+        starts = self._offsets[indices, 0]
+        lengths = self._offsets[indices, -1] - starts
+        new_starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        gather = np.arange(np.sum(lengths), dtype=np.int64) + np.repeat(starts - new_starts, lengths)
+
+        return PackedEvents(self._timestamps[gather], self._offsets[indices] - (starts - new_starts)[:, None])
+
+    def __repr__(self):
+        class_name = self.__class__.__name__
+        return (f"{class_name}(n_repetitions={self.n_repetitions}, "
+                f"n_components={self.n_components}, n_events={self.n_events})")
+
+
+class PackedEventsWriter():
+    """
+    Writer of packed paths to a directory, in chunks of repetitions.
+
+    The repetitions are appended to `timestamps.npy` and `offsets.npy` as
+    they are written, so that only the current chunk is held in memory.
+    The headers of the files are completed with the final shapes when the
+    writer is closed, the directory then being readable with
+    :meth:`PackedEvents.load`. The writer is a context manager closing
+    itself on exit. A writer closed before receiving any repetition removes
+    its files, a packed container holding at least one repetition.
+
+    Parameters
+    ----------
+    path : str
+        The directory receiving the files, which is created if needed.
+
+    n_components : int
+        The number of components of the written paths.
+    """
+
+    # Size of the headers, reserved before the data and filled on close
+    _header_size = 128
+
+    def __init__(self, path, n_components):
+        if not n_components >= 1:
+            raise ValueError("The dimension of the network should be at least one")
+        self._n_components = n_components
+        self._n_repetitions = 0
+        self._n_events = 0
+
+        os.makedirs(path, exist_ok=True)
+        self._timestamps_file = open(os.path.join(path, "timestamps.npy"), "wb")
+        self._offsets_file = open(os.path.join(path, "offsets.npy"), "wb")
+        self._paths = [self._timestamps_file.name, self._offsets_file.name]
+        for file in (self._timestamps_file, self._offsets_file):
+            file.write(bytes(self._header_size))
+
+    @property
+    def n_repetitions(self):
+        return self._n_repetitions
+
+    @property
+    def n_events(self):
+        return self._n_events
+
+    def write(self, data):
+        """
+        Append repetitions to the files.
+
+        Parameters
+        ----------
+        data : PackedEvents or list of list of ndarray
+            The repetitions to append, with `n_components` components.
+        """
+        if self._timestamps_file is None:
+            raise ValueError("The writer has already been closed.")
+        data = PackedEvents.from_list(data)
+        if data.n_components != self._n_components:
+            raise ValueError(f"The written paths should have {self._n_components} components, but got {data.n_components} instead.")
+
+        data.timestamps.tofile(self._timestamps_file)
+        (data.offsets - data.offsets[0, 0] + self._n_events).tofile(self._offsets_file)
+        self._n_repetitions += data.n_repetitions
+        self._n_events += data.n_events
+
+    def close(self):
+        """
+        Complete the headers with the final shapes and close the files.
+        
+        Raises a ValueError, after removing the files, when no repetition 
+        has been written.
+        """
+        if self._timestamps_file is None:
+            return
+        if self._n_repetitions == 0:
+            self._discard()
+            raise ValueError("No repetition has been written, the files have been removed.")
+        for file, dtype, shape in ((self._timestamps_file, np.dtype(np.float64), (self._n_events,)),
+                                   (self._offsets_file, np.dtype(np.int64), (self._n_repetitions, self._n_components+1))):
+            file.seek(0)
+            file.write(self._npy_header(dtype, shape))
+            file.close()
+        self._timestamps_file = self._offsets_file = None
+
+    def _discard(self):
+        # Close and remove the files, which would not be readable
+        for file in (self._timestamps_file, self._offsets_file):
+            file.close()
+        for path in self._paths:
+            os.remove(path)
+        self._timestamps_file = self._offsets_file = None
+
+    def _npy_header(self, dtype, shape):
+        # Version 1.0 header of the NumPy format, padded with spaces to the reserved size
+        header = "{'descr': %r, 'fortran_order': False, 'shape': %r, }" % (dtype.str, tuple(int(n) for n in shape))
+        header = header.ljust(self._header_size - 11) + "\n"
+        return b"\x93NUMPY\x01\x00" + struct.pack("<H", len(header)) + header.encode("latin1")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # An empty writer left by an exception is discarded without masking it
+        if exc_type is not None and self._timestamps_file is not None and self._n_repetitions == 0:
+            self._discard()
+        else:
+            self.close()
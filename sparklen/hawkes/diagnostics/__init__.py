@@ -0,0 +1,9 @@
+# init file for package
+
+from .compensator import compensator, rescaled_residuals, ks_statistics
+
+__all__ = [
+    'compensator',
+    'rescaled_residuals',
+    'ks_statistics'
+]
\ No newline at end of file
@@ -0,0 +1,248 @@
+# Author: Romain E. Lacoste
+# License: BSD-3-Clause
+
+import numpy as np
+
+from scipy.sparse import csc_matrix
+from scipy.stats import norm
+
+from sparklen.hawkes.data import PackedEvents
+
+from sparklen.hawkes.diagnostics.build.hawkes_diagnostics import HawkesExpCompensator as CppHawkesExpCompensator
+
+def compensator(data, mu, alpha, decay, t, n_threads=1):
+    """
+    Compute the compensator of each component of repeated paths of a Hawkes
+    process with exponential kernel, at given times.
+
+    The compensator of the `j`-th component is the integrated intensity
+
+    .. math::
+        \\Lambda_j(t) = \\mu_j t + \\sum_{j'=1}^d \\alpha_{j,j'} \\sum_{\\ell : t_{j',\\ell} < t}
+        \\left(1 - e^{-\\beta(t-t_{j',\\ell})}\\right)
+
+    It is computed recursively along each path, in a single sweep over its
+    events and the sorted query times, the interactions of an event only
+    updating the components it excites.
+
+    Parameters
+    ----------
+    data : list of list of ndarray or PackedEvents
+        Repeated paths of a Hawkes process. The outer list has length `n`,
+        representing the number of repetitions. Each inner list has length `d`,
+        corresponding to the number of components of the process.
+
+    mu : ndarray of shape (d, )
+        Exogenous intensities of the process.
+
+    alpha : ndarray or sparse matrix of shape (d, d) or (d, d*U)
+        Interaction matrix of the process. For a sum-of-exponentials kernel,
+        one block of `d` columns per decay, as in the parameters estimated by
+        :class:`~sparklen.hawkes.inference.LearnerHawkesExp`.
+
+    decay : float or ndarray of shape (U, )
+        Decay of the exponential kernel, or decays of the sum-of-exponentials kernel.
+
+    t : float or ndarray of shape (m, )
+        The non-negative times at which the compensators are evaluated.
+
+    n_threads : int, default=1
+        The number of threads sharing the repetitions.
+
+    Returns
+    -------
+    ndarray of shape (n, d) or (n, m, d)
+        The compensators of each component of each path, at the time `t`
+        or at each of the times of `t`.
+    """
+    data = PackedEvents.from_list(data)
+    cpp_compensator = _build_compensator(data, mu, alpha, decay, n_threads)
+
+    times = np.atleast_1d(np.asarray(t, dtype=np.float64))
+    if times.ndim != 1:
+        raise ValueError(f"The times should be a float or a one-dimensional array, but got {times.ndim} dimensions instead.")
+    if not np.all(times >= 0):
+        raise ValueError("The times at which the compensator is evaluated should be non-negative.")
+
+    # The paths are swept once along the sorted times
+    order = np.argsort(times, kind="stable")
+    values = cpp_compensator.compute_at_times(data.timestamps, data.offsets, times[order])
+    result = np.empty((data.n_repetitions, times.shape[0], data.n_components), dtype=np.float64)
+    result[:, order] = values.reshape(data.n_repetitions, times.shape[0], data.n_components)
+
+    return result[:, 0] if np.ndim(t) == 0 else result
+
+def rescaled_residuals(data, mu, alpha, decay, n_threads=1):
+    """
+    Compute the time-rescaled residuals of repeated paths of a Hawkes process
+    with exponential kernel.
+
+    By the time-rescaling theorem, the event times of the `j`-th component
+    mapped by its compensator :math:`\\Lambda_j` form a homogeneous Poisson
+    process of unit rate when the parameters are the ones of the process.
+    The residuals, that is the increments
+    :math:`\\Lambda_j(t_{j,k}) - \\Lambda_j(t_{j,k-1})`, are then independent
+    and follow a standard exponential distribution.
+
+    Parameters
+    ----------
+    data : list of list of ndarray or PackedEvents
+        Repeated paths of a Hawkes process, see :func:`compensator`.
+
+    mu : ndarray of shape (d, )
+        Exogenous intensities of the process.
+
+    alpha : ndarray or sparse matrix of shape (d, d) or (d, d*U)
+        Interaction matrix of the process, see :func:`compensator`.
+
+    decay : float or ndarray of shape (U, )
+        Decay of the exponential kernel, or decays of the sum-of-exponentials kernel.
+
+    n_threads : int, default=1
+        The number of threads sharing the repetitions.
+
+    Returns
+    -------
+    PackedEvents
+        The residuals, with the layout of the data: the `k`-th residual of
+        the `j`-th component of the `i`-th path is the one of its `k`-th event.
+    """
+    data = PackedEvents.from_list(data)
+    cpp_compensator = _build_compensator(data, mu, alpha, decay, n_threads)
+
+    values = cpp_compensator.compute_at_events(data.timestamps, data.offsets)
+
+    # Increments within each component of each path, the first event starting from zero
+    previous = np.concatenate(([0.], values[:-1]))
+    lengths = np.diff(data.offsets, axis=1).ravel()
+    previous[data.offsets[:, :-1].ravel()[lengths > 0]] = 0.
+
+    return PackedEvents(values - previous, data.offsets)
+
+def ks_statistics(data, mu, alpha, decay, end_time=None, n_threads=1):
+    """
+    Compute the Kolmogorov-Smirnov goodness-of-fit statistics of each
+    component of repeated paths of a Hawkes process with exponential kernel.
+
+    The time-rescaled residuals of each component, see :func:`rescaled_residuals`,
+    are pooled over all the repetitions, together with the censored interval
+    :math:`\\Lambda_j(T) - \\Lambda_j(t_{j,N_j(T)})` between the last event
+    and the end time. Under the model, the rescaled process is a unit Poisson
+    process stopped at :math:`\\Lambda_j(T)`, so that the number of residuals
+    below `x`, minus the sum of the residuals and censored intervals capped at
+    `x`, is centered for each `x`. The statistic is its largest deviation,
+    normalized by the total compensator :math:`\\sum_i \\Lambda_j(T)`, and the
+    p-value is given by the supremum of a Brownian motion on `[0, 1]`, which
+    is its asymptotic distribution. Unlike the test of the residuals against
+    the exponential distribution, it holds whatever the length of the paths.
+
+    Parameters
+    ----------
+    data : list of list of ndarray or PackedEvents
+        Repeated paths of a Hawkes process, see :func:`compensator`.
+
+    mu : ndarray of shape (d, )
+        Exogenous intensities of the process.
+
+    alpha : ndarray or sparse matrix of shape (d, d) or (d, d*U)
+        Interaction matrix of the process, see :func:`compensator`.
+
+    decay : float or ndarray of shape (U, )
+        Decay of the exponential kernel, or decays of the sum-of-exponentials kernel.
+
+    end_time : float, default=None
+        The end time of the observation period. If `end_time=None`, it is
+        set to the largest observed event time across all components and
+        repetitions.
+
+    n_threads : int, default=1
+        The number of threads sharing the repetitions.
+
+    Returns
+    -------
+    statistics : ndarray of shape (d, )
+        The Kolmogorov-Smirnov statistic of each component, `nan` for the
+        components with a null compensator.
+
+    pvalues : ndarray of shape (d, )
+        The corresponding two-sided p-values.
+    """
+    data = PackedEvents.from_list(data)
+    if end_time is None:
+        end_time = np.max(data.timestamps, initial=0.0)
+    if not end_time >= np.max(data.timestamps, initial=0.0):
+        raise ValueError("The end time should not be smaller than the event times.")
+    cpp_compensator = _build_compensator(data, mu, alpha, decay, n_threads)
+    n_repetitions, n_components = data.n_repetitions, data.n_components
+
+    values = cpp_compensator.compute_at_events(data.timestamps, data.offsets)
+    totals = cpp_compensator.compute_at_times(data.timestamps, data.offsets, np.array([end_time], dtype=np.float64)).ravel()
+
+    # Residuals, and the censored interval of each component of each path
+    previous = np.concatenate(([0.], values[:-1]))
+    lengths = np.diff(data.offsets, axis=1).ravel()
+    previous[data.offsets[:, :-1].ravel()[lengths > 0]] = 0.
+    last = np.zeros(n_repetitions*n_components)
+    last[lengths > 0] = values[data.offsets[:, 1:].ravel()[lengths > 0] - 1]
+
+    durations = np.concatenate((values - previous, totals - last))
+    components = np.concatenate((data.components, np.tile(np.arange(n_components), n_repetitions)))
+    observed = np.concatenate((np.ones(data.n_events), np.zeros(n_repetitions*n_components)))
+
+    # Durations sorted by component then value, the deviation being extremal at the observed ones
+    order = np.lexsort((durations, components))
+    durations, components, observed = durations[order], components[order], observed[order]
+    counts = np.bincount(components, minlength=n_components)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    ranks = np.arange(durations.shape[0]) - starts[components]
+
+    cum_durations = np.cumsum(durations)
+    cum_observed = np.cumsum(observed)
+    below = cum_durations - durations - np.concatenate(([0.], cum_durations))[starts][components]
+    n_below = cum_observed - np.concatenate(([0.], cum_observed))[starts][components]
+    capped = below + durations*(counts[components] - ranks)
+
+    scale = np.bincount(components, weights=durations, minlength=n_components)
+    upper = np.full(n_components, -np.inf)
+    lower = np.full(n_components, np.inf)
+    np.maximum.at(upper, components, n_below - capped)
+    np.minimum.at(lower, components, n_below - observed - capped)
+
+    statistics = np.full(n_components, np.nan)
+    valid = scale > 0
+    statistics[valid] = np.maximum(upper[valid], -lower[valid]) / np.sqrt(scale[valid])
+    pvalues = np.full(n_components, np.nan)
+    pvalues[valid] = _sup_brownian_sf(statistics[valid])
+
+    return statistics, pvalues
+
+def _sup_brownian_sf(x):
+    """ Survival function of the supremum of the absolute value of a Brownian motion on [0, 1]. """
+    x = np.asarray(x, dtype=np.float64)
+    k = np.arange(50)[:, None]
+    # Alternating series of normal tails for the large values, theta series for the small ones
+    tails = 4*np.sum((-1.)**k * norm.sf((2*k+1)*np.maximum(x, 1.)), axis=0)
+    small = np.maximum(x, 1e-3)
+    thetas = 1 - 4/np.pi*np.sum((-1.)**k/(2*k+1) * np.exp(-(2*k+1)**2*np.pi**2/(8*small**2)), axis=0)
+    return np.clip(np.where(x >= 1., tails, thetas), 0., 1.)
+
+def _build_compensator(data, mu, alpha, decay, n_threads):
+    """ Check the parameters against the data, and build the compiled compensator. """
+    decays = np.atleast_1d(np.asarray(decay, dtype=np.float64))
+    if decays.ndim != 1 or not np.all(decays > 0):
+        raise ValueError("The decays of the kernel should be positive.")
+
+    mu = np.ascontiguousarray(mu, dtype=np.float64)
+    if mu.shape != (data.n_components,):
+        raise ValueError(f"The exogenous intensities should be of shape ({data.n_components},), but got {mu.shape} instead.")
+
+    # Compressed columns, the column u*d+j' holding the interactions of the j'-th component for the u-th decay
+    adjacency = csc_matrix(alpha, dtype=np.float64)
+    if adjacency.shape != (data.n_components, data.n_components*decays.shape[0]):
+        raise ValueError(f"The interaction matrix should be of shape ({data.n_components}, {data.n_components*decays.shape[0]}), "
+                         f"but got {adjacency.shape} instead.")
+
+    cpp_compensator = CppHawkesExpCompensator(mu, adjacency.indptr.astype(np.int64), adjacency.indices.astype(np.int64),
+                                              np.ascontiguousarray(adjacency.data, dtype=np.float64), decays)
+    cpp_compensator.set_n_threads(n_threads)
+    return cpp_compensator
@@ -1,17 +1,24 @@
 # Author: Romain E. Lacoste
 # License: BSD-3-Clause
 
+import os
+
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
 
 from sklearn.base import BaseEstimator
 
 from tabulate import tabulate
 
+from sparklen.hawkes.data import PackedEvents
 from sparklen.hawkes.model import ModelHawkesExpLeastSquares, ModelHawkesExpLogLikelihood
+from sparklen.hawkes.model import ModelHawkesSumExpLeastSquares, ModelHawkesSumExpLogLikelihood
 from sparklen.prox import ProxZero, ProxL1, ProxL2, ProxElasticNet
-from sparklen.optim.optimizer import GD, AGD
+from sparklen.optim.optimizer import GD, AGD, Direct, RowAGD, CD
 from sparklen.optim.lr import LipschitzLR, BacktrackingLineSearchLR, TwoWayBacktrackingLineSearchLR
 from sparklen.calibration import CalibrationCV, CalibrationEBIC
+from sparklen.hawkes.diagnostics import compensator, ks_statistics
 from sparklen.plot import plot_values, plot_support
 
 class LearnerHawkesExp(BaseEstimator):
@@ -56,10 +63,21 @@ class LearnerHawkesExp(BaseEstimator):
     
     Parameters
     ----------
-    decay : float
+    decay : float, array-like of shape (U,) or 'auto'
         The decay hyperparameter of the exponential kernel of the process. 
         This scalar dictates how quick the influences vanish over time. 
         
+        If an array of `U` decays is given, the kernel is a sum of exponentials, 
+        one per decay, and the estimated parameters are of shape `(d, d*U+1)`, 
+        see :class:`~sparklen.hawkes.model.ModelHawkesSumExpLeastSquares`.
+        
+        If `decay='auto'`, it is selected when fitting by minimizing a held-out 
+        score: the last `1/cv` of the repetitions are held out, the unpenalized 
+        estimator is fitted on the others for each candidate decay, and scored 
+        by the loss on the held-out repetitions. A coarse logarithmic grid, 
+        scaled by the event rate, brackets the best decay, which is then refined 
+        by golden-section search. This requires at least two repetitions.
+        
     loss : str, {'least-squares', 'log-likelihood'}, default='least-squares'
         Specifies the loss function to be used. The available options are:
 
@@ -84,11 +102,20 @@ class LearnerHawkesExp(BaseEstimator):
         If `penalty='none'`, no calibration is applied, and the corresponding 
         entry in `kappa_choices` is effectively ignored.
     
-    optimizer : str, {'gd', 'agd'}, default='agd'
+    optimizer : str, {'gd', 'agd', 'row-agd', 'cd', 'direct'}, default='agd'
         Specifies the optimization algorithm to use. The possible options are:
         
         - 'gd' : Gradient Descent (GD)
         - 'agd' : Accelerated Gradient Descent (AGD)
+        - 'row-agd' : Accelerated Gradient Descent run separately on each row, 
+          with its own step size and stopping rule, the rows being evaluated 
+          in parallel over `n_threads` threads.
+        - 'cd' : Coordinate Descent on the statistics of the least-squares 
+          loss, usable only if `loss='least-squares'`. It is well suited to 
+          the lasso and elastic-net penalties on sparse networks. 
+        - 'direct' : Closed-form solver, usable only if `loss='least-squares'` 
+          and `penalty` is 'none' or 'ridge'. The accelerated gradient descent 
+          is used only if the solution violates the positivity constraint.
     
     lr_scheduler : str, {'lipschitz', 'backtracking'}, default='backtracking'
         Specifies the learning rate scheduler. The available options are:
@@ -140,13 +167,30 @@ class LearnerHawkesExp(BaseEstimator):
     record_every : int, default=5
         Specifies the frequency at which history information is recorded. 
         Information will be recorded when the iteration number is a multiple of `record_every`.
+    
+    n_threads : int, default=1
+        The number of threads used by the models to compute the weights and 
+        to evaluate the loss and its gradient, both during the calibration 
+        and the final optimization. If `n_threads=-1`, all the processors are used.
+        
+    n_jobs : int, default=1
+        The number of candidate decays evaluated concurrently on the coarse grid 
+        when `decay='auto'`, and the number of threads solving the penalized 
+        problems concurrently during the calibration. The compiled models 
+        release the GIL, so the candidates run in parallel threads. If `n_jobs=-1`, 
+        all the processors are used.
         
     Attributes
     ----------
-    estimated_params : ndarray of shape (d, d+1)
+    estimated_params : ndarray of shape (d, d+1) or (d, d*U+1)
         The estimated parameters for this learner. The first column corresponds to 
         the estimated exogenous intensity parameter, while the next `d` columns 
-        represent the estimated interaction matrix. This is a read-only property.
+        represent the estimated interaction matrix, one block of `d` columns per 
+        decay for a sum-of-exponentials kernel. This is a read-only property.
+        
+    selected_decay : float
+        The decay used for the estimation, either the given one or the one 
+        selected when `decay='auto'`. This is a read-only property.
         
     Notes
     ----------
@@ -159,6 +203,11 @@ class LearnerHawkesExp(BaseEstimator):
         "log-likelihood" : ModelHawkesExpLogLikelihood
     }
     
+    _sumexp_losses = {
+        "least-squares" : ModelHawkesSumExpLeastSquares,
+        "log-likelihood" : ModelHawkesSumExpLogLikelihood
+    }
+    
     _penalties = {
         "none" : ProxZero,
         "lasso" : ProxL1,
@@ -174,7 +223,10 @@ class LearnerHawkesExp(BaseEstimator):
     
     _optimizers = {
         "gd" : GD,
-        "agd" : AGD
+        "agd" : AGD,
+        "row-agd" : RowAGD,
+        "cd" : CD,
+        "direct" : Direct
     }
     
     _lr_schedulers = {
@@ -183,18 +235,26 @@ class LearnerHawkesExp(BaseEstimator):
         "fast-backtracking" : TwoWayBacktrackingLineSearchLR
     }
     
+    # Candidate decays of the coarse search, relative to the event rate per component
+    _decay_grid = np.geomspace(0.1, 100.0, 10)
+    
+    # Width, on the logarithmic scale, at which the golden-section search stops
+    _decay_tol = 0.05
+    
     def __init__(self, decay=None, loss="least-squares", 
                  penalty="lasso", kappa_choice="ebic", 
                  optimizer="agd", lr_scheduler="backtracking",
                  max_iter=100, tol=1e-5, penalty_mu=False, 
                  cv=5, gamma=1.0, verbose_bar=True, verbose=True, 
-                 print_every=5, record_every=5):
+                 print_every=5, record_every=5, n_threads=1, n_jobs=1):
         
+        if isinstance(decay, str) and decay != "auto":
+            raise ValueError(f"The decay should be a float or 'auto', but got '{decay}' instead.")
         self._decay = decay
         
         if loss not in self._losses:
             raise ValueError(f"The choosen loss, '{loss}', is not available for Hawkes model with exponential kernel. Choose instead from {list(self._losses.keys())}.")
-        self._model = self._losses[loss]()
+        self._model = self._losses[loss](n_threads=n_threads)
         self._str_loss = loss
         
         if penalty not in self._penalties:
@@ -202,16 +262,21 @@ class LearnerHawkesExp(BaseEstimator):
         self._prox = self._penalties[penalty]()
         self._str_penalty = penalty
         
+        if optimizer == "direct" and (loss != "least-squares" or penalty not in ("none", "ridge")):
+            raise ValueError(f"The direct optimizer requires loss='least-squares' and penalty 'none' or 'ridge', but got loss='{loss}' and penalty='{penalty}' instead.")
+        if optimizer == "cd" and loss != "least-squares":
+            raise ValueError(f"The cd optimizer requires loss='least-squares', but got loss='{loss}' instead.")
+        
         if kappa_choice not in self._kappa_choices:
             raise ValueError(f"The choosen criteria to tune the penalization constant, '{kappa_choice}', is not available. Choose instead from {list(self._penalties.keys())}.")
         self._str_kappa_choice = kappa_choice
         if self._str_penalty != "none":
             if kappa_choice == "cv":
-                self._calibration = self._kappa_choices[kappa_choice](cv, loss, penalty, optimizer, lr_scheduler, max_iter, tol, penalty_mu, verbose_bar, verbose)
+                self._calibration = self._kappa_choices[kappa_choice](cv, loss, penalty, optimizer, lr_scheduler, max_iter, tol, penalty_mu, verbose_bar, verbose, n_threads, n_jobs)
             elif kappa_choice == "bic":
-                self._calibration = self._kappa_choices[kappa_choice](0.0, loss, penalty, optimizer, lr_scheduler, max_iter, tol, penalty_mu, verbose_bar, verbose)
+                self._calibration = self._kappa_choices[kappa_choice](0.0, loss, penalty, optimizer, lr_scheduler, max_iter, tol, penalty_mu, verbose_bar, verbose, n_threads, n_jobs)
             elif kappa_choice == "ebic":
-                self._calibration = self._kappa_choices[kappa_choice](gamma, loss, penalty, optimizer, lr_scheduler, max_iter, tol, penalty_mu, verbose_bar, verbose)
+                self._calibration = self._kappa_choices[kappa_choice](gamma, loss, penalty, optimizer, lr_scheduler, max_iter, tol, penalty_mu, verbose_bar, verbose, n_threads, n_jobs)
         else:
             self._calibration = None
             
@@ -234,7 +299,13 @@ class LearnerHawkesExp(BaseEstimator):
         self._verbose = verbose
         self._print_every = print_every
         self._record_every = record_every
+        self._n_threads = n_threads
+        
+        if not isinstance(n_jobs, (int, np.integer)) or n_jobs == 0 or n_jobs < -1:
+            raise ValueError(f"The number of jobs should be a positive integer or -1, but got {n_jobs} instead.")
+        self._n_jobs = n_jobs
         
+        self._selected_decay = None
         self._best_kappa = None
         self._estimated_params = None
         self._is_fitted = False
@@ -246,7 +317,7 @@ class LearnerHawkesExp(BaseEstimator):
 
         Parameters
         ----------
-        X : list of list of ndarray
+        X : list of list of ndarray or PackedEvents
             Repeated paths of a Hawkes process. The outer list has length `n`, 
             representing the number of repetitions. Each inner list has length `d`, 
             corresponding to the number of components (dimensions) of the Hawkes process. 
@@ -269,24 +340,42 @@ class LearnerHawkesExp(BaseEstimator):
         """
         if self._decay is None:
             raise AttributeError("The kernel decay parameter must have been given to call fit()")
-        self._model.decay = self._decay
-        # We set data to model
-        self._model.set_data(X, end_time)
+        if isinstance(self._decay, str):
+            if self._decay != "auto":
+                raise ValueError(f"The decay should be a float or 'auto', but got '{self._decay}' instead.")
+            # The model of the search already holds the data and the weights of the selected decay
+            self._model = self._select_decay(X, end_time)
+            decay = self._model.decay
+        else:
+            decay = self._decay
+            model_class = self._model_class(decay)
+            if not isinstance(self._model, model_class):
+                self._model = model_class(n_threads=self._n_threads)
+            self._model.decay = decay
+            # We set data to model
+            self._model.set_data(X, end_time)
+        self._selected_decay = decay
         
         if self._penalty_mu:
-            self._prox.set_application_range(0, self._model.n_components()+1)
+            self._prox.set_application_range(0, self._model.n_coeffs())
         else:
-            self._prox.set_application_range(1, self._model.n_components()+1)
+            self._prox.set_application_range(1, self._model.n_coeffs())
         
-        # We tune kappa according to the chosen criteria
+        # We tune kappa according to the chosen criteria, the calibration sharing the model and its weights
+        best_params = None
         if self._str_penalty != "none":
-            self._calibration.calibrate(self._decay, X, end_time)
+            self._calibration.calibrate(decay, X, end_time, model=self._model)
             self._best_kappa = self._calibration.best_kappa
+            best_params = self._calibration.best_params
         else:
             self._best_kappa = 0.0
         
-        # We perform optimization with best kappa
-        x0 = np.ones((self._model.n_components(), self._model.n_components()+1))*0.2
+        # We perform optimization with best kappa, warm started from the calibrated solution
+        if best_params is not None:
+            x0 = best_params
+        else:
+            x0 = np.ones((self._model.n_components(), self._model.n_coeffs()))*0.2
+        
         self._prox.set_pen_const(self._best_kappa)
         self._optimizer.set_model(self._model)
         self._optimizer.set_prox(self._prox)
@@ -294,6 +383,92 @@ class LearnerHawkesExp(BaseEstimator):
         self._estimated_params = self._optimizer.minimizer
         
         self._is_fitted = True
+        
+    def _model_class(self, decay):
+        # Several decays select the sum-of-exponentials kernel
+        losses = self._sumexp_losses if np.ndim(decay) > 0 else self._losses
+        return losses[self._str_loss]
+        
+    def _select_decay(self, X, end_time):
+        """
+        Internal method to select the decay minimizing the held-out score, 
+        by a coarse grid search followed by a golden-section refinement. 
+        It returns the model of the search, set to the selected decay.
+        """
+        # The paths are packed once, the training and held-out parts are subsets of the packed buffer
+        data = PackedEvents.from_list(X)
+        if data.n_repetitions < 2:
+            raise ValueError("The automatic selection of the decay requires at least two repetitions, so that some can be held out")
+        if end_time is None:
+            end_time = np.max(data.timestamps, initial=0.0)
+        if not data.n_events > 0 or not end_time > 0:
+            raise ValueError("The automatic selection of the decay requires at least one event")
+        n_val = max(1, data.n_repetitions // self._cv)
+        train, val = np.arange(data.n_repetitions-n_val), np.arange(data.n_repetitions-n_val, data.n_repetitions)
+        
+        rate = data.n_events / (data.n_repetitions*data.n_components*end_time)
+        log_grid = np.log(rate*self._decay_grid)
+        
+        # A single model on all the repetitions caches the weights of each candidate, 
+        # which its training and held-out subsets share and the final fit reuses
+        model = self._losses[self._str_loss](float(np.exp(log_grid[0])), self._n_threads)
+        model.set_data(data, end_time)
+        
+        n_jobs = self._n_jobs if self._n_jobs > 0 else (os.cpu_count() or 1)
+        with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+            grid_scores = list(executor.map(lambda log_decay: self._decay_score(float(np.exp(log_decay)), model, train, val), log_grid))
+        scores = dict(zip(log_grid, grid_scores))
+        
+        def score(log_decay):
+            if log_decay not in scores:
+                scores[log_decay] = self._decay_score(float(np.exp(log_decay)), model, train, val)
+            return scores[log_decay]
+        
+        # The minimum is bracketed by the neighbours of the best grid point
+        best = int(np.argmin(grid_scores))
+        a, b = log_grid[max(best-1, 0)], log_grid[min(best+1, len(log_grid)-1)]
+        inv_phi = (np.sqrt(5)-1)/2
+        c, e = b - inv_phi*(b-a), a + inv_phi*(b-a)
+        while b - a > self._decay_tol:
+            if score(c) < score(e):
+                b, e = e, c
+                c = b - inv_phi*(b-a)
+            else:
+                a, c = c, e
+                e = a + inv_phi*(b-a)
+        
+        best_log_decay = min(scores, key=scores.get)
+        model.decay = float(np.exp(best_log_decay))
+        model.clear_cache()
+        return model
+    
+    def _decay_score(self, decay, model, train, val):
+        """
+        Internal method to compute the held-out score of the unpenalized 
+        estimator for a given decay.
+        """
+        # Each candidate has its own subsets, prox and optimizer, so that they can run concurrently, 
+        # the subsets sharing the weights of the decay computed once on all the repetitions
+        model_train = model.subset(train, decay)
+        
+        prox = ProxZero()
+        prox.set_pen_const(0.0)
+        prox.set_application_range(0, model_train.n_components()+1)
+        
+        optimizer = self._optimizers[self._str_optimizer](self._str_lr_scheduler, self._max_iter, self._tol, False, False, self._print_every, self._record_every)
+        optimizer.set_model(model_train)
+        optimizer.set_prox(prox)
+        theta_init = np.ones((model_train.n_components(), model_train.n_components()+1))*0.2
+        optimizer.optimize(theta_init)
+        
+        score = model.subset(val, decay).loss(optimizer.minimizer)
+        return score if np.isfinite(score) else np.inf
+    
+    @property
+    def selected_decay(self):
+        if not self._is_fitted:
+                raise ValueError("Estimation has not been completed. You must call fit() before getting the selected decay.")
+        return self._selected_decay
     
     @property
     def estimated_params(self):
@@ -325,7 +500,9 @@ class LearnerHawkesExp(BaseEstimator):
             "verbose_bar": self._verbose_bar,
             "verbose": self._verbose,
             "print_every": self._print_every,
-            "record_every": self._record_every
+            "record_every": self._record_every,
+            "n_threads": self._n_threads,
+            "n_jobs": self._n_jobs
         }
         return params
     
@@ -339,7 +516,7 @@ class LearnerHawkesExp(BaseEstimator):
 
         Parameters
         ----------
-        data : list of list of ndarray
+        data : list of list of ndarray or PackedEvents
             Repeated paths of a Hawkes process. The outer list has length `n`, 
             representing the number of repetitions. Each inner list has length `d`, 
             corresponding to the number of components (dimensions) of the Hawkes process. 
@@ -364,11 +541,70 @@ class LearnerHawkesExp(BaseEstimator):
         if not self._is_fitted:
                 raise ValueError("Estimation has not been completed. You must call fit() before calling score().")
         
-        model_test = self._losses[self._str_loss](self._decay)
+        model_test = self._model_class(self._selected_decay)(self._selected_decay, self._n_threads)
         model_test.set_data(X, end_time)
         
         return -model_test.loss(self._estimated_params)
     
+    def compensator(self, X, t):
+        """
+        Compute the compensator of each component of the given paths at 
+        given times, under the estimated parameters, see 
+        :func:`~sparklen.hawkes.diagnostics.compensator`.
+
+        This method requires that the `fit` method has been called 
+        beforehand to estimate the model parameters.
+
+        Parameters
+        ----------
+        X : list of list of ndarray or PackedEvents
+            Repeated paths of a Hawkes process, see :meth:`score`.
+            
+        t : float or ndarray of shape (m, )
+            The non-negative times at which the compensators are evaluated.
+            
+        Returns
+        -------
+        ndarray of shape (n, d) or (n, m, d)
+            The compensators of each component of each path, at the time `t`
+            or at each of the times of `t`.
+        """
+        if not self._is_fitted:
+                raise ValueError("Estimation has not been completed. You must call fit() before calling compensator().")
+        return compensator(X, self._estimated_params[:, 0], self._estimated_params[:, 1:], 
+                           self._selected_decay, t, self._n_threads)
+    
+    def ks_statistics(self, X, end_time=None):
+        """
+        Compute the Kolmogorov-Smirnov goodness-of-fit statistics of each 
+        component of the given paths under the estimated parameters, from 
+        their time-rescaled residuals pooled over the repetitions, see 
+        :func:`~sparklen.hawkes.diagnostics.ks_statistics`.
+
+        This method requires that the `fit` method has been called 
+        beforehand to estimate the model parameters.
+
+        Parameters
+        ----------
+        X : list of list of ndarray or PackedEvents
+            Repeated paths of a Hawkes process, see :meth:`score`.
+            
+        end_time : float, default=None
+            The end time of the observation period, see :meth:`score`.
+            
+        Returns
+        -------
+        statistics : ndarray of shape (d, )
+            The Kolmogorov-Smirnov statistic of each component.
+            
+        pvalues : ndarray of shape (d, )
+            The corresponding two-sided p-values.
+        """
+        if not self._is_fitted:
+                raise ValueError("Estimation has not been completed. You must call fit() before calling ks_statistics().")
+        return ks_statistics(X, self._estimated_params[:, 0], self._estimated_params[:, 1:], 
+                             self._selected_decay, end_time, self._n_threads)
+    
     def plot_estimated_values(self, save_path=None, save_format='png', dpi=300, use_latex=False):
         """
         Plot the estimated parameter values as heatmaps.
@@ -442,7 +678,8 @@ class LearnerHawkesExp(BaseEstimator):
                 f"max_iter={self._max_iter}, tol={self._tol}, penalty_mu={self._penalty_mu}, "
                 f"cv={self._cv}, gamma={self._gamma}, verbose_bar={self._verbose_bar}, "
                 f"verbose={self._verbose}, print_every={self._print_every}, "
-                f"record_every={self._record_every})")
+                f"record_every={self._record_every}, n_threads={self._n_threads}, "
+                f"n_jobs={self._n_jobs})")
 
     def set_params(self, **params):
         """
@@ -463,6 +700,8 @@ class LearnerHawkesExp(BaseEstimator):
         """
         for key, value in params.items():
             if key == "decay":
+                if isinstance(value, str) and value != "auto":
+                    raise ValueError(f"The decay should be a float or 'auto', but got '{value}' instead.")
                 self._decay = value
             else:
                 raise ValueError(f"Unsupported parameter: {key}")
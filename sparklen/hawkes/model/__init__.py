@@ -2,10 +2,14 @@
 
 from .model_hawkes_exp_least_squares import ModelHawkesExpLeastSquares
 from .model_hawkes_exp_log_likelihood import ModelHawkesExpLogLikelihood
+from .model_hawkes_sumexp_least_squares import ModelHawkesSumExpLeastSquares
+from .model_hawkes_sumexp_log_likelihood import ModelHawkesSumExpLogLikelihood
 from .model_hawkes_exp_classification import ModelHawkesExpClassification
 
 __all__ = [
     'ModelHawkesExpLeastSquares',
     'ModelHawkesExpLogLikelihood',
+    'ModelHawkesSumExpLeastSquares',
+    'ModelHawkesSumExpLogLikelihood',
     'ModelHawkesExpClassification'
 ]
\ No newline at end of file
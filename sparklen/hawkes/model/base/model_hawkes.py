@@ -1,12 +1,20 @@
 # Author: Romain E. Lacoste
 # License: BSD-3-Clause
 
+import os
+
+from threading import Lock
+
+from collections import OrderedDict
+
 from abc import ABC, abstractmethod
 
 from warnings import warn
 
 import numpy as np
 
+from sparklen.hawkes.data import PackedEvents
+
 class ModelHawkes(ABC):
     """
     Abstract class intended as a base class for Hawkes models.
@@ -16,12 +24,21 @@ class ModelHawkes(ABC):
     not for end-users. 
     """
     
-    def __init__(self, decay=None):
+    def __init__(self, decay=None, n_threads=1, cache_size=200):
         
         # Initialize attribute with default value to call the setter
         self._data = None
         self._end_time = None
         self._decay = None
+        self._n_threads = 1
+        
+        # Handle on the compiled model of the current decay, and compiled models 
+        # already computed for the data, keyed on (decay, end_time) by recency. 
+        # The cache is guarded, so that subsets of several decays can be taken concurrently
+        self._cpp_model = None
+        self._weights_cache = OrderedDict()
+        self._cache_lock = Lock()
+        self._cache_size = 200
         
         self._is_data_setted = False
         self._is_decay_setted = False
@@ -30,6 +47,9 @@ class ModelHawkes(ABC):
             self.decay = decay
             self._is_decay_setted = True
         
+        self.n_threads = n_threads
+        self.cache_size = cache_size
+        
     def check_set_state(self):
         if not self._is_data_setted:
             if self._data is None:
@@ -40,23 +60,38 @@ class ModelHawkes(ABC):
             raise AttributeError("The kernel decay parameter must have been set to the ModelHawkes object to run this computation")
     
     def set_data(self, data, end_time=None):
-        # Check data form
-        if not len(data) >= 1:
-            raise ValueError("The data should have at least one repetition")
-        self._n_repetitions = len(data)
-        if not len(data[0]) >= 1:
-            raise ValueError("The dimension of the network should be at least one")
-        self._n_components = len(data[0])
-        for index, sublist in enumerate(data):
-            if len(sublist) != self._n_components:
-                raise ValueError(f"The inner length of the {index}-th repetition of data should match the number of components {self._n_components}, "
-                          f"but got {len(sublist)} instead.")
-        if self._data is not None:
-            warn("The data has already been set. This will overwrite the existing one.", UserWarning)
-        self._data = data
+        if isinstance(data, PackedEvents):
+            # The packed layout has already been validated at construction
+            self._n_repetitions = data.n_repetitions
+            self._n_components = data.n_components
+            if self._data is not None:
+                warn("The data has already been set. This will overwrite the existing one.", UserWarning)
+            self._data = data
+            self._n_events = data.n_events
+        else:
+            # Check data form
+            if not len(data) >= 1:
+                raise ValueError("The data should have at least one repetition")
+            self._n_repetitions = len(data)
+            if not len(data[0]) >= 1:
+                raise ValueError("The dimension of the network should be at least one")
+            self._n_components = len(data[0])
+            for index, sublist in enumerate(data):
+                if len(sublist) != self._n_components:
+                    raise ValueError(f"The inner length of the {index}-th repetition of data should match the number of components {self._n_components}, "
+                              f"but got {len(sublist)} instead.")
+            if self._data is not None:
+                warn("The data has already been set. This will overwrite the existing one.", UserWarning)
+            # Contiguous float64 buffers are shared with the compiled model without 
+            # copy, so the references are kept alive by the object
+            self._data = [[np.ascontiguousarray(events, dtype=np.float64) for events in inner] for inner in data]
+            self._n_events = sum(events.shape[0] for inner in self._data for events in inner)
         # check end_time form
         if end_time is None:
-            self._end_time = max([max((np.max(events, initial=0.0) for events in inner), default=0.0) for inner in data])
+            if isinstance(data, PackedEvents):
+                self._end_time = np.max(data.timestamps, initial=0.0)
+            else:
+                self._end_time = max([max((np.max(events, initial=0.0) for events in inner), default=0.0) for inner in data])
         else:
             if end_time < 0:
                 raise ValueError("The upper bound of observation should be positive")
@@ -64,6 +99,59 @@ class ModelHawkes(ABC):
                 warn("The observation end-time has already been set. This will overwrite the existing one.", UserWarning)
             self._end_time = end_time
         self._is_data_setted = True
+        # The cached weights belong to the previous data
+        with self._cache_lock:
+            self._weights_cache.clear()
+        self._cpp_model = None
+        self._switch_cpp_model()
+        
+    def _switch_cpp_model(self):
+        # Bring in the compiled model of the current (decay, end_time), 
+        # reusing its weights if they have already been computed
+        if not (self._is_data_setted and self._is_decay_setted):
+            return
+        self._cpp_model = self._cached_cpp_model(self._decay)
+        
+    def _cached_cpp_model(self, decay):
+        # Compiled model of the given decay from the cache, created on a miss
+        key = (decay, self._end_time)
+        with self._cache_lock:
+            cpp_model = self._weights_cache.pop(key, None)
+            if cpp_model is None:
+                cpp_model = self._new_cpp_model(decay)
+            cpp_model.set_n_threads(self._n_threads)
+            self._weights_cache[key] = cpp_model
+            self._evict_weights(keep=key)
+        return cpp_model
+        
+    def _evict_weights(self, keep=None):
+        # Drop the least recently used weights beyond the memory budget, 
+        # the ones of the current decay and of the requested one are always kept
+        budget = self._cache_size * 2**20
+        kept = {(self._decay, self._end_time), keep}
+        for key in list(self._weights_cache):
+            if len(self._weights_cache)*self._weights_memory() <= budget:
+                break
+            if key not in kept:
+                del self._weights_cache[key]
+            
+    @abstractmethod
+    def _new_cpp_model(self, decay):
+        """
+        Abstract method, must be implemented in subclasses that inherit it.
+        
+        Create the compiled model holding the data and the given decay.
+        """
+        pass
+    
+    @abstractmethod
+    def _weights_memory(self):
+        """
+        Abstract method, must be implemented in subclasses that inherit it.
+        
+        Estimate the memory, in bytes, taken by the weights of one decay.
+        """
+        pass
         
     def n_repetitions(self):
         return self._n_repetitions
@@ -71,6 +159,13 @@ class ModelHawkes(ABC):
     def n_components(self):
         return self._n_components
     
+    def n_coeffs(self):
+        """
+        Number of coefficients of each row of the parameter theta, 
+        the first one being the exogenous intensity.
+        """
+        return self._n_components+1
+    
     @property
     def data(self):
         return self._data
@@ -85,12 +180,124 @@ class ModelHawkes(ABC):
         
     @decay.setter
     def decay(self, decay):
+        # Switching decays is cheap, the weights of the previous ones stay cached
+        self._decay = self._check_decay(decay)
+        self._is_decay_setted = True
+        self._switch_cpp_model()
+
+    def _check_decay(self, decay):
+        # Validate the decay and return the hashable value keying the weight cache
         if decay < 0:
             raise ValueError("The decay parameter of the kernel should be positive")
-        if self._decay is not None:
-            warn("The decay parameter of the kernel has already been set. This will overwrite the existing one.", UserWarning)
-        self._decay = decay
-        self._is_decay_setted = True
+        return decay
+
+    @property
+    def n_threads(self):
+        return self._n_threads
+    
+    @n_threads.setter
+    def n_threads(self, n_threads):
+        if not isinstance(n_threads, (int, np.integer)) or n_threads == 0 or n_threads < -1:
+            raise ValueError(f"The number of threads should be a positive integer or -1, but got {n_threads} instead.")
+        # Following the scikit-learn convention, -1 means using all the processors
+        self._n_threads = int(n_threads) if n_threads > 0 else (os.cpu_count() or 1)
+        if self._cpp_model is not None:
+            self._cpp_model.set_n_threads(self._n_threads)
+            
+    @property
+    def cache_size(self):
+        return self._cache_size
+    
+    @cache_size.setter
+    def cache_size(self, cache_size):
+        if not cache_size > 0:
+            raise ValueError(f"The size of the weight cache should be positive, but got {cache_size} instead.")
+        self._cache_size = cache_size
+        with self._cache_lock:
+            self._evict_weights()
+            
+    def clear_cache(self):
+        """
+        Drop the cached weights of all decays but the current one.
+        """
+        current = (self._decay, self._end_time)
+        with self._cache_lock:
+            for key in list(self._weights_cache):
+                if key != current:
+                    del self._weights_cache[key]
+
+    def compute_weights(self):
+        """
+        Compute the weights of the model, which only depend on the data 
+        and the decay. They are otherwise computed at the first evaluation. 
+        
+        The computation releases the GIL, so that it can overlap with 
+        other Python threads.
+        """
+        self.check_set_state()
+        self._cpp_model.compute_weights()
+
+    def subset(self, repetitions, decay=None):
+        """
+        Return the model restricted to a subset of the repetitions, with
+        the same observation end-time.
+
+        The weights of each repetition are computed once by this model,
+        then shared with the returned model without copy, so that the
+        models built on overlapping subsets, e.g. the folds of a
+        cross-validation, never recompute them.
+
+        Parameters
+        ----------
+        repetitions : array-like of int
+            Indices of the repetitions to keep.
+            
+        decay : float or array-like, default=None
+            The decay of the returned model. If `decay=None`, the decay of 
+            this model. Other decays take their weights from the cache of 
+            this model, without changing its decay, so that the subsets of 
+            several decays can be taken concurrently, e.g. by a decay search.
+
+        Returns
+        -------
+        model : ModelHawkes
+            The model holding the selected repetitions.
+        """
+        self.check_set_state()
+        repetitions = np.ascontiguousarray(repetitions, dtype=np.int64).reshape(-1)
+        if repetitions.shape[0] < 1:
+            raise ValueError("The subset should contain at least one repetition")
+        if np.any(repetitions < 0) or np.any(repetitions >= self._n_repetitions):
+            raise ValueError(f"The repetitions should be indices between 0 and {self._n_repetitions-1}, but got {repetitions} instead.")
+        if decay is None:
+            decay, full_cpp_model = self._decay, self._cpp_model
+        else:
+            decay = self._check_decay(decay)
+            full_cpp_model = self._cached_cpp_model(decay)
+
+        model = type(self)(decay, self._n_threads, self._cache_size)
+        if isinstance(self._data, PackedEvents):
+            # A range of consecutive repetitions is a view on the packed buffer
+            if np.all(np.diff(repetitions) == 1):
+                model._data = self._data[repetitions[0]:repetitions[-1]+1]
+            else:
+                model._data = self._data[repetitions]
+            model._n_events = model._data.n_events
+        else:
+            model._data = [self._data[rep] for rep in repetitions]
+            model._n_events = sum(events.shape[0] for inner in model._data for events in inner)
+        model._n_repetitions = repetitions.shape[0]
+        model._n_components = self._n_components
+        model._end_time = self._end_time
+        model._is_data_setted = True
+
+        # The compiled model holds the weights of the selected repetitions
+        cpp_model = type(full_cpp_model)()
+        cpp_model.set_subset(full_cpp_model, repetitions)
+        cpp_model.set_n_threads(model._n_threads)
+        model._weights_cache[(model._decay, model._end_time)] = cpp_model
+        model._cpp_model = cpp_model
+        return model
 
     @abstractmethod
     def loss(self, theta):
@@ -116,8 +323,8 @@ class ModelHawkes(ABC):
         self.check_set_state()
         if not isinstance(theta, np.ndarray):
             raise TypeError(f"Input theta parameter should be a NumPy Array, but got {type(theta).__name__} instead.")
-        if theta.shape != (self._n_components, self._n_components+1):
-            raise ValueError(f"Input theta parameter should be of shape {(self._n_components, self._n_components+1)}, but got {theta.shape} instead.")
+        if theta.shape != (self._n_components, self.n_coeffs()):
+            raise ValueError(f"Input theta parameter should be of shape {(self._n_components, self.n_coeffs())}, but got {theta.shape} instead.")
 
         # This part must be implemented in the subclasses method
         pass
@@ -146,12 +353,125 @@ class ModelHawkes(ABC):
         self.check_set_state()
         if not isinstance(theta, np.ndarray):
             raise TypeError(f"Input theta parameter should be a NumPy Array, but got {type(theta).__name__} instead.")
-        if theta.shape != (self._n_components, self._n_components+1):
-            raise ValueError(f"Input theta parameter should be of shape {(self._n_components, self._n_components+1)}, but got {theta.shape} instead.")
+        if theta.shape != (self._n_components, self.n_coeffs()):
+            raise ValueError(f"Input theta parameter should be of shape {(self._n_components, self.n_coeffs())}, but got {theta.shape} instead.")
 
         # This part must be implemented in the subclasses method
         pass
         
+    @abstractmethod
+    def loss_and_grad(self, theta):
+        """
+        Abstract method, must be implemented in subclasses that inherit it.
+        
+        Compute both the value and the gradient of the loss evaluated 
+        at a given point, in a single pass over the model.
+        
+        Parameters
+        ----------
+        theta : ndarray of shape (d, d+1)
+            Parameter of the model. The first column corresponds to 
+            the exogenous intensity parameter. The d next columns 
+            correspond to the interaction matrix. 
+        
+        Returns : 
+        -------
+        float
+            The value of the loss evaluated at the input parameter.
+            
+        ndarray
+            The gradient of the loss evaluated at the input parameter.
+        """
+        
+        # Partially implemented logic in the abstract method
+        self.check_set_state()
+        if not isinstance(theta, np.ndarray):
+            raise TypeError(f"Input theta parameter should be a NumPy Array, but got {type(theta).__name__} instead.")
+        if theta.shape != (self._n_components, self.n_coeffs()):
+            raise ValueError(f"Input theta parameter should be of shape {(self._n_components, self.n_coeffs())}, but got {theta.shape} instead.")
+
+        # This part must be implemented in the subclasses method
+        pass
+        
+    @abstractmethod
+    def loss_rows(self, theta, rows):
+        """
+        Abstract method, must be implemented in subclasses that inherit it.
+        
+        Compute the contributions of the given rows of the parameter to 
+        the loss. The loss is the sum of the contributions of all the rows, 
+        and each one only depends on its own row.
+        
+        Parameters
+        ----------
+        theta : ndarray of shape (d, d+1)
+            Parameter of the model. The first column corresponds to 
+            the exogenous intensity parameter. The d next columns 
+            correspond to the interaction matrix. 
+        
+        rows : array-like of int
+            Indices of the rows to evaluate.
+        
+        Returns : 
+        -------
+        ndarray of shape (len(rows),)
+            The contribution of each given row to the loss.
+        """
+        
+        # Partially implemented logic in the abstract method
+        self._check_theta(theta)
+
+        # This part must be implemented in the subclasses method
+        pass
+    
+    @abstractmethod
+    def loss_and_grad_rows(self, theta, rows):
+        """
+        Abstract method, must be implemented in subclasses that inherit it.
+        
+        Compute both the contributions of the given rows of the parameter 
+        to the loss and the corresponding rows of the gradient, in a single 
+        pass over the model. Only the given rows are evaluated.
+        
+        Parameters
+        ----------
+        theta : ndarray of shape (d, d+1)
+            Parameter of the model. The first column corresponds to 
+            the exogenous intensity parameter. The d next columns 
+            correspond to the interaction matrix. 
+        
+        rows : array-like of int
+            Indices of the rows to evaluate.
+        
+        Returns : 
+        -------
+        ndarray of shape (len(rows),)
+            The contribution of each given row to the loss.
+            
+        ndarray
+            The gradient of the loss, whose rows not in `rows` are zero.
+        """
+        
+        # Partially implemented logic in the abstract method
+        self._check_theta(theta)
+
+        # This part must be implemented in the subclasses method
+        pass
+    
+    def _check_theta(self, theta):
+        self.check_set_state()
+        if not isinstance(theta, np.ndarray):
+            raise TypeError(f"Input theta parameter should be a NumPy Array, but got {type(theta).__name__} instead.")
+        if theta.shape != (self._n_components, self.n_coeffs()):
+            raise ValueError(f"Input theta parameter should be of shape {(self._n_components, self.n_coeffs())}, but got {theta.shape} instead.")
+    
+    def _check_rows(self, rows):
+        # Validate the row indices and convert them for the C++ model
+        rows = np.ascontiguousarray(rows, dtype=np.int64).reshape(-1)
+        if np.any(rows < 0) or np.any(rows >= self._n_components):
+            raise ValueError(f"The rows should be indices between 0 and {self._n_components-1}, but got {rows} instead.")
+        return rows
+        
     @abstractmethod
     def hessian(self):
         """
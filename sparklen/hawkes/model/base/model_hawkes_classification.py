@@ -7,6 +7,8 @@ from warnings import warn
 
 import numpy as np
 
+from sparklen.hawkes.data import PackedEvents
+
 class ModelHawkesClassification(ABC):
     """
     Abstract class intended as a base class for Hawkes classification models.
@@ -45,6 +47,9 @@ class ModelHawkesClassification(ABC):
             raise AttributeError("The kernel decay paremeter must have been set to run this computation")
     
     def set_data(self, X, y, end_time=None):
+        # Paths are accessed one at a time, views on a packed buffer avoid any copy
+        if isinstance(X, PackedEvents):
+            X = X.to_list()
         # Check training data form
         if not len(X) >= 1:
             raise ValueError("The training data should have at least one repetition")
@@ -1,10 +1,14 @@
 # Author: Romain E. Lacoste
 # License: BSD-3-Clause
 
+import numpy as np
+
 from tabulate import tabulate
 
 from sparklen.hawkes.model.build.hawkes_model import ModelHawkesExpLogLikelihood as CppModelHawkesExpLogLikelihood
 
+from sparklen.hawkes.data import PackedEvents
+
 from sparklen.hawkes.model.base.model_hawkes import ModelHawkes
 
 
@@ -58,9 +62,21 @@ class ModelHawkesExpLogLikelihood(ModelHawkes):
         The decay hyperparameter of the exponential kernel of the process. 
         This scalar dictates how quick the influences vanish over time. 
         
+    n_threads : int, default=1
+        The number of threads used by the compiled model to compute the 
+        weights and to evaluate the loss and its gradient. If `n_threads=-1`, 
+        all the processors are used. The results do not depend on it. 
+        
+    cache_size : float, default=200
+        The memory budget, in MB, of the cache holding the weights computed 
+        for the previous decays. Setting back a cached decay, or taking a 
+        subset with it, reuses its weights. The least recently used ones are 
+        evicted beyond the budget. The cache belongs to the model, so that 
+        copies of it, e.g. the clones fitted by `GridSearchCV`, do not share it. 
+        
     Attributes
     ----------
-    data : list of list of ndarray
+    data : list of list of ndarray or PackedEvents
         The data used to set up the model. This is a read-only property.
         
     end_time : float
@@ -68,6 +84,12 @@ class ModelHawkesExpLogLikelihood(ModelHawkes):
         
     decay : float
         The decay parameter used in model calculations. This property can be modified.
+        
+    n_threads : int
+        The number of threads used in model calculations. This property can be modified.
+        
+    cache_size : float
+        The memory budget of the weight cache, in MB. This property can be modified.
     
     Notes
     ----------
@@ -80,9 +102,9 @@ class ModelHawkesExpLogLikelihood(ModelHawkes):
     for least-squares loss. 
         
     """
-    def __init__(self, decay=None):
+    def __init__(self, decay=None, n_threads=1, cache_size=200):
         # Call the initializer of the base class ModelHawkes
-        super().__init__(decay)
+        super().__init__(decay, n_threads, cache_size)
     
     def set_data(self, data, end_time=None):
         """
@@ -90,7 +112,7 @@ class ModelHawkesExpLogLikelihood(ModelHawkes):
 
         Parameters
         ----------
-        data : list of list of ndarray
+        data : list of list of ndarray or PackedEvents
             Repeated paths of a Hawkes process. The outer list has length `n`, 
             representing the number of repetitions. Each inner list has length `d`, 
             corresponding to the number of components (dimensions) of the Hawkes process. 
@@ -98,6 +120,9 @@ class ModelHawkesExpLogLikelihood(ModelHawkes):
             Specifically, `data[i][j]` is a one-dimensional `ndarray` containing 
             the event times of the `j`-th component in the `i`-th realization.
             
+            A :class:`~sparklen.hawkes.data.PackedEvents` is read directly 
+            by the compiled model, without any conversion.
+            
         end_time : float, default=None
             The end time of the observation period. The time horizon defines
             the interval `[0, T]` over which the Hawkes process is observed.
@@ -108,7 +133,21 @@ class ModelHawkesExpLogLikelihood(ModelHawkes):
         """
         # Call the base class logic
         super().set_data(data, end_time)
-        self._cpp_model = CppModelHawkesExpLogLikelihood(self._n_repetitions, self._n_components)
+    
+    def _new_cpp_model(self, decay):
+        # Register the data once on the compiled side, later calls only pass theta
+        cpp_model = CppModelHawkesExpLogLikelihood(self._n_repetitions, self._n_components)
+        if isinstance(self._data, PackedEvents):
+            cpp_model.set_packed_data(self._data.timestamps, self._data.offsets, self._end_time)
+        else:
+            cpp_model.set_data(self._data, self._end_time)
+        cpp_model.set_decay(decay)
+        return cpp_model
+    
+    def _weights_memory(self):
+        # Weights Psi of size d for each event, plus N and I of size d for each repetition
+        d = self._n_components
+        return 8*(d*self._n_events + 2*d*self._n_repetitions)
     
     def loss(self, theta, neg=True):
         """
@@ -134,7 +173,7 @@ class ModelHawkesExpLogLikelihood(ModelHawkes):
         """
         # Call the base class logic
         super().loss(theta)
-        return self._cpp_model.compute_averaged_loss(self._data, self._end_time, self._decay, theta, neg)
+        return self._cpp_model.compute_averaged_loss(theta, neg)
 
     def grad(self, theta, neg=True):
         """
@@ -160,7 +199,103 @@ class ModelHawkesExpLogLikelihood(ModelHawkes):
         """
         # Call the base class logic
         super().grad(theta)
-        return self._cpp_model.compute_averaged_grad(self._data, self._end_time, self._decay, theta, neg)
+        return self._cpp_model.compute_averaged_grad(theta, neg)
+    
+    def loss_and_grad(self, theta, neg=True):
+        """
+        Compute both the value and the gradient of the log-likelihood loss 
+        evaluated at the given input parameter, in a single pass.
+        
+        Parameters
+        ----------
+        theta : ndarray of shape (d, d+1)
+            Parameter of the model. The first column corresponds to 
+            the exogenous intensity parameter. The `d` next columns 
+            correspond to the interaction matrix. 
+            
+        neg : bool, default=True
+            Determines whether to compute the negative log-likelihood.  
+            If `True`, computes the negative log-likelihood and its gradient.  
+            If `False`, computes the standard log-likelihood and its gradient.
+        
+        Returns : 
+        -------
+        float
+            The value of the log-likelihood loss.
+            
+        ndarray of shape shape (d, d+1)
+            The gradient of the log-likelihood loss. 
+        """
+        # Call the base class logic
+        super().loss_and_grad(theta)
+        grad = np.empty((self._n_components, self._n_components+1), dtype=np.float64)
+        loss = self._cpp_model.compute_averaged_loss_and_grad(theta, grad, neg)
+        return loss, grad
+    
+    def loss_rows(self, theta, rows, neg=True):
+        """
+        Compute the contributions of the given rows of the parameter 
+        to the log-likelihood loss. The loss is the sum of the 
+        contributions of all the rows.
+        
+        Parameters
+        ----------
+        theta : ndarray of shape (d, d+1)
+            Parameter of the model. The first column corresponds to 
+            the exogenous intensity parameter. The `d` next columns 
+            correspond to the interaction matrix. 
+        
+        rows : array-like of int
+            Indices of the rows to evaluate.
+            
+        neg : bool, default=True
+            Determines whether to compute the negative log-likelihood.  
+            If `True`, computes the negative log-likelihood.  
+            If `False`, computes the standard log-likelihood.
+        
+        Returns : 
+        -------
+        ndarray of shape (len(rows),)
+            The contribution of each given row to the log-likelihood loss.
+        """
+        # Call the base class logic
+        super().loss_rows(theta, rows)
+        return self._cpp_model.compute_rows_loss(theta, self._check_rows(rows), neg)
+    
+    def loss_and_grad_rows(self, theta, rows, neg=True):
+        """
+        Compute both the contributions of the given rows of the parameter 
+        to the log-likelihood loss and the corresponding rows of its 
+        gradient, in a single pass.
+        
+        Parameters
+        ----------
+        theta : ndarray of shape (d, d+1)
+            Parameter of the model. The first column corresponds to 
+            the exogenous intensity parameter. The `d` next columns 
+            correspond to the interaction matrix. 
+        
+        rows : array-like of int
+            Indices of the rows to evaluate.
+            
+        neg : bool, default=True
+            Determines whether to compute the negative log-likelihood.  
+            If `True`, computes the negative log-likelihood.  
+            If `False`, computes the standard log-likelihood.
+        
+        Returns : 
+        -------
+        ndarray of shape (len(rows),)
+            The contribution of each given row to the log-likelihood loss.
+            
+        ndarray of shape (d, d+1)
+            The gradient of the log-likelihood loss, whose rows not in `rows` are zero. 
+        """
+        # Call the base class logic
+        super().loss_and_grad_rows(theta, rows)
+        grad = np.empty((self._n_components, self._n_components+1), dtype=np.float64)
+        loss_rows = self._cpp_model.compute_rows_loss_and_grad(theta, grad, self._check_rows(rows), neg)
+        return loss_rows, grad
     
     def hessian(self):
         raise NotImplementedError("Method compute_hessian is not implemented for Hawkes model with log-likelihood goodness-of-fit functional")
@@ -0,0 +1,337 @@
+# Author: Romain E. Lacoste
+# License: BSD-3-Clause
+
+import numpy as np
+from numpy.linalg import eig
+
+from tabulate import tabulate
+
+from sparklen.hawkes.model.build.hawkes_model import ModelHawkesSumExpLeastSquares as CppModelHawkesSumExpLeastSquares
+
+from sparklen.hawkes.data import PackedEvents
+
+from sparklen.hawkes.model.base.model_hawkes import ModelHawkes
+
+
+class ModelHawkesSumExpLeastSquares(ModelHawkes):
+    """
+    Model class for Hawkes process with sum-of-exponentials kernel and given decays. 
+    
+    This class handles model-related calculations, including loss evaluation, 
+    gradient computation, and Hessian matrix calculation
+    
+    The observed data consist of repeated realizations of a Hawkes process.
+    
+    .. math::
+        \\left\\{\\left\\{t_{j,\\ell}^{(i)}\\right\\}_{\\ell \\in [N_j(T)]}, 
+        \ j \\in [d], \ i \\in [n] \\right\}
+        
+    where
+    
+    * :math:`n \\geq 1` is the number of repetitions
+    * :math:`d \\geq 1` is the number of components
+    * :math:`T > 0` is the time horizon
+    * :math:`t_{j,\\ell}^{(i)}` is the :math:`\\ell`-th event time of component :math:`j` in the :math:`i`-th repetition 
+    
+    The loss function used as goodness-of-fit is the least-squares contrast 
+    averaged over the repetitions. For a given parameter 
+    :math:`\\theta=(\\mu, \\alpha)` it is given by:
+    
+    .. math::
+        \\frac{1}{n} \\sum_{i=1}^n \\left(\\frac{1}{T} 
+        \\sum_{j=1}^d \\int_0^T \\lambda_{j, \\theta}^{(i)2}(t) \ \\textrm{d} t 
+        - \\frac{2}{T} \\sum_{j=1}^d \\sum_{\\ell : t_{j, \\ell}^{(i)} < T}
+        \\lambda_{j, \\theta}^{(i)}\\left(t_{j, \\ell}^{(i)}\\right)\\right)
+    
+    where :math:`\\lambda_{j, \\theta}(t)` is the intensity function:
+        
+    .. math::    
+        \\mu_j + \\sum_{u=1}^U \\sum_{j'=1}^d  \\alpha_{j,j'}^{u} \\sum_{\\ell : t_{j',\\ell} < t} 
+        \\beta_u e^{-\\beta_u(t-t_{j',\\ell})}
+    
+    where
+    
+    * :math:`(\\mu_j)_{j \\in [d]}` is the vector of exogenous intensities
+    * :math:`(\\alpha_{j, j'}^{u})_{j, j' \\in [d]}` is the matrix of interactions at the :math:`u`-th timescale
+    * :math:`(\\beta_u)_{u \\in [U]}` are the fixed and given decays of the exponential kernels 
+    
+    Parameters
+    ----------
+    decay : array-like of shape (U,), default=None
+        The decays of the exponential kernels summed in the kernel of the process, 
+        one per timescale. They dictate how quick the influences vanish over time. 
+        
+    n_threads : int, default=1
+        The number of threads used by the compiled model to compute the 
+        weights and to evaluate the loss and its gradient. If `n_threads=-1`, 
+        all the processors are used. The results do not depend on it. 
+        
+    cache_size : float, default=200
+        The memory budget, in MB, of the cache holding the weights computed 
+        for the previous decays. Setting back a cached decay, or taking a 
+        subset with it, reuses its weights. The least recently used ones are 
+        evicted beyond the budget. The cache belongs to the model, so that 
+        copies of it, e.g. the clones fitted by `GridSearchCV`, do not share it. 
+        
+    Attributes
+    ----------
+    data : list of list of ndarray or PackedEvents
+        The data used to set up the model. This is a read-only property.
+        
+    end_time : float
+        Time horizon used to set up the model. This is a read-only proterty.
+        
+    decay : tuple of float
+        The decays used in model calculations. This property can be modified.
+        
+    n_threads : int
+        The number of threads used in model calculations. This property can be modified.
+        
+    cache_size : float
+        The memory budget of the weight cache, in MB. This property can be modified.
+    
+    Notes
+    ----------
+    The parameter theta is of shape `(d, d*U+1)`. Its columns `1+u*d` to 
+    `(u+1)*d` hold the interaction matrix of the `u`-th decay. The weights 
+    of all the decays are computed together, in a single pass over the events.
+    
+    This class handle the calculations for univariate Hawkes processes, as these 
+    are naturally included as a special case of the multivariate model.
+    
+    See Also
+    --------
+    :class:`~sparklen.hawkes.model.ModelHawkesSumExpLogLikelihood` : model class 
+    for log-likelihood loss. 
+        
+    """
+    
+    def __init__(self, decay=None, n_threads=1, cache_size=200):
+        # Call the initializer of the base class ModelHawkes
+        super().__init__(decay, n_threads, cache_size)
+
+    def set_data(self, data, end_time=None):
+        """
+        Initialize the model with data and a specified time horizon.
+
+        Parameters
+        ----------
+        data : list of list of ndarray or PackedEvents
+            Repeated paths of a Hawkes process. The outer list has length `n`, 
+            representing the number of repetitions. Each inner list has length `d`, 
+            corresponding to the number of components (dimensions) of the Hawkes process. 
+
+            Specifically, `data[i][j]` is a one-dimensional `ndarray` containing 
+            the event times of the `j`-th component in the `i`-th realization.
+            
+            A :class:`~sparklen.hawkes.data.PackedEvents` is read directly 
+            by the compiled model, without any conversion.
+            
+        end_time : float, default=None
+            The end time of the observation period. The time horizon defines
+            the interval `[0, T]` over which the Hawkes process is observed.
+            
+            - If `end_time` is provided, it is used as the upper bound of the observation window.  
+            - If `end_time=None`, it is automatically set to the largest observed event time  
+              across all components and repetitions. 
+        """
+        # Call the base class logic
+        super().set_data(data, end_time)
+        
+    def _check_decay(self, decay):
+        decay = np.asarray(decay, dtype=np.float64)
+        if decay.ndim != 1 or decay.shape[0] < 1:
+            raise ValueError(f"The decays of the kernel should be a one-dimensional array with at least one entry, but got shape {decay.shape} instead.")
+        if np.any(decay <= 0):
+            raise ValueError("The decay parameters of the kernel should be positive")
+        return tuple(float(beta) for beta in decay)
+    
+    def n_decays(self):
+        return len(self._decay)
+    
+    def n_coeffs(self):
+        """
+        Number of coefficients of each row of the parameter theta, 
+        the first one being the exogenous intensity.
+        """
+        return self._n_components*self.n_decays()+1
+    
+    def _new_cpp_model(self, decay):
+        # Register the data once on the compiled side, later calls only pass theta
+        cpp_model = CppModelHawkesSumExpLeastSquares(self._n_repetitions, self._n_components, len(decay))
+        if isinstance(self._data, PackedEvents):
+            cpp_model.set_packed_data(self._data.timestamps, self._data.offsets, self._end_time)
+        else:
+            cpp_model.set_data(self._data, self._end_time)
+        cpp_model.set_decays(np.array(decay, dtype=np.float64))
+        return cpp_model
+    
+    def _weights_memory(self):
+        # Weights N of size d, I of size dU, V of size d x dU and the Gram matrix H 
+        # of size dU x dU for each repetition, plus the pooled ones
+        d, K = self._n_components, self._n_components*self.n_decays()
+        return 8*(self._n_repetitions+1)*(d + K + d*K + K**2)
+    
+    def loss(self, theta):
+        """
+        Compute the value of the least-squares loss evaluated at 
+        the given input parameter. 
+        
+        Parameters
+        ----------
+        theta : ndarray of shape (d, d*U+1)
+            Parameter of the model. The first column corresponds to 
+            the exogenous intensity parameter. The `U` next blocks of 
+            `d` columns correspond to the interaction matrices of the decays. 
+        
+        Returns : 
+        -------
+        float
+            The value of the least-squares loss.
+        """
+        # Call the base class logic
+        super().loss(theta)
+        return self._cpp_model.compute_averaged_loss(theta)
+
+    def grad(self, theta):
+        """
+        Compute the gradient of the least-squares loss evaluated at 
+        the given input parameter. 
+        
+        Parameters
+        ----------
+        theta : ndarray of shape (d, d*U+1)
+            Parameter of the model. The first column corresponds to 
+            the exogenous intensity parameter. The `U` next blocks of 
+            `d` columns correspond to the interaction matrices of the decays. 
+        
+        Returns : 
+        -------
+        ndarray of shape (d, d*U+1)
+            The gradient of the least-squares loss. 
+        """
+        # Call the base class logic
+        super().grad(theta)
+        return self._cpp_model.compute_averaged_grad(theta)
+    
+    def loss_and_grad(self, theta):
+        """
+        Compute both the value and the gradient of the least-squares loss 
+        evaluated at the given input parameter, in a single pass.
+        
+        Parameters
+        ----------
+        theta : ndarray of shape (d, d*U+1)
+            Parameter of the model. The first column corresponds to 
+            the exogenous intensity parameter. The `U` next blocks of 
+            `d` columns correspond to the interaction matrices of the decays. 
+        
+        Returns : 
+        -------
+        float
+            The value of the least-squares loss.
+            
+        ndarray of shape (d, d*U+1)
+            The gradient of the least-squares loss. 
+        """
+        # Call the base class logic
+        super().loss_and_grad(theta)
+        grad = np.empty((self._n_components, self.n_coeffs()), dtype=np.float64)
+        loss = self._cpp_model.compute_averaged_loss_and_grad(theta, grad)
+        return loss, grad
+    
+    def loss_rows(self, theta, rows):
+        """
+        Compute the contributions of the given rows of the parameter 
+        to the least-squares loss. The loss is the sum of the 
+        contributions of all the rows.
+        
+        Parameters
+        ----------
+        theta : ndarray of shape (d, d*U+1)
+            Parameter of the model. The first column corresponds to 
+            the exogenous intensity parameter. The `U` next blocks of 
+            `d` columns correspond to the interaction matrices of the decays. 
+        
+        rows : array-like of int
+            Indices of the rows to evaluate.
+        
+        Returns : 
+        -------
+        ndarray of shape (len(rows),)
+            The contribution of each given row to the least-squares loss.
+        """
+        # Call the base class logic
+        super().loss_rows(theta, rows)
+        return self._cpp_model.compute_rows_loss(theta, self._check_rows(rows))
+    
+    def loss_and_grad_rows(self, theta, rows):
+        """
+        Compute both the contributions of the given rows of the parameter 
+        to the least-squares loss and the corresponding rows of its 
+        gradient, in a single pass.
+        
+        Parameters
+        ----------
+        theta : ndarray of shape (d, d*U+1)
+            Parameter of the model. The first column corresponds to 
+            the exogenous intensity parameter. The `U` next blocks of 
+            `d` columns correspond to the interaction matrices of the decays. 
+        
+        rows : array-like of int
+            Indices of the rows to evaluate.
+        
+        Returns : 
+        -------
+        ndarray of shape (len(rows),)
+            The contribution of each given row to the least-squares loss.
+            
+        ndarray of shape (d, d*U+1)
+            The gradient of the least-squares loss, whose rows not in `rows` are zero. 
+        """
+        # Call the base class logic
+        super().loss_and_grad_rows(theta, rows)
+        grad = np.empty((self._n_components, self.n_coeffs()), dtype=np.float64)
+        loss_rows = self._cpp_model.compute_rows_loss_and_grad(theta, grad, self._check_rows(rows))
+        return loss_rows, grad
+    
+    def hessian(self):
+        """
+        Compute the hessian of the least-squares loss. 
+        
+        Returns : 
+        -------
+        ndarray of shape (d*U+1, d*U+1)
+            The hessian matrix of the loss evaluated at the input parameter.
+        """
+        # Call the base class logic
+        super().hessian()
+        return self._cpp_model.compute_averaged_hessian()
+    
+    def lipschitz_const(self):
+        """
+        Compute the Lipschitz constant of the gradient of the least-squares loss. 
+        It is given by the largest eigenvalue of the hessian matrix
+        
+        Returns : 
+        -------
+        float
+            The value of the Lipschitz constant. 
+        """
+        hessian = self.hessian()
+        return np.max(eig(hessian)[0])
+    
+    def print_info(self):
+        """ Display information about the instantiated model object. """
+        table = [["Model", "Linear Hawkes"],
+                 ["Kernel function", "Sum of exponentials"],
+                 ["Goodness-of-fit", "Least-Squares"],
+                 ["Gradient Lipchitz", "Yes"],
+                 ["Network dimension", self._n_components],
+                 ["Number of repetition", self._n_repetitions],
+                 ["Observation uppper-bound", self._end_time],
+                 ["Decays of the kernel", self._decay]]
+        print(tabulate(table, headers="firstrow", tablefmt="grid"))
+        
+    def __repr__(self):
+        return super().__repr__()
\ No newline at end of file
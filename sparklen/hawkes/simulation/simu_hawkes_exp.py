@@ -1,19 +1,33 @@
 # Author: Romain E. Lacoste
 # License: BSD-3-Clause
 
+import os
+
 import numpy as np
 from numpy.linalg import eig
-from numpy.random import default_rng
+from numpy.random import default_rng, SeedSequence
+
+from scipy.sparse import csc_matrix, issparse
+from scipy.sparse.linalg import eigs
+
+from concurrent.futures import ProcessPoolExecutor
 
 from warnings import warn
 
+from sparklen.hawkes.data import PackedEvents, PackedEventsWriter
+from sparklen.hawkes.diagnostics import compensator, ks_statistics
+
+from sparklen.hawkes.simulation.build.hawkes_simulation import SimuHawkesExp as CppSimuHawkesExp
+
 class SimuHawkesExp():
     """
     Simulation class for Hawkes process with exponential kernel. 
     
     This class generates data consisting of repeated realizations of a Hawkes process.  
     
-    The event simulation is based on the cluster representation of the process.
+    The event simulation is based on the cluster representation of the process, 
+    all the events of a generation being drawn at once. The compiled engine 
+    also offers Ogata's thinning algorithm.
     
     A :math:`d`-dimensional Hawkes process, denoted :math:`N = (N_1, \dots, N_d)` 
     is given by :math:`d` point processes on :math:`\mathbb{R}_+^*`, with 
@@ -38,10 +52,11 @@ class SimuHawkesExp():
         Exogenous intensitie of the process. Each `mu[j]` expresses the arrival 
         of spontaneous events for the `j`-th process.
         
-    alpha : ndarray of shape (d, d)
+    alpha : ndarray or sparse matrix of shape (d, d)
         Interaction matrix of the process. Each `alpha[j][j']` reflects the 
         positive influence of the `j'`-th one-dimensional process on the `j`-th
-        one-dimensional process. 
+        one-dimensional process. A `scipy.sparse` matrix avoids forming the 
+        dense matrix for large sparse networks.
         
     beta : float
         Common decay scalar of the process. Dictates how quick the influences 
@@ -58,22 +73,57 @@ class SimuHawkesExp():
         Determines random number generation for dataset creation. 
         Pass an int for reproducible output across multiple function calls.
         
+    engine : str, {'python', 'native'}, default='python'
+        Specifies the implementation of the simulation. The available options are:
+        
+        - 'python' : Vectorized NumPy implementation.
+        - 'native' : Compiled implementation, writing the paths directly in 
+          the packed layout. It draws from a 64-bit Mersenne Twister seeded 
+          by `random_state`, so that its output is reproducible across 
+          platforms, but differs from the one of the 'python' engine.
+        
+    method : str, {'cluster', 'ogata'}, default='cluster'
+        Specifies the simulation algorithm. The available options are:
+        
+        - 'cluster' : Cluster representation, the immigrants spawning 
+          generations of offsprings.
+        - 'ogata' : Ogata's thinning algorithm, the intensity being updated 
+          recursively at a cost independent of the number of past events. 
+          It is only available with `engine='native'`.
+        
     
     Attributes
     ----------
-    timestamps : list of list of ndarray
-        The generated event timestamps. The outer list has length `n`, 
-        representing repetitions. Each inner list has length `d`, where 
-        each element is a one-dimensional ndarray containing the 
-        event times of a specific component. This property can be modified.
+    timestamps : PackedEvents
+        The generated event timestamps, packed in a single buffer. It behaves
+        as a list of length `n`, representing repetitions, of lists of length 
+        `d`, where each element is a one-dimensional ndarray containing the 
+        event times of a specific component. Use `timestamps.to_list()` to 
+        get the nested lists. This property can be modified.
+    
+    terminal_state : ndarray of shape (n, d)
+        The kernel sums :math:`\\sum_{\\ell} e^{-\\beta(T-t_{j,\\ell})}` of each 
+        component of each path at the end time :math:`T`. The kernel being 
+        exponential, they summarize the whole history of the paths for their 
+        continuation, see :meth:`extend`. It is computed on first access. 
+        This is a read-only property.
     
     Notes
     ----------
     This class handle the simulation of univariate Hawkes processes, as these 
     are naturally included as a special case of the multivariate model.
+    
+    Both engines draw the offsprings of an event among the components it 
+    actually excites, read from a compressed sparse column copy of `alpha`. 
+    The cost of a path is then proportional to its number of events, 
+    whatever the dimension of the network.
     """
     
-    def __init__(self, mu, alpha, beta, end_time, n_samples, random_state=None):
+    _engines = ["python", "native"]
+    
+    _methods = ["cluster", "ogata"]
+    
+    def __init__(self, mu, alpha, beta, end_time, n_samples, random_state=None, engine="python", method="cluster"):
         
         self._check_param_form(mu, alpha, beta)
         self._mu = mu
@@ -81,11 +131,29 @@ class SimuHawkesExp():
         self._beta = beta
         self._end_time = end_time
         self._n_components = mu.shape[0]
+        
+        # Compressed columns of the interactions, the non-zero entries of the 
+        # j'-th column being the components excited by the j'-th one
+        self._adjacency = csc_matrix(alpha, shape=(self._n_components, self._n_components), dtype=np.float64)
+        self._adjacency.eliminate_zeros()
+        self._adjacency.sort_indices()
+        self._offspring = None
 
         if not n_samples >= 1:
             raise ValueError("There should be at least one repetition")
         self._n_samples = n_samples
         self._timestamps = None
+        self._terminal_state = None
+        
+        if engine not in self._engines:
+            raise ValueError(f"The choosen engine, '{engine}', is not available. Choose instead from {self._engines}.")
+        self._engine = engine
+        
+        if method not in self._methods:
+            raise ValueError(f"The choosen method, '{method}', is not available. Choose instead from {self._methods}.")
+        if method == "ogata" and engine != "native":
+            raise ValueError("The 'ogata' method is only available with engine='native'.")
+        self._method = method
         
         self._generator = default_rng(random_state) 
         
@@ -95,11 +163,20 @@ class SimuHawkesExp():
     
     @timestamps.setter
     def timestamps(self, timestamps):
-        if not isinstance(timestamps, list):
-            raise ValueError("The timestamps should be a list.")
+        if not isinstance(timestamps, (list, PackedEvents)):
+            raise ValueError("The timestamps should be a list or a PackedEvents.")
         if self._timestamps is not None:
             warn("The timestamps of the process has already been set. This will overwrite the existing one.", UserWarning)
-        self._timestamps = timestamps
+        self._timestamps = PackedEvents.from_list(timestamps)
+        self._terminal_state = None
+    
+    @property
+    def terminal_state(self):
+        if self._timestamps is None:
+            return None
+        if self._terminal_state is None:
+            self._terminal_state = self._kernel_sums(self._timestamps, self._end_time)
+        return self._terminal_state
     
     @staticmethod
     def _check_param_form(mu, alpha, beta):
@@ -107,82 +184,362 @@ class SimuHawkesExp():
         if not np.all(mu >= 0):
             raise ValueError("Exegenous intensity of the Hawkes process should be non-negative.")
         
-        if not np.all(alpha >= 0):
+        if not np.all((alpha.data if issparse(alpha) else alpha) >= 0):
             raise ValueError("Intensity of interaction of the Hawkes process should be non-negative.")
         
         if not beta >= 0:
             raise ValueError("The decay rate of the Hawkes process should be non-negative.")    
     
-    def simulate(self):
+    def simulate(self, n_jobs=1):
         """ 
         Simulate repeated paths of the Hawkes process 
         and store the generated timestamps. 
         
+        Each path draws from its own random stream, spawned from a seed 
+        sequence drawn from `random_state`, so that the simulated paths 
+        do not depend on `n_jobs`.
+        
+        Parameters
+        ----------
+        n_jobs : int, default=1
+            The number of processes simulating the paths. The paths are 
+            split into contiguous chunks, each simulated by a worker and 
+            sent back in the packed layout. If `n_jobs=-1`, all the 
+            processors are used.
+        
         Returns
         -------
         self : object
             The instance of the simulated object.
         """
-        self._timestamps = []
+        n_jobs = self._check_n_jobs(n_jobs)
+        self._timestamps = self._run_seeds(self._spawn_seeds(self._n_samples), n_jobs)
+        self._terminal_state = None
+        
+    def extend(self, new_end_time, n_jobs=1):
+        """
+        Extend the simulated paths of the Hawkes process to a longer 
+        observation period, and store the extended timestamps.
         
-        for _ in range(self._n_samples):
-            path = self._simulate_single_path()
-            self._timestamps.append(path)
+        The kernel being exponential, the continuation of a path after the 
+        end time only depends on its terminal state, so that the events 
+        already simulated are kept and only the new period is simulated. 
+        The events before the end time excite the new period through their 
+        offsprings born after it, or through the initial intensity of 
+        Ogata's algorithm. The extended paths follow the distribution of 
+        paths simulated on the whole period.
+        
+        Parameters
+        ----------
+        new_end_time : float
+            The new end time of the observation period, greater than the 
+            current one.
         
+        n_jobs : int, default=1
+            The number of processes simulating the paths, see :meth:`simulate`.
+        
+        Returns
+        -------
+        self : object
+            The instance of the simulated object.
+        """
+        if self._timestamps is None:
+            raise ValueError("The process should be simulated before being extended.")
+        if not new_end_time > self._end_time:
+            raise ValueError(f"The new end time should be greater than the current one {self._end_time}, but got {new_end_time} instead.")
+        n_jobs = self._check_n_jobs(n_jobs)
+        
+        start_time, states = self._end_time, self.terminal_state
+        self._end_time = new_end_time
+        extension = self._run_seeds(self._spawn_seeds(len(self._timestamps)), n_jobs, start_time, states)
+        
+        # The kernel sums are updated with the new events only
+        self._terminal_state = states * np.exp(-self._beta * (new_end_time - start_time)) + self._kernel_sums(extension, new_end_time)
+        self._timestamps = self._append_events(self._timestamps, extension)
+        
+    def iter_paths(self, chunk_size=100):
+        """
+        Simulate the paths of the Hawkes process chunk by chunk, and yield 
+        them one at a time. Only the current chunk is held in memory, and 
+        the paths are the ones `simulate` would generate from the same state 
+        of `random_state`. The timestamps of the object are left unchanged.
+        
+        Parameters
+        ----------
+        chunk_size : int, default=100
+            The number of paths simulated together.
+        
+        Yields
+        ------
+        path : list of ndarray
+            The event times of each of the `d` components of a path.
+        """
+        for chunk in self._iter_chunks(chunk_size):
+            yield from chunk
     
-    def _simulate_single_path(self):
+    def simulate_to(self, path, chunk_size=1000):
+        """
+        Simulate repeated paths of the Hawkes process chunk by chunk, and 
+        write them to a directory, so that only the current chunk is held 
+        in memory. The timestamps of the object are then memory-mapped from 
+        the directory, see :meth:`PackedEvents.load`.
+        
+        Parameters
+        ----------
+        path : str
+            The directory receiving the paths, which is created if needed.
         
-        path = [[] for _ in range(self._n_components)]
+        chunk_size : int, default=1000
+            The number of paths simulated and written together.
+        
+        Returns
+        -------
+        self : object
+            The instance of the simulated object.
+        """
+        with PackedEventsWriter(path, self._n_components) as writer:
+            for chunk in self._iter_chunks(chunk_size):
+                writer.write(chunk)
+        self._timestamps = PackedEvents.load(path)
+        self._terminal_state = None
+    
+    def _iter_chunks(self, chunk_size):
+        """ Simulate the paths in chunks of `chunk_size`, each one in the packed layout. """
+        if not isinstance(chunk_size, (int, np.integer)) or chunk_size < 1:
+            raise ValueError(f"The chunk size should be a positive integer, but got {chunk_size} instead.")
+        seeds = self._spawn_seeds(self._n_samples)
+        for start in range(0, self._n_samples, chunk_size):
+            yield self._simulate_seeds(seeds[start:start+chunk_size])
+    
+    def _spawn_seeds(self, n_samples):
+        """ Spawn one independent seed sequence per path from `random_state`. """
+        return SeedSequence(self._generator.integers(2**63, size=4)).spawn(n_samples)
+    
+    @staticmethod
+    def _check_n_jobs(n_jobs):
+        """ Check the number of jobs, and resolve `n_jobs=-1` to the number of processors. """
+        if not isinstance(n_jobs, (int, np.integer)) or n_jobs == 0 or n_jobs < -1:
+            raise ValueError(f"The number of jobs should be a positive integer or -1, but got {n_jobs} instead.")
+        return n_jobs if n_jobs > 0 else (os.cpu_count() or 1)
+    
+    def _run_seeds(self, seeds, n_jobs, start_time=0., states=None):
+        """
+        Simulate one path per seed sequence, split into contiguous chunks 
+        over `n_jobs` processes, and return them in the packed layout.
+        """
+        n_jobs = min(n_jobs, len(seeds))
+        if n_jobs == 1:
+            return self._simulate_seeds(seeds, start_time, states)
+        
+        chunks = np.array_split(np.arange(len(seeds)), n_jobs)
+        seed_chunks = [seeds[chunk[0]:chunk[-1]+1] for chunk in chunks]
+        state_chunks = [None if states is None else states[chunk[0]:chunk[-1]+1] for chunk in chunks]
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            parts = list(executor.map(_simulate_chunk, [self._params()]*n_jobs, seed_chunks, [start_time]*n_jobs, state_chunks))
+        return PackedEvents.concatenate(parts)
+    
+    def _kernel_sums(self, events, end_time):
+        """ Return the kernel sums of each component of each path at `end_time`. """
+        n, d = events.n_repetitions, events.n_components
+        repetitions = np.repeat(np.arange(n), events.offsets[:, -1] - events.offsets[:, 0])
+        weights = np.exp(-self._beta * (end_time - events.timestamps))
+        return np.bincount(repetitions*d + events.components, weights=weights, minlength=n*d).reshape(n, d)
+    
+    @staticmethod
+    def _append_events(events, extension):
+        """
+        Append the events of `extension` to the ones of `events`, path by 
+        path and component by component, the former all coming after the latter.
+        """
+        n, d = events.n_repetitions, events.n_components
+        segments = np.arange(n*d)
+        keys = np.concatenate((np.repeat(segments, np.diff(events.offsets, axis=1).ravel()), 
+                               np.repeat(segments, np.diff(extension.offsets, axis=1).ravel())))
+        # The stable sort keeps the earlier events first within each component
+        order = np.argsort(keys, kind="stable")
+        timestamps = np.concatenate((events.timestamps, extension.timestamps))[order]
+        return PackedEvents(timestamps, events.offsets + extension.offsets)
+    
+    def _params(self):
+        """ Return the arguments rebuilding the simulator in a worker process. """
+        return (self._mu, self._alpha, self._beta, self._end_time, self._engine, self._method)
+    
+    def _simulate_seeds(self, seeds, start_time=0., states=None):
+        """
+        Simulate one path per seed sequence, and return them in the packed layout.
+        When `states` is given, the paths continue from `start_time` the ones 
+        with these terminal states, and only hold their new events.
+        """
+        if self._engine == "native":
+            return self._simulate_native(seeds, start_time, states)
+        
+        timestamps = []
+        counts = np.zeros((len(seeds), self._n_components), dtype=np.int64)
+        
+        for i, seed in enumerate(seeds):
+            state = None if states is None else states[i]
+            times, components = self._simulate_single_path(default_rng(seed), start_time, state)
+            timestamps.append(times)
+            counts[i] = np.bincount(components, minlength=self._n_components)
+        
+        # The paths are written directly in the packed layout
+        offsets = np.zeros((len(seeds), self._n_components+1), dtype=np.int64)
+        offsets[:, 1:] = np.cumsum(counts).reshape(len(seeds), self._n_components)
+        offsets[1:, 0] = offsets[:-1, -1]
+        
+        return PackedEvents(np.concatenate(timestamps), offsets)
+        
+    def _simulate_native(self, seeds, start_time=0., states=None):
+        """
+        Simulate one path per seed sequence with the compiled engine, which 
+        returns them in the packed layout.
+        """
+        cpp_simu = CppSimuHawkesExp(np.ascontiguousarray(self._mu, dtype=np.float64), 
+                                    self._adjacency.indptr.astype(np.int64), 
+                                    self._adjacency.indices.astype(np.int64), 
+                                    np.ascontiguousarray(self._adjacency.data, dtype=np.float64), 
+                                    float(self._beta), float(self._end_time))
+        # The compiled generator of each path is seeded by 64 bits of its seed sequence
+        cpp_seeds = np.array([seed.generate_state(1, np.uint64)[0] for seed in seeds], dtype=np.uint64).view(np.int64)
+        if states is not None:
+            states = np.ascontiguousarray(states, dtype=np.float64)
+            if self._method == "ogata":
+                cpp_simu.extend_ogata(cpp_seeds, float(start_time), states)
+            else:
+                cpp_simu.extend_cluster(cpp_seeds, float(start_time), states)
+        elif self._method == "ogata":
+            cpp_simu.simulate_ogata(cpp_seeds)
+        else:
+            cpp_simu.simulate_cluster(cpp_seeds)
+        return PackedEvents(cpp_simu.get_timestamps(), cpp_simu.get_offsets())
+        
+    def _simulate_single_path(self, generator, start_time=0., state=None):
+        """
+        Simulate a single path with the given generator, generation by 
+        generation, and return the event times with their components, 
+        sorted by component then time. When `state` is given, the path 
+        continues from `start_time` a path with this terminal state.
+        
+        Each event of a generation has a number of offsprings following a 
+        Poisson distribution of parameter the sum of the interactions it 
+        triggers, each offspring falling in a component it excites with 
+        probability proportional to the interaction. This is the same 
+        distribution as independent Poisson numbers of offsprings in each 
+        component, but costs a number of draws proportional to the number 
+        of events, whatever the dimension. All the draws of a generation 
+        are made at once, and the offsprings born after the end time are 
+        dropped with their whole progeny.
+        
+        The offsprings of the events before the start time born after it 
+        follow the same scheme, the number of offsprings of each component 
+        having for parameter its total interaction times its kernel sum.
+        """
+        d = self._n_components
+        branching, _ = self._offspring_distribution()
         
-        ancestor = [[] for _ in range(self._n_components)]
         # Simulation of the immigrants
-        for j in range(self._n_components):
-            k = self._generator.poisson(self._mu[j] * self._end_time)
-            ancestor[j].extend(self._generator.uniform(0, self._end_time, k))
-            path[j].extend(ancestor[j])
+        n_immigrants = generator.poisson(self._mu * (self._end_time - start_time))
+        components = np.repeat(np.arange(d), n_immigrants)
+        times = generator.uniform(start_time, self._end_time, components.shape[0])
         
+        if state is not None:
+            n_pending = generator.poisson(branching * state)
+            pending_times, pending_components = self._draw_offsprings(
+                generator, np.repeat(np.arange(d), n_pending), np.full(np.sum(n_pending), float(start_time)))
+            times = np.concatenate((times, pending_times))
+            components = np.concatenate((components, pending_components))
+        path_times, path_components = [times], [components]
         
         # Simulation of the offsprings 
-        while (any(bool(sublist) for sublist in ancestor)):
-            offsprings = [[] for _ in range(self._n_components)]
-            for j in range(self._n_components):
-                if bool(ancestor[j]):
-                    for a_j_l in ancestor[j]:
-                        for j2 in range(self._n_components):
-                            if self._alpha[j2][j] > 0:
-                                k = self._generator.poisson(self._alpha[j2][j])
-                                offsprings_j2 = self._generator.exponential(1 / self._beta, k) + a_j_l
-                                offsprings[j2].extend(offsprings_j2)
-                                path[j2].extend(offsprings_j2)
-            ancestor = offsprings
-        
-        # Remove elements above the upper bound and sort and convert each sublist to numpy array   
-        path[:] = [np.array(sorted([x for x in sublist if x < self._end_time])) for sublist in path]
-        
-        return path
+        while times.shape[0] > 0:
+            n_offsprings = generator.poisson(branching[components])
+            times, components = self._draw_offsprings(
+                generator, np.repeat(components, n_offsprings), np.repeat(times, n_offsprings))
+            path_times.append(times)
+            path_components.append(components)
+        
+        times, components = np.concatenate(path_times), np.concatenate(path_components)
+        order = np.lexsort((times, components))
+        
+        return times[order], components[order]
+    
+    def _draw_offsprings(self, generator, parents, parent_times):
+        """
+        Draw the component and the time of one offspring of each parent, 
+        given by its component and its time, and return the ones born 
+        before the end time.
+        """
+        indptr, targets = self._adjacency.indptr, self._adjacency.indices
+        _, cdf = self._offspring_distribution()
+        
+        u = generator.uniform(0, 1, parents.shape[0])
+        edges = np.searchsorted(cdf, parents + u, side="right")
+        # Guard against the rounding of the last cumulative share
+        np.minimum(edges, indptr[parents+1] - 1, out=edges)
+        components = targets[edges]
+        times = parent_times + generator.exponential(1 / self._beta, parents.shape[0])
+        
+        kept = times < self._end_time
+        return times[kept], components[kept]
+    
+    def _offspring_distribution(self):
+        """
+        Return the total interaction of each source component, and the 
+        cumulative distribution of its offsprings over the non-zero entries 
+        of its column, shifted by the source index so that a single sorted 
+        search serves all the sources. They are computed on first call.
+        """
+        if self._offspring is not None:
+            return self._offspring
+        
+        adjacency = self._adjacency
+        sources = np.repeat(np.arange(self._n_components), np.diff(adjacency.indptr))
+        branching = np.bincount(sources, weights=adjacency.data, minlength=self._n_components)
+        
+        cumulative = np.cumsum(adjacency.data)
+        column_start = np.concatenate(([0.], cumulative))[adjacency.indptr[:-1]]
+        cdf = (cumulative - column_start[sources]) / branching[sources] + sources
+        
+        self._offspring = (branching, cdf)
+        return self._offspring
     
     def compensator(self, t):
         """
-        Placeholder for a future method that will compute the compensator of
-        the Hawkes process. 
-
-        This method is not yet implemented.
+        Compute the compensator of each component of the simulated paths, 
+        at given times, see :func:`~sparklen.hawkes.diagnostics.compensator`.
 
         Parameters
         ----------
-        t : float
-            Time for which the compensator is evaluated. 
+        t : float or ndarray of shape (m, )
+            The non-negative times at which the compensators are evaluated.
+            
         Returns
         -------
-        None
-            This function is not yet implemented.
-
-        Raises
-        ------
-        NotImplementedError
-            Always raised since the method is not implemented.
+        ndarray of shape (n, d) or (n, m, d)
+            The compensators of each component of each path, at the time `t`
+            or at each of the times of `t`.
         """
-        raise NotImplementedError("This method is not yet implemented.")
+        if self._timestamps is None:
+            raise ValueError("The process should be simulated before computing its compensator.")
+        return compensator(self._timestamps, self._mu, self._adjacency, self._beta, t)
+    
+    def ks_statistics(self):
+        """
+        Compute the Kolmogorov-Smirnov goodness-of-fit statistics of each 
+        component of the simulated paths, from their time-rescaled residuals, 
+        see :func:`~sparklen.hawkes.diagnostics.ks_statistics`.
+        
+        Returns
+        -------
+        statistics : ndarray of shape (d, )
+            The Kolmogorov-Smirnov statistic of each component.
+            
+        pvalues : ndarray of shape (d, )
+            The corresponding two-sided p-values.
+        """
+        if self._timestamps is None:
+            raise ValueError("The process should be simulated before computing its goodness-of-fit statistics.")
+        return ks_statistics(self._timestamps, self._mu, self._adjacency, self._beta, self._end_time)
     
     def __repr__(self):
         class_name = self.__class__.__name__
@@ -192,7 +549,9 @@ class SimuHawkesExp():
           f"  beta={self._beta},\n"
           f"  end_time={self._end_time},\n"
           f"  n_samples={self._n_samples},\n"
-          f"  random_state={self._generator}\n"
+          f"  random_state={self._generator},\n"
+          f"  engine={self._engine},\n"
+          f"  method={self._method}\n"
           f")")
 
     def spectral_radius(self):
@@ -207,8 +566,17 @@ class SimuHawkesExp():
         spectral_radius : float
             The spectral radius of the interaction matrix.
         """
-        return np.max(eig(self._alpha)[0])
+        if issparse(self._alpha) and self._n_components > 2:
+            # Perron-Frobenius, the spectral radius of a non-negative matrix is its largest real eigenvalue
+            return np.max(eigs(self._adjacency, k=1, which="LR", return_eigenvectors=False))
+        return np.max(eig(self._adjacency.toarray())[0])
         # spectral_radius = np.max(eig(self._alpha)[0])
         # if spectral_radius > 1:
         #     warn("The spectral radius is greater than one.", UserWarning)
         # return spectral_radius
+
+def _simulate_chunk(params, seeds, start_time=0., states=None):
+    # Run in the worker processes, on a simulator rebuilt from the parameters
+    mu, alpha, beta, end_time, engine, method = params
+    simu = SimuHawkesExp(mu, alpha, beta, end_time, len(seeds), engine=engine, method=method)
+    return simu._simulate_seeds(seeds, start_time, states)
@@ -66,8 +66,8 @@ class BacktrackingLineSearchLR(LearningRateScheduler):
             tentative_point = search_point - self._step_size * grad_search_point
             self._prox.apply(tentative_point, self._step_size)
                 
-            # Compute the loss at the tentative point
-            loss_tentative_point = self._model.loss(tentative_point)
+            # Compute the loss and the gradient at the tentative point
+            loss_tentative_point, grad_tentative_point = self._model.loss_and_grad(tentative_point)
             
             # Calculate the envelope 
             envelope = loss_search_point + np.sum(grad_search_point * (tentative_point - search_point), axis=None) + 1. / (2 * self._step_size) * norm(tentative_point - search_point)**2
@@ -82,8 +82,6 @@ class BacktrackingLineSearchLR(LearningRateScheduler):
                 print("Warning: Step size became too small.")
                 break
             
-        # Compute the gradient at the tentative point
-        grad_tentative_point = self._model.grad(tentative_point)
             
         return self._step_size, tentative_point, loss_tentative_point, grad_tentative_point
     
@@ -57,11 +57,8 @@ class LipschitzLR(LearningRateScheduler):
         tentative_point = search_point - self._step_size * grad_search_point
         self._prox.apply(tentative_point, self._step_size)
         
-        # Compute the loss at the tentative point
-        loss_tentative_point = self._model.loss(tentative_point)
-        
-        # Compute the gradient at the tentative point
-        grad_tentative_point = self._model.grad(tentative_point)
+        # Compute the loss and the gradient at the tentative point
+        loss_tentative_point, grad_tentative_point = self._model.loss_and_grad(tentative_point)
             
         return self._step_size, tentative_point, loss_tentative_point, grad_tentative_point 
     
@@ -67,8 +67,8 @@ class TwoWayBacktrackingLineSearchLR(LearningRateScheduler):
             tentative_point = search_point - sigma * grad_search_point
             self._prox.apply(tentative_point, sigma)
                 
-            # Compute the loss at the tentative point
-            loss_tentative_point = self._model.loss(tentative_point)
+            # Compute the loss and the gradient at the tentative point
+            loss_tentative_point, grad_tentative_point = self._model.loss_and_grad(tentative_point)
             
             # Calculate the envelope 
             envelope = loss_search_point + np.sum(grad_search_point * (tentative_point - search_point), axis=None) + 1. / (2 * sigma) * norm(tentative_point - search_point)**2
@@ -93,8 +93,6 @@ class TwoWayBacktrackingLineSearchLR(LearningRateScheduler):
             
         self._step_size = sigma
             
-        # Compute the gradient at the tentative point
-        grad_tentative_point = self._model.grad(tentative_point)
             
         return self._step_size, tentative_point, loss_tentative_point, grad_tentative_point
     
@@ -2,8 +2,14 @@
 
 from .gd import GD
 from .agd import AGD
+from .direct import Direct
+from .row_agd import RowAGD
+from .cd import CD
 
 __all__ = [
     'GD',
-    'AGD'
+    'AGD',
+    'Direct',
+    'RowAGD',
+    'CD'
 ]
\ No newline at end of file
@@ -77,10 +77,9 @@ class AGD(Optimizer):
     def _initialize_values(self, x0):
         """Initialize loss_x and grad_x based on the initial parameters x."""
         x = x0
-        loss_x = self._model.loss(x)
         y = x0
-        loss_y = self._model.loss(y)
-        grad_y = self._model.grad(y)
+        loss_y, grad_y = self._model.loss_and_grad(y)
+        loss_x = loss_y
         t = 1.
         
         return x, loss_x, y, loss_y, grad_y, t
@@ -100,9 +99,7 @@ class AGD(Optimizer):
         
         y_new =  x_new + (t - 1) / t_new * (x_new - x)
         
-        loss_y_new = self._model.loss(y_new)
-        
-        grad_y_new = self._model.grad(y_new)
+        loss_y_new, grad_y_new = self._model.loss_and_grad(y_new)
         
         return step_size, x_new, loss_x_new, grad_x_new, y_new, loss_y_new, grad_y_new, t_new, rel_loss
     
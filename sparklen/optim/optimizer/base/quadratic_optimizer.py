@@ -0,0 +1,57 @@
+# Author: Romain E. Lacoste
+# License: BSD-3-Clause
+
+from sparklen.optim.optimizer.base.optimizer import Optimizer
+
+import numpy as np
+
+from abc import ABC
+
+class QuadraticOptimizer(Optimizer, ABC):
+    """
+    Base class of the optimizers working directly on a quadratic loss.
+
+    The least-squares loss is separable over the rows of the parameter,
+    which all share the same hessian :math:`H` and only differ by their
+    linear term :math:`b_i`, so that the loss reads
+
+    .. math::
+        \\sum_{i=1}^d \\frac{1}{2} \\theta_i^\\top H \\theta_i + b_i^\\top \\theta_i + c.
+
+    The hessian and the linear terms are computed once per model, data and
+    decay, along with any factorization stored by the subclasses.
+    """
+
+    def __init__(self, lr_scheduler, max_iter, tol, verbose_bar=True, verbose=True, print_every=5, record_every=5):
+        # Call the initializer of the base class Optimizer
+        super().__init__(lr_scheduler, max_iter, tol, verbose_bar, verbose, print_every, record_every)
+        self._str_lr_scheduler = lr_scheduler
+
+        # Hessian, linear terms and factorizations of the current model
+        self._quadratic_source = None
+        self._factorizations = {}
+
+    def _quadratic(self):
+        """
+        Return the hessian shared by the rows and the linear terms of the
+        loss, computed once per model, data and decay.
+        """
+        # The compiled model changes whenever the data or the decay does
+        source = getattr(self._model, "_cpp_model", None)
+        if source is None or source is not self._quadratic_source:
+            try:
+                hessian = self._model.hessian()
+            except NotImplementedError:
+                raise ValueError(f"The {type(self).__name__} optimizer requires a quadratic loss, use loss='least-squares' instead.")
+            # The gradient at zero gives the linear term of each row, and the loss the constant
+            zeros = np.zeros((self._model.n_components(), hessian.shape[0]))
+            linear = self._model.grad(zeros)
+            constant = self._model.loss(zeros)
+            self._quadratic_source = source
+            self._factorizations = {"hessian": hessian, "linear": linear, "constant": constant}
+        return self._factorizations["hessian"], self._factorizations["linear"]
+
+    def _quadratic_loss(self, x, grad_x):
+        """ Evaluate the loss from the gradient `grad_x = x H + b` at `x`. """
+        linear = self._factorizations["linear"]
+        return 0.5 * np.sum(x * (grad_x + linear)) + self._factorizations["constant"]
@@ -0,0 +1,276 @@
+# Author: Romain E. Lacoste
+# License: BSD-3-Clause
+
+from sparklen.optim.optimizer.base.quadratic_optimizer import QuadraticOptimizer
+
+from sparklen.prox import ProxZero, ProxL1, ProxL2, ProxElasticNet
+
+from tabulate import tabulate
+
+import numpy as np
+
+from tqdm import tqdm
+
+import time
+
+class CD(QuadraticOptimizer):
+    """
+    Optimizer class for Coordinate Descent on quadratic losses.
+
+    This class minimizes the least-squares loss, penalized by the lasso,
+    ridge or elastic-net penalty, by exact minimization along one coordinate
+    at a time, in the style of glmnet. The loss only involves the hessian
+    :math:`H` shared by the rows, built from the statistics of the model,
+    and the linear term :math:`b_i` of each row. Updating the coordinate
+    :math:`j` amounts to the soft-thresholding
+
+    .. math::
+        \\theta_{i,j} \\leftarrow \\frac{S(H_{jj} \\theta_{i,j} - g_{i,j}, \\kappa_1)}{H_{jj} + \\kappa_2}
+
+    where :math:`g_i = H \\theta_i + b_i` is the gradient of the loss, kept
+    up to date at a cost of :math:`O(d)` per coordinate and row, and
+    :math:`\\kappa_1`, :math:`\\kappa_2` are the :math:`\\ell_1` and
+    :math:`\\ell_2` penalization constants. The rows being independent, each
+    coordinate is updated for all the rows at once.
+
+    After a sweep over all the coordinates, the sweeps are restricted to the
+    active set, the coordinates nonzero in some row. Once they have
+    converged, a sweep over all the coordinates checks whether new ones
+    enter the active set, and the optimization stops when it does not
+    change the objective anymore. The entries screened by the proximal
+    operator are held at zero.
+
+    Parameters
+    ----------
+    lr_scheduler : str, {'lipschitz', 'backtracking'}, default='backtracking'
+        Not used, present for API consistency with the gradient descents.
+
+    max_iter : int, default=100
+        The maximum number of sweeps allowed during the optimization process.
+
+    tol : float, default=1e-5
+        The tolerance for the precision achieved during the optimization process.
+        The optimization will stop when the relative variation of the penalized
+        objective over a sweep on all the coordinates falls below this value.
+        If the tolerance is not reached, the optimizer will perform a maximum of `max_iter` sweeps.
+
+    verbose_bar : bool, default=True
+        Determines whether a progress bar is displayed during the optimization process,
+        along with information such as the loss value and the size of the active set.
+        If `verbose_bar=False`, no information is displayed.
+        If set to `True`, details will be displayed every `print_every` sweeps.
+
+    verbose : bool, default=True
+        Controls whether recorded information during the optimization phase is printed at the end.
+        If `verbose=False`, no information is printed.
+        If set to `True`, details will be displayed every `print_every` sweeps.
+
+    print_every : int, default=5
+        Specifies the frequency at which history information is printed.
+        Information will be printed when the sweep number is a multiple of `print_every`.
+
+    record_every : int, default=5
+        Specifies the frequency at which history information is recorded.
+        Information will be recorded when the sweep number is a multiple of `record_every`.
+
+    selection : str, {'cyclic', 'random'}, default='cyclic'
+        The order of the coordinates within a sweep. If `selection='random'`,
+        the coordinates are visited in a new random order at each sweep.
+
+    random_state : int or None, default=None
+        Seed of the random order, only used if `selection='random'`.
+
+    Attributes
+    ----------
+    minimizer : ndarray
+        Minimizer found by the optimizer. This is a read-only property.
+
+    elapsed_time : float
+        Time taken for the `optimize()` call, in seconds. This is a read-only property.
+
+    history : dict-like
+        A dictionary-like object storing the optimizer's history across sweeps.
+        This is a read-only property.
+
+    Notes
+    ----------
+    Only the least-squares models, which provide a hessian, can be optimized.
+    """
+
+    _selections = ["cyclic", "random"]
+
+    def __init__(self, lr_scheduler, max_iter, tol, verbose_bar=True, verbose=True, print_every=5, record_every=5, selection="cyclic", random_state=None):
+        # Call the initializer of the base class QuadraticOptimizer
+        super().__init__(lr_scheduler, max_iter, tol, verbose_bar, verbose, print_every, record_every)
+
+        if selection not in self._selections:
+            raise ValueError(f"The choosen selection, '{selection}', is not available. Choose instead from {self._selections}.")
+        self._selection = selection
+        self._rng = np.random.default_rng(random_state)
+
+    def _penalty(self):
+        """ Return the l1 and l2 penalization constants of the proximal operator. """
+        if isinstance(self._prox, ProxZero):
+            return 0.0, 0.0
+        if isinstance(self._prox, ProxL1):
+            return self._prox.pen_const, 0.0
+        if isinstance(self._prox, ProxL2):
+            return 0.0, self._prox.pen_const
+        if isinstance(self._prox, ProxElasticNet):
+            return self._prox.l1_ratio * self._prox.pen_const, (1 - self._prox.l1_ratio) * self._prox.pen_const
+        raise ValueError(f"The coordinate descent does not handle {type(self._prox).__name__}.")
+
+    def _objective(self, x, grad_x, kappa_1, kappa_2):
+        """ Evaluate the loss and the penalized objective. """
+        loss_x = self._quadratic_loss(x, grad_x)
+        penalized = x[:, self._prox.start:self._prox.end]
+        return loss_x, loss_x + kappa_1 * np.sum(np.abs(penalized)) + 0.5 * kappa_2 * np.sum(penalized**2)
+
+    def _initialize_values(self, x0):
+        """Initialize the gradient of each row based on the initial parameters x."""
+        hessian, linear = self._quadratic()
+        x = np.array(x0, dtype=np.float64)
+        grad_x = x @ hessian + linear
+        return x, grad_x
+
+    def _step(self, x, grad_x, coordinates, kappa_1, kappa_2):
+        """
+        Perform a sweep over the given coordinates, updating all the rows
+        at once. The gradient is updated in place.
+        """
+        hessian = self._factorizations["hessian"]
+        start, end, positive = self._prox.start, self._prox.end, self._prox.positive
+        screened = self._prox.screened
+
+        if self._selection == "random":
+            coordinates = self._rng.permutation(coordinates)
+
+        for j in coordinates:
+            h_jj = hessian[j, j]
+            if h_jj <= 0:
+                # The coordinate does not appear in the loss, e.g. a component without events
+                continue
+            u = h_jj * x[:, j] - grad_x[:, j]
+            if start <= j < end:
+                if positive:
+                    x_j = np.maximum(u - kappa_1, 0.0)
+                else:
+                    x_j = np.sign(u) * np.maximum(np.abs(u) - kappa_1, 0.0)
+                x_j /= h_jj + kappa_2
+                if screened is not None:
+                    x_j[screened[:, j]] = 0.0
+            else:
+                x_j = u / h_jj
+            delta = x_j - x[:, j]
+            if delta.any():
+                grad_x += delta[:, None] * hessian[j]
+                x[:, j] = x_j
+
+        return x, grad_x
+
+    def optimize(self, x0):
+        """
+        Run the optimization process.
+
+
+        Parameters
+        ----------
+        x0 : ndarray
+            Initial guess.
+
+        Returns
+        -------
+        self : object
+            The instance of the optimized object.
+        """
+
+        start_time = time.time()  # Start the timer
+
+        # Call the base class logic
+        super().optimize(x0)
+
+        kappa_1, kappa_2 = self._penalty()
+
+        x, grad_x = self._initialize_values(x0)
+        n_coeffs = x.shape[1]
+        all_coordinates = np.arange(n_coeffs)
+        unpenalized = (all_coordinates < self._prox.start) | (all_coordinates >= self._prox.end)
+        loss_x, objective_x = self._objective(x, grad_x, kappa_1, kappa_2)
+
+        # The first sweep runs over all the coordinates
+        full_sweep = True
+        converged = False
+
+        pbar = None
+        if self._verbose_bar:
+            # Setup the progress bar
+            pbar = tqdm(total=self._max_iter, desc="Optimizing", unit="it")
+
+        try:
+            for iteration in range(self._max_iter):
+                if full_sweep:
+                    coordinates = all_coordinates
+                else:
+                    coordinates = all_coordinates[unpenalized | np.any(x != 0, axis=0)]
+
+                x, grad_x = self._step(x, grad_x, coordinates, kappa_1, kappa_2)
+
+                # Update relative distance
+                loss_x_new, objective_x_new = self._objective(x, grad_x, kappa_1, kappa_2)
+                rel_loss = abs(objective_x_new - objective_x) / abs(objective_x)
+                loss_x, objective_x = loss_x_new, objective_x_new
+
+                # Update progress bar and print detailed information based on print_every
+                if self._verbose_bar and iteration % self._print_every == 0:
+                    pbar.update(self._print_every)
+                    if self._verbose:
+                        pbar.set_postfix({"loss": loss_x, "active": coordinates.size})
+
+                # Record history based on record_every
+                if iteration % self._record_every == 0:
+                    self.record_history(x.copy(), loss_x, grad_x.copy(), 0.0, rel_loss, iteration)
+
+                # Check for convergence, only a sweep over all the coordinates may stop the descent
+                if rel_loss < self._tol:
+                    if full_sweep:
+                        converged = True
+                        break
+                    full_sweep = True
+                else:
+                    full_sweep = False
+
+        except Exception as e:
+            if pbar:
+                pbar.write(f"\nOptimization interrupted: {e}")
+
+        finally:
+            end_time = time.time()  # End the timer
+            self._elapsed_time = end_time - start_time
+
+            if pbar:
+                # Print the status message
+                if converged:
+                    pbar.write(f"\nOptimization completed. Convergence achieved after {iteration + 1} sweeps.")
+                else:
+                    pbar.write(f"\nOptimization terminated. Max iterations {self._max_iter} reached.")
+                pbar.write(f"\nTime elapsed: {self._elapsed_time:.2f} seconds.")
+
+                pbar.close()
+
+        self._is_optimized = True
+
+        # Print full history based on verbose
+        if self._verbose:
+            self.print_history()
+
+        self._minimizer = x
+
+    def print_info(self):
+        """ Display information about the instantiated model object. """
+        table = [["Optimizer", "Coordinate Descent"],
+                 ["Selection", self._selection],
+                 ["Regularization", self._prox],
+                 ["Maximum iteration", self._max_iter],
+                 ["Tolerance", self._tol],
+                 ["Verbose", self._verbose]]
+        print(tabulate(table, headers="firstrow", tablefmt="grid"))
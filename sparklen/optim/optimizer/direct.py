@@ -0,0 +1,200 @@
+# Author: Romain E. Lacoste
+# License: BSD-3-Clause
+
+from sparklen.optim.optimizer.base.quadratic_optimizer import QuadraticOptimizer
+from sparklen.optim.optimizer.agd import AGD
+
+from sparklen.prox import ProxZero, ProxL2
+
+from tabulate import tabulate
+
+import numpy as np
+from scipy.linalg import cho_factor, cho_solve, eigh, LinAlgError
+
+import time
+
+class Direct(QuadraticOptimizer):
+    """
+    Optimizer class for the closed-form solution of quadratic losses.
+
+    This class solves the unpenalized and ridge-penalized least-squares
+    problems directly. The least-squares loss is separable over the rows
+    of the parameter, which all share the same hessian :math:`H` and only
+    differ by their linear term :math:`b_i`. The minimizer solves
+
+    .. math::
+        (H + \\kappa D) \\theta_i = -b_i, \\quad i \\in [d]
+
+    where :math:`D` is the diagonal selecting the penalized coefficients.
+    Without penalty, the hessian is factored once by Cholesky and all the
+    rows are solved as one system with `d` right-hand sides. With the ridge
+    penalty, the unpenalized coefficients are eliminated and the remaining
+    Schur complement is diagonalized once, so that a whole path of
+    penalization constants is solved at the cost of matrix products.
+
+    The factorizations are kept as long as the model, its data and its
+    decay are unchanged.
+
+    Parameters
+    ----------
+    lr_scheduler : str, {'lipschitz', 'backtracking'}, default='backtracking'
+        Specifies the learning rate scheduler of the accelerated gradient
+        descent used as fallback, see Notes. The available options are:
+
+        - 'lipschitz' : Lipschitz-based step size, usable only if the loss is gradient Lipschitz.
+        - 'backtracking' : Backtracking line-search-based step size.
+        - 'fast-backtracking' : Two-Way Backtracking line-search-based step size.
+
+    max_iter : int, default=100
+        The maximum number of iterations allowed during the fallback.
+
+    tol : float, default=1e-5
+        The tolerance for the precision achieved during the fallback.
+
+    verbose_bar : bool, default=True
+        Not used, present for API consistency with the iterative optimizers.
+
+    verbose : bool, default=True
+        Controls whether recorded information is printed at the end.
+
+    print_every : int, default=5
+        Not used, present for API consistency with the iterative optimizers.
+
+    record_every : int, default=5
+        Not used, present for API consistency with the iterative optimizers.
+
+    Attributes
+    ----------
+    minimizer : ndarray
+        Minimizer found by the optimizer. This is a read-only property.
+
+    elapsed_time : float
+        Time taken for the `optimize()` call, in seconds. This is a read-only property.
+
+    history : dict-like
+        A dictionary-like object storing the optimizer's history.
+        This is a read-only property.
+
+    Notes
+    ----------
+    Only the least-squares models, which provide a hessian, can be
+    optimized, with either :class:`~sparklen.prox.ProxZero` or
+    :class:`~sparklen.prox.ProxL2`. When the proximal operator enforces
+    positivity and the closed-form solution has negative entries, it is
+    projected and used as the starting point of an accelerated gradient
+    descent, which then handles the constraint.
+    """
+
+    def __init__(self, lr_scheduler, max_iter, tol, verbose_bar=True, verbose=True, print_every=5, record_every=5):
+        # Call the initializer of the base class QuadraticOptimizer
+        super().__init__(lr_scheduler, max_iter, tol, verbose_bar, verbose, print_every, record_every)
+
+    def _initialize_values(self, x0):
+        return x0
+
+    def _step(self, x):
+        """ Solve the quadratic problem in closed form. """
+        hessian, linear = self._quadratic()
+        n_coeffs = hessian.shape[0]
+
+        kappa = self._prox.pen_const if isinstance(self._prox, ProxL2) else 0.0
+
+        if kappa == 0.0:
+            if "cholesky" not in self._factorizations:
+                self._factorizations["cholesky"] = cho_factor(hessian)
+            return -cho_solve(self._factorizations["cholesky"], linear.T).T
+
+        penalized = np.zeros(n_coeffs, dtype=bool)
+        penalized[self._prox.start:min(self._prox.end, n_coeffs)] = True
+        key = ("ridge", self._prox.start, self._prox.end)
+        if key not in self._factorizations:
+            # Eliminate the unpenalized coefficients, their Schur complement is diagonalized once
+            H_PP = hessian[np.ix_(penalized, penalized)]
+            H_PU = hessian[np.ix_(penalized, ~penalized)]
+            H_UU = hessian[np.ix_(~penalized, ~penalized)]
+            if H_UU.shape[0] > 0:
+                cholesky_U = cho_factor(H_UU)
+                schur = H_PP - H_PU @ cho_solve(cholesky_U, H_PU.T)
+            else:
+                cholesky_U = None
+                schur = H_PP
+            eigenvalues, eigenvectors = eigh(schur)
+            self._factorizations[key] = (cholesky_U, H_PU, eigenvalues, eigenvectors)
+        cholesky_U, H_PU, eigenvalues, eigenvectors = self._factorizations[key]
+
+        b_P = linear[:, penalized].T
+        b_U = linear[:, ~penalized].T
+        if cholesky_U is not None:
+            b_P = b_P - H_PU @ cho_solve(cholesky_U, b_U)
+        x_P = -eigenvectors @ ((eigenvectors.T @ b_P) / (eigenvalues + kappa)[:, None])
+
+        x_new = np.empty((self._model.n_components(), n_coeffs))
+        x_new[:, penalized] = x_P.T
+        if cholesky_U is not None:
+            x_new[:, ~penalized] = -cho_solve(cholesky_U, b_U + H_PU.T @ x_P).T
+        return x_new
+
+    def optimize(self, x0):
+        """
+        Run the optimization process.
+
+        Parameters
+        ----------
+        x0 : ndarray
+            Initial guess. It is only used if the fallback is needed.
+
+        Returns
+        -------
+        self : object
+            The instance of the optimized object.
+        """
+
+        start_time = time.time()  # Start the timer
+
+        # Call the base class logic
+        super().optimize(x0)
+
+        if not isinstance(self._prox, (ProxZero, ProxL2)):
+            raise ValueError(f"The direct optimizer only handles the 'none' and 'ridge' penalties, but got {type(self._prox).__name__} instead.")
+
+        try:
+            x = self._step(self._initialize_values(x0))
+        except LinAlgError:
+            # A singular hessian, e.g. a component without any event, has no closed-form solution
+            x = None
+
+        start, end = self._prox.start, self._prox.end
+        if x is None or (self._prox.positive and np.any(x[:, start:end] < 0)):
+            if x is not None:
+                # The projected closed-form solution is a warm start for the constrained problem
+                self._prox.apply(x, 0.0)
+            else:
+                x = x0
+            fallback = AGD(self._str_lr_scheduler, self._max_iter, self._tol, verbose_bar=False, verbose=False,
+                           print_every=self._print_every, record_every=self._record_every)
+            fallback.set_model(self._model)
+            fallback.set_prox(self._prox)
+            fallback.optimize(x)
+            x = fallback.minimizer
+            self._history = fallback.history
+        else:
+            loss_x, grad_x = self._model.loss_and_grad(x)
+            self.record_history(x, loss_x, grad_x, 0.0, 0.0, 0)
+
+        self._elapsed_time = time.time() - start_time
+        self._is_optimized = True
+
+        # Print full history based on verbose
+        if self._verbose:
+            self.print_history()
+
+        self._minimizer = x
+
+    def print_info(self):
+        """ Display information about the instantiated model object. """
+        table = [["Optimizer", "Direct solver"],
+                 ["Regularization", self._prox],
+                 ["Maximum iteration of the fallback", self._max_iter],
+                 ["Tolerance of the fallback", self._tol],
+                 ["Verbose", self._verbose]]
+        print(tabulate(table, headers="firstrow", tablefmt="grid"))
@@ -74,8 +74,7 @@ class GD(Optimizer):
     def _initialize_values(self, x0):
         """Initialize loss_x and grad_x based on the initial parameters x."""
         x = x0
-        loss_x = self._model.loss(x)
-        grad_x = self._model.grad(x)
+        loss_x, grad_x = self._model.loss_and_grad(x)
         return x, loss_x, grad_x
     
     def _step(self, x, loss_x, grad_x):
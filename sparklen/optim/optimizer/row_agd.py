@@ -0,0 +1,283 @@
+# Author: Romain E. Lacoste
+# License: BSD-3-Clause
+
+from sparklen.optim.optimizer.base.optimizer import Optimizer
+
+from tabulate import tabulate
+
+import numpy as np
+
+from tqdm import tqdm
+
+import time
+
+class RowAGD(Optimizer):
+    """
+    Optimizer class for row-wise Accelerated Gradient Descent.
+
+    The losses of the Hawkes models, as well as the penalties, are sums of
+    independent terms, one per row of the parameter. This class solves
+    the `d` row subproblems simultaneously with Accelerated Gradient Descent,
+    each row having its own step size, line search, momentum and stopping
+    rule. At each evaluation, the rows still running are computed together
+    by the model, in parallel over `n_threads` threads, while the converged
+    rows are frozen and no longer cost any computation.
+
+    Parameters
+    ----------
+    lr_scheduler : str, {'lipschitz', 'backtracking'}, default='backtracking'
+        Specifies the learning rate scheduler, applied to each row
+        separately. The available options are:
+
+        - 'lipschitz' : Lipschitz-based step size, usable only if the loss is gradient Lipschitz.
+        - 'backtracking' : Backtracking line-search-based step size.
+        - 'fast-backtracking' : Two-Way Backtracking line-search-based step size.
+
+    max_iter : int, default=100
+        The maximum number of iterations allowed for each row.
+
+    tol : float, default=1e-5
+        The tolerance for the precision achieved during the optimization process.
+        A row stops when the relative variation of its loss falls below this value.
+        If the tolerance is not reached, the optimizer will perform a maximum of `max_iter` iterations.
+
+    verbose_bar : bool, default=True
+        Determines whether a progress bar is displayed during the optimization process,
+        along with information such as the loss value and the number of running rows.
+        If `verbose_bar=False`, no information is displayed.
+        If set to `True`, details will be displayed every `print_every` iterations.
+
+    verbose : bool, default=True
+        Controls whether recorded information during the optimization phase is printed at the end.
+        If `verbose=False`, no information is printed.
+        If set to `True`, details will be displayed every `print_every` iterations.
+
+    print_every : int, default=5
+        Specifies the frequency at which history information is printed.
+        Information will be printed when the iteration number is a multiple of `print_every`.
+
+    record_every : int, default=5
+        Specifies the frequency at which history information is recorded.
+        Information will be recorded when the iteration number is a multiple of `record_every`.
+        The recorded loss is the total loss, the learning rate is the mean
+        step size of the running rows, and the tolerance is their largest
+        relative variation.
+
+    Attributes
+    ----------
+    minimizer : ndarray
+        Minimizer found by the optimizer. This is a read-only property.
+
+    elapsed_time : float
+        Time taken for the `optimize()` call, in seconds. This is a read-only property.
+
+    history : dict-like
+        A dictionary-like object storing the optimizer's history across iterations.
+        This is a read-only property.
+
+    n_iter : ndarray of shape (d,)
+        Number of iterations performed by each row. This is a read-only property.
+    """
+
+    # Search control parameter of the line searches
+    _tau = 0.5
+
+    def __init__(self, lr_scheduler, max_iter, tol, verbose_bar=True, verbose=True, print_every=5, record_every=5):
+        # Call the initializer of the base class Optimizer
+        super().__init__(lr_scheduler, max_iter, tol, verbose_bar, verbose, print_every, record_every)
+        self._str_lr_scheduler = lr_scheduler
+
+        self._step_sizes = None
+        self._n_iter = None
+
+    @property
+    def n_iter(self):
+        return self._n_iter
+
+    def _apply_prox(self, x, rows, step_sizes):
+        """ Apply the proximal operator to the given rows only, each with its own step size. """
+        self._prox.apply_rows(x, rows, step_sizes)
+
+    def _line_search(self, y, loss_y, grad_y, rows):
+        """
+        Run the line search of each given row from the search point `y`.
+        The rows still searching are evaluated together at each trial.
+        """
+        x_new = y.copy()
+        loss_x_new = np.zeros_like(loss_y)
+        grad_x_new = np.zeros_like(grad_y)
+
+        if self._str_lr_scheduler == "backtracking":
+            self._step_sizes[rows] = 1.0
+        decreased = np.zeros(len(self._step_sizes), dtype=bool)
+
+        pending = rows
+        while pending.size > 0:
+            sigma = self._step_sizes[pending]
+
+            # Compute the tentative rows with proximal operator
+            x_new[pending] = y[pending] - sigma[:, None] * grad_y[pending]
+            self._apply_prox(x_new, pending, sigma)
+
+            # Compute the loss and the gradient of the tentative rows
+            loss_pending, grad_pending = self._model.loss_and_grad_rows(x_new, pending)
+            loss_x_new[pending] = loss_pending
+            grad_x_new[pending] = grad_pending[pending]
+
+            if self._str_lr_scheduler == "lipschitz":
+                break
+
+            # Calculate the envelope of each row
+            diff = x_new[pending] - y[pending]
+            envelope = loss_y[pending] + np.sum(grad_y[pending] * diff, axis=1) + 1. / (2 * sigma) * np.sum(diff**2, axis=1)
+            accepted = loss_pending <= envelope
+
+            if self._str_lr_scheduler == "fast-backtracking":
+                # Accepted rows first try a larger step, unless they already had to decrease it
+                done = accepted & (decreased[pending] | (sigma / self._tau > 1.0))
+                grow = accepted & ~done
+                self._step_sizes[pending[grow]] /= self._tau
+            else:
+                done = accepted
+            self._step_sizes[pending[~accepted]] *= self._tau
+            decreased[pending[~accepted]] = True
+
+            # Stop the rows whose step size is too small to avoid infinite loop
+            too_small = self._step_sizes[pending] < 1e-10
+            if np.any(too_small & ~done):
+                print("Warning: Step size became too small.")
+            pending = pending[~(done | too_small)]
+
+        return x_new, loss_x_new, grad_x_new
+
+    def _initialize_values(self, x0):
+        """Initialize the loss and gradient of each row based on the initial parameters x."""
+        n_rows = x0.shape[0]
+        x = np.array(x0, dtype=np.float64)
+        y = x.copy()
+        loss_y, grad_y = self._model.loss_and_grad_rows(y, np.arange(n_rows))
+        loss_x = loss_y.copy()
+        t = np.ones(n_rows)
+
+        if self._str_lr_scheduler == "lipschitz":
+            self._step_sizes = np.full(n_rows, 1.0 / self._model.lipschitz_const())
+        else:
+            self._step_sizes = np.ones(n_rows)
+        self._n_iter = np.zeros(n_rows, dtype=int)
+
+        return x, loss_x, y, loss_y, grad_y, t
+
+    def _step(self, x, loss_x, y, loss_y, grad_y, t, active):
+        """
+        Perform a single optimization step on the running rows, the
+        other rows being left unchanged.
+        """
+        x_new, loss_x_new, grad_x_new = self._line_search(y, loss_y, grad_y, active)
+        step_size = np.mean(self._step_sizes[active])
+
+        # Update relative distance of each running row
+        rel_loss = np.abs(loss_x_new[active] - loss_x[active]) / np.maximum(np.abs(loss_x[active]), np.finfo(np.float64).tiny)
+
+        # Update momentum of each running row
+        t_new = np.sqrt((1. + (1. + 4. * t[active] * t[active]))) / 2.
+        y[active] = x_new[active] + ((t[active] - 1) / t_new)[:, None] * (x_new[active] - x[active])
+
+        x[active] = x_new[active]
+        loss_x[active] = loss_x_new[active]
+        t[active] = t_new
+        self._n_iter[active] += 1
+
+        return x, loss_x, grad_x_new, y, t, step_size, rel_loss
+
+    def optimize(self, x0):
+        """
+        Run the optimization process.
+
+
+        Parameters
+        ----------
+        x0 : ndarray
+            Initial guess.
+
+        Returns
+        -------
+        self : object
+            The instance of the optimized object.
+        """
+
+        start_time = time.time()  # Start the timer
+
+        # Call the base class logic
+        super().optimize(x0)
+
+        # Initialize the loss and gradient of each row for the first iteration
+        x, loss_x, y, loss_y, grad_y, t = self._initialize_values(x0)
+        active = np.arange(x.shape[0])
+
+        converged = False
+
+        pbar = None
+        if self._verbose_bar:
+            # Setup the progress bar
+            pbar = tqdm(total=self._max_iter, desc="Optimizing", unit="it")
+
+        try:
+            for iteration in range(self._max_iter):
+                x, loss_x, grad_x, y, t, step_size, rel_loss = self._step(x, loss_x, y, loss_y, grad_y, t, active)
+
+                # Update progress bar and print detailed information based on print_every
+                if self._verbose_bar and iteration % self._print_every == 0:
+                    pbar.update(self._print_every)
+                    if self._verbose:
+                        pbar.set_postfix({"loss": np.sum(loss_x), "rows": active.size})
+
+                # Record history based on record_every
+                if iteration % self._record_every == 0:
+                    self.record_history(x.copy(), np.sum(loss_x), grad_x, step_size, np.max(rel_loss), iteration)
+
+                # Check for convergence of each row, the converged ones are frozen
+                active = active[rel_loss >= self._tol]
+                converged = active.size == 0
+                if converged:
+                    break
+
+                # Update the search point of the running rows for the next iteration
+                loss_active, grad_active = self._model.loss_and_grad_rows(y, active)
+                loss_y[active] = loss_active
+                grad_y[active] = grad_active[active]
+
+        except Exception as e:
+            if pbar:
+                pbar.write(f"\nOptimization interrupted: {e}")
+
+        finally:
+            end_time = time.time()  # End the timer
+            self._elapsed_time = end_time - start_time
+
+            if pbar:
+                # Print the status message
+                if converged:
+                    pbar.write(f"\nOptimization completed. Convergence of all rows achieved after {iteration + 1} iterations.")
+                else:
+                    pbar.write(f"\nOptimization terminated. Max iterations {self._max_iter} reached by {active.size} rows.")
+                pbar.write(f"\nTime elapsed: {self._elapsed_time:.2f} seconds.")
+
+                pbar.close()
+
+        self._is_optimized = True
+
+        # Print full history based on verbose
+        if self._verbose:
+            self.print_history()
+
+        self._minimizer = x
+
+    def print_info(self):
+        """ Display information about the instantiated model object. """
+        table = [["Optimizer", "Row-wise Accelerated Gradient Descent"],
+                 ["Learning rate strategy", self._str_lr_scheduler],
+                 ["Regularization", self._prox],
+                 ["Maximum iteration", self._max_iter],
+                 ["Tolerance", self._tol],
+                 ["Verbose", self._verbose]]
+        print(tabulate(table, headers="firstrow", tablefmt="grid"))
@@ -17,6 +17,9 @@ class Prox(ABC):
         self._start = None
         self._end = None
         
+        # Entries held at zero, e.g. discarded by a screening rule
+        self._screened = None
+        
         self._is_pen_const_setted = False
         self._is_application_range_setted = False
     
@@ -43,6 +46,26 @@ class Prox(ABC):
             raise ValueError("The end of apply range should begin from zero.")
         self._end = end
         self._is_application_range_setted = True
+        
+    def set_screened(self, screened):
+        if screened is not None:
+            screened = np.asarray(screened, dtype=bool)
+        self._screened = screened
+        
+    def _screen(self, x):
+        # Hold the screened entries at zero after the proximal step
+        if self._screened is not None:
+            if self._screened.shape != x.shape:
+                raise ValueError(f"The screened entries should have the shape {x.shape} of the point, but got {self._screened.shape} instead.")
+            x[self._screened] = 0.0
+    
+    def _screen_rows(self, x, rows):
+        # Hold the screened entries of the given rows at zero after the proximal step
+        if self._screened is not None:
+            if self._screened.shape != x.shape:
+                raise ValueError(f"The screened entries should have the shape {x.shape} of the point, but got {self._screened.shape} instead.")
+            row_index, col_index = np.nonzero(self._screened[rows])
+            x[rows[row_index], col_index] = 0.0
     
     @property
     def pen_const(self):
@@ -59,6 +82,10 @@ class Prox(ABC):
     @property
     def positive(self):
         return self._positive
+    
+    @property
+    def screened(self):
+        return self._screened
         
     @abstractmethod
     def apply(self, x, step_size):
@@ -77,6 +104,26 @@ class Prox(ABC):
         # This part must be implemented in the subclasses method
         pass
     
+    @abstractmethod
+    def apply_rows(self, x, rows, step_sizes):
+        # Partially implemented logic in the abstract method
+        if not self._is_pen_const_setted:
+            raise AttributeError("The penalization constant has not been set. You must call set_pen_const() before apply_rows()")
+        if not self._is_application_range_setted:
+            raise AttributeError("The application range has not been set. You must call set_application_range() before apply_rows()")         
+        
+        if not isinstance(x, np.ndarray):
+            raise TypeError(f"Input theta parameter should be a NumPy Array, but got {type(x).__name__} instead.")
+        
+        if np.shape(rows) != np.shape(step_sizes) or np.ndim(rows) != 1:
+            raise ValueError("The rows and the step sizes should be one-dimensional arrays of the same length.")
+        
+        if not np.all(np.asarray(step_sizes) >= 0):
+            raise ValueError("The step sizes input should be positive.")
+            
+        # This part must be implemented in the subclasses method
+        pass
+    
     @abstractmethod
     def print_info(self):
         pass
@@ -7,6 +7,8 @@ from sparklen.prox.base.prox import Prox
 
 from tabulate import tabulate
 
+import numpy as np
+
 class ProxZero(Prox):
     """
     Proximal operator class for the identity.
@@ -80,7 +82,33 @@ class ProxZero(Prox):
 
         self._cpp_prox = CppProxZero(self._pen_const, self._start, self._end, self._positive)
         
-        return self._cpp_prox.apply(x, step_size)
+        self._cpp_prox.apply(x, step_size)
+        self._screen(x)
+        
+    def apply_rows(self, x, rows, step_sizes):
+        """
+        Apply the proximal operator to some rows of a point, each with its 
+        own step size, the other rows being left unchanged.
+
+        Parameters
+        ----------
+        x : ndarray  
+            The current point on which the proximal operator will be applied.
+
+        rows : ndarray of shape (r, )
+            The indices of the rows to which the proximal operator is applied.
+
+        step_sizes : ndarray of shape (r, )  
+            The step size of each of the given rows.
+        """
+        # Call the base class logic
+        super().apply_rows(x, rows, step_sizes)
+        rows = np.ascontiguousarray(rows, dtype=np.int64)
+
+        self._cpp_prox = CppProxZero(self._pen_const, self._start, self._end, self._positive)
+        
+        self._cpp_prox.apply_rows(x, np.ascontiguousarray(step_sizes, dtype=np.float64), rows)
+        self._screen_rows(x, rows)
         
     def print_info(self):
         """ Display information about the instantiated model object. """